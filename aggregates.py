@@ -0,0 +1,148 @@
+"""Online session statistics and per-condition aggregates.
+
+Keeps everything the Session Report shows (overview metrics, the
+per-condition summary table and the condition distribution) up to date in
+O(1) per prediction, so rendering the report no longer rescans the whole
+history.
+"""
+import math
+
+import numpy as np
+import pandas as pd
+
+SUMMARY_COLUMNS = ['HR Mean', 'HR Std', 'HR Min', 'HR Max', 'HRV Mean', 'HRV Std', 'LF/HF Ratio']
+
+
+class RunningStats:
+    """Welford mean/variance with running min/max"""
+
+    def __init__(self):
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def update(self, x):
+        self.n += 1
+        delta = x - self.mean
+        self.mean += delta / self.n
+        self.m2 += delta * (x - self.mean)
+        if x < self.min:
+            self.min = x
+        if x > self.max:
+            self.max = x
+
+    def update_batch(self, values):
+        """Merge a whole array of values at once (Chan et al. parallel update)"""
+        values = np.asarray(values, dtype=np.float64)
+        if not len(values):
+            return
+        n_b = len(values)
+        mean_b = float(values.mean())
+        m2_b = float(((values - mean_b) ** 2).sum())
+        n = self.n + n_b
+        delta = mean_b - self.mean
+        self.mean += delta * n_b / n
+        self.m2 += m2_b + delta * delta * self.n * n_b / n
+        self.n = n
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+
+    @property
+    def std(self):
+        """Sample standard deviation (ddof=1, as pandas), NaN below two values"""
+        return math.sqrt(self.m2 / (self.n - 1)) if self.n > 1 else float('nan')
+
+
+class SessionAggregator:
+    """Running session overview and per-condition statistics.
+
+    ``stats()`` returns the same keys the report's overview has always
+    used (duration, avg_hr, max_hr, min_hr, avg_hrv, stress_percentage);
+    ``summary()`` matches the old ``groupby('Condition').agg(...)`` table.
+    Times are seconds since the start of the session.
+    """
+
+    def __init__(self, baseline='no stress'):
+        self.baseline = baseline
+        self.n = 0
+        self.stressed = 0
+        self.first_time = None
+        self.last_time = None
+        self.hr = RunningStats()
+        self.hrv = RunningStats()
+        self.conditions = {}  # name -> (hr, hrv, lf_hf) RunningStats
+
+    def _condition(self, condition):
+        stats = self.conditions.get(condition)
+        if stats is None:
+            stats = self.conditions[condition] = (RunningStats(), RunningStats(), RunningStats())
+        return stats
+
+    def update(self, time, hr, rmssd, lf_hf, condition):
+        time, hr, rmssd, lf_hf = float(time), float(hr), float(rmssd), float(lf_hf)
+        condition = str(condition)
+        self.n += 1
+        if condition != self.baseline:
+            self.stressed += 1
+        if self.first_time is None:
+            self.first_time = time
+        self.last_time = time
+        self.hr.update(hr)
+        self.hrv.update(rmssd)
+        c_hr, c_hrv, c_lf_hf = self._condition(condition)
+        c_hr.update(hr)
+        c_hrv.update(rmssd)
+        c_lf_hf.update(lf_hf)
+
+    def update_batch(self, time, hr, rmssd, lf_hf, condition):
+        """Fold arrays of samples in at once"""
+        time = np.asarray(time, dtype=np.float64)
+        hr = np.asarray(hr, dtype=np.float64)
+        rmssd = np.asarray(rmssd, dtype=np.float64)
+        lf_hf = np.asarray(lf_hf, dtype=np.float64)
+        condition = np.asarray(condition).astype(str)
+        if not len(condition):
+            return
+        self.n += len(condition)
+        self.stressed += int((condition != self.baseline).sum())
+        if self.first_time is None:
+            self.first_time = float(time[0])
+        self.last_time = float(time[-1])
+        self.hr.update_batch(hr)
+        self.hrv.update_batch(rmssd)
+        for name in np.unique(condition):
+            mask = condition == name
+            c_hr, c_hrv, c_lf_hf = self._condition(str(name))
+            c_hr.update_batch(hr[mask])
+            c_hrv.update_batch(rmssd[mask])
+            c_lf_hf.update_batch(lf_hf[mask])
+
+    def stats(self):
+        if not self.n:
+            return None
+        return {
+            'duration': float(self.last_time - self.first_time),
+            'avg_hr': self.hr.mean,
+            'max_hr': self.hr.max,
+            'min_hr': self.hr.min,
+            'avg_hrv': self.hrv.mean,
+            'stress_percentage': self.stressed / self.n * 100,
+        }
+
+    def summary(self):
+        """Per-condition table indexed by Condition, rounded to 2 decimals"""
+        rows = {
+            name: [hr.mean, hr.std, hr.min, hr.max, hrv.mean, hrv.std, lf_hf.mean]
+            for name, (hr, hrv, lf_hf) in sorted(self.conditions.items())
+        }
+        summary = pd.DataFrame.from_dict(rows, orient='index', columns=SUMMARY_COLUMNS).round(2)
+        summary.index.name = 'Condition'
+        return summary
+
+    def condition_counts(self):
+        """Samples per condition, most frequent first (like value_counts)"""
+        counts = pd.Series({name: stats[0].n for name, stats in self.conditions.items()}, dtype='int64')
+        counts.index.name = 'Condition'
+        return counts.sort_values(ascending=False, kind='stable')
@@ -1,11 +1,31 @@
 import streamlit as st
+import streamlit.components.v1 as components
 import pandas as pd
-import pickle
+import os
+import queue
+import tempfile
+import threading
 import time
-import plotly.express as px
-import plotly.graph_objects as go
+import uuid
+from urllib.parse import urlsplit
 from datetime import datetime, timedelta
 
+import metrics
+from forest import DEFAULT_PATH, CompiledForest, load_model
+from inference import FEATURES
+from aggregates import SessionAggregator
+from dataset_store import load_frame
+from decimate import decimate, visible_range
+from episodes import EpisodeIndex
+from export import FORMATS, export
+from history import SessionHistory
+from inference_service import InferenceService, RemoteModel
+from ingest import IngestWorker, replay_source
+from live_chart import LiveChartServer, chart_html, local_origins
+from scheduler import Backpressure
+from session_store import SessionStore
+from smoothing import ProbaSmoother
+
 # ==========================================
 # 1. PAGE CONFIG
 # ==========================================
@@ -225,10 +245,18 @@ st.markdown("""
 def load_resources():
     """Load ML model and sample data"""
     try:
-        with open('stress_model.pkl', 'rb') as f:
-            model = pickle.load(f)
-        # Load sample data (simulating a 5-minute session at 1 Hz)
-        df = pd.read_csv('sample_data.csv').reset_index(drop=True)
+        # Prefer the memory-mapped compiled forest exported by the notebook;
+        # fall back to compiling the pickled estimator (which imports sklearn)
+        if os.path.isdir(DEFAULT_PATH):
+            model = CompiledForest.load(DEFAULT_PATH, FEATURES)
+        else:
+            model = CompiledForest.from_sklearn(load_model('stress_model.pkl', FEATURES))
+        # Load sample data (simulating a 5-minute session at 1 Hz), from the
+        # memory-mapped columnar store when it has been built
+        if os.path.isdir('sample_data_store'):
+            df = load_frame('sample_data_store')
+        else:
+            df = pd.read_csv('sample_data.csv').reset_index(drop=True)
         return model, df
     except FileNotFoundError as e:
         st.error(f"❌ Required file not found: {e.filename}")
@@ -240,23 +268,198 @@ def load_resources():
 
 model, df_stream = load_resources()
 
+# Replay speed of the simulated session, and how often the live tab polls for results
+REPLAY_RATE_HZ = 10
+LIVE_REFRESH_SECONDS = 0.2
+
+# Backlog handling of the inference worker ('batch' loses nothing; 'latest' drops
+# samples that can no longer be scored within MAX_LAG_SECONDS of arriving)
+BACKPRESSURE_POLICY = 'batch'
+MAX_LAG_SECONDS = 1.0
+# A live panel render slower than this makes the next one reuse the chart figure
+RENDER_BUDGET_SECONDS = LIVE_REFRESH_SECONDS
+
+# Opt-in websocket live chart (e.g. port 8502; 0 redraws with st.plotly_chart). The
+# browser opens ws://<page host>:<port> itself, so it needs that port reachable and
+# an http page; other browsers get the st.plotly_chart chart
+LIVE_CHART_PORT = int(os.environ.get('STRESS_LIVE_CHART_PORT', 0))
+LIVE_CHART_HOST = os.environ.get('STRESS_LIVE_CHART_HOST', '127.0.0.1')
+LIVE_CHART_ORIGINS = [origin for origin in os.environ.get('STRESS_LIVE_CHART_ORIGINS', '').split(',') if origin]
+LIVE_CHART_FPS = 5
+
+# Longer report timelines are decimated ('lttb' or 'minmax') to about this many points
+REPORT_MAX_POINTS = 2000
+REPORT_DECIMATION = 'lttb'
+
+# Stress episodes at least this long are shaded on the report timeline
+EPISODE_SHADE_MIN_SECONDS = 10
+
+# Label smoothing: EMA weight of each new probability row, and how many samples
+# a new condition must persist before the displayed condition switches
+SMOOTHING_ALPHA = 0.3
+SMOOTHING_MIN_DWELL = 3
+
+# Local Prometheus endpoint with per-stage latencies of the live pipeline (0 disables it)
+METRICS_PORT = int(os.environ.get('STRESS_METRICS_PORT', metrics.DEFAULT_PORT))
+
+# Finished and in-progress sessions are persisted here (shared by all app processes)
+SESSION_DB = os.environ.get('STRESS_SESSION_DB', 'sessions.db')
+
+# Streamlit holds a download button's whole file in the app's memory (it is not
+# streamed to the browser), so longer sessions are only exported with export.py
+EXPORT_MAX_ROWS = int(os.environ.get('STRESS_EXPORT_MAX_ROWS', 500_000))
+
+# Model-owning inference processes shared by all browser sessions (0 predicts in-process)
+INFERENCE_WORKERS = int(os.environ.get('STRESS_INFERENCE_WORKERS', 1))
+INFERENCE_TIMEOUT_SECONDS = 10.0
+
+
+@st.cache_resource
+def live_chart_server():
+    """One chart streaming server per process, or None to redraw the chart with st.plotly_chart"""
+    if not LIVE_CHART_PORT:
+        return None
+    try:
+        origins = LIVE_CHART_ORIGINS or local_origins(st.get_option('server.port'))
+        return LiveChartServer(LIVE_CHART_HOST, LIVE_CHART_PORT, LIVE_CHART_FPS, origins=origins).start()
+    except (ImportError, OSError):
+        return None
+
+
+chart_server = live_chart_server()
+
+
+def live_chart_reachable():
+    """Whether this browser can stream from the chart server (plain ws: from an allowed page)"""
+    url = urlsplit(st.context.url or '')
+    if chart_server is None or url.scheme != 'http':
+        return False
+    if f'{url.scheme}://{url.netloc}' not in chart_server.origins:
+        return False
+    return LIVE_CHART_HOST not in ('127.0.0.1', 'localhost') or url.hostname in ('127.0.0.1', 'localhost')
+
+
+@st.cache_resource
+def metrics_server():
+    """One /metrics endpoint per process, or None if disabled or the port is taken"""
+    if not METRICS_PORT:
+        return None
+    try:
+        return metrics.MetricsServer(port=METRICS_PORT).start()
+    except OSError:
+        return None
+
+
+metrics_server()
+
+
+@st.cache_resource
+def session_store():
+    """The process-wide session store"""
+    return SessionStore(SESSION_DB)
+
+
+store = session_store()
+
+
+@st.cache_resource
+def inference_service():
+    """One pool of inference processes per server, or None to predict on the worker threads"""
+    if not INFERENCE_WORKERS:
+        return None
+    model_path = DEFAULT_PATH if os.path.isdir(DEFAULT_PATH) else 'stress_model.pkl'
+    try:
+        return InferenceService(model_path, INFERENCE_WORKERS).start()
+    except (RuntimeError, OSError, queue.Empty):
+        return None
+
+
+service = inference_service()
+
 
 # ==========================================
 # 3. HELPER FUNCTIONS
 # ==========================================
-def prepare_features(row):
-    """Prepare model input from raw physiological data with error handling"""
-    try:
-        hr = row.get('HR', 60000 / max(row['MEAN_RR'], 1))  # Avoid division by zero
-        return pd.DataFrame({
-            'MEAN_RR': [row['MEAN_RR']],
-            'RMSSD': [row['RMSSD']],
-            'LF_HF': [row['LF_HF']],
-            'HR': [hr]
-        })
-    except Exception as e:
-        st.error(f"Feature preparation error: {str(e)}")
-        return None
+
+def start_worker():
+    """Start a background worker that replays the sample stream through the model"""
+    stop_event = threading.Event()
+    source = replay_source(df_stream, REPLAY_RATE_HZ, stop_event=stop_event)
+    backpressure = Backpressure(BACKPRESSURE_POLICY, MAX_LAG_SECONDS)
+    # Prefer the shared inference processes, unless they have died
+    predictor = RemoteModel(service, INFERENCE_TIMEOUT_SECONDS) if service is not None and service.alive else model
+    return IngestWorker(predictor, source, stop_event=stop_event, backpressure=backpressure).start()
+
+
+def reset_history():
+    """Start an empty session history and its running aggregates"""
+    st.session_state['history'] = SessionHistory(model.classes_)
+    st.session_state['aggregates'] = SessionAggregator()
+    st.session_state['episodes'] = EpisodeIndex()
+    st.session_state['live_figure'] = None
+    # Displayed, aggregated and exported conditions are the smoothed labels
+    if st.session_state.get('smooth_predictions', True):
+        st.session_state['smoother'] = ProbaSmoother(model.classes_, SMOOTHING_ALPHA, SMOOTHING_MIN_DWELL)
+    else:
+        st.session_state['smoother'] = ProbaSmoother(model.classes_, alpha=1.0, min_dwell=1)
+
+
+def history_frame():
+    """Report DataFrame of the session history, rebuilt only when samples were added"""
+    history = st.session_state['history']
+    cached = st.session_state.get('history_frame')
+    if cached is None or cached[0] != history.total:
+        cached = (history.total, history.to_frame(st.session_state['session_start_time']))
+        st.session_state['history_frame'] = cached
+    return cached[1]
+
+
+def stop_worker():
+    """Stop the current session's worker, if any, and finish its stored session"""
+    if st.session_state['worker'] is not None:
+        st.session_state['worker'].stop()
+    close_writer()
+
+
+def close_writer():
+    """Write the buffered samples of the stored session and mark it as ended"""
+    writer = st.session_state.pop('session_writer', None)
+    if writer is not None:
+        writer.close()
+
+
+def load_session(session_id):
+    """Replace the current session with one read back from the session store"""
+    stop_worker()
+    history, aggregates, episodes, started_at = store.load(session_id)
+    st.session_state['history'] = history
+    st.session_state['aggregates'] = aggregates
+    st.session_state['episodes'] = episodes
+    st.session_state['session_start_time'] = started_at
+    st.session_state['history_frame'] = None
+    st.session_state['is_running'] = False
+    st.session_state['worker'] = None
+    st.session_state['last_seq'] = -1
+    st.session_state['current_index'] = history.total
+    st.session_state['session_id'] = session_id
+    if chart_server is not None:
+        chart_server.unregister(st.session_state['chart_key'])
+
+
+def export_file(session_id, fmt):
+    """Deferred download: the whole encoded session as bytes.
+
+    Streamlit only serves bytes it holds in memory, so the file is encoded
+    chunk by chunk into a temporary file on disk and read back once: the
+    export costs one copy of the encoded file in memory (hence
+    EXPORT_MAX_ROWS), not the DataFrame and encoder buffers on top of it.
+    """
+    def build():
+        with tempfile.TemporaryFile() as f:
+            export(store, session_id, f, fmt)
+            f.seek(0)
+            return f.read()
+    return build
 
 
 def get_status_color(condition):
@@ -269,27 +472,11 @@ def get_status_color(condition):
     return color_map.get(condition.lower(), ("gray", "⚪"))
 
 
-def calculate_session_stats(history_df):
-    """Calculate comprehensive session statistics"""
-    if history_df.empty:
-        return None
-
-    stats = {
-        'duration': (history_df['Time'].max() - history_df['Time'].min()).total_seconds(),
-        'avg_hr': history_df['Heart Rate'].mean(),
-        'max_hr': history_df['Heart Rate'].max(),
-        'min_hr': history_df['Heart Rate'].min(),
-        'avg_hrv': history_df['HRV (RMSSD)'].mean(),
-        'stress_percentage': (history_df['Condition'] != 'no stress').sum() / len(history_df) * 100
-    }
-    return stats
-
-
 # ==========================================
 # 4. SESSION STATE INITIALIZATION
 # ==========================================
 if 'history' not in st.session_state:
-    st.session_state['history'] = []
+    reset_history()
 
 if 'is_running' not in st.session_state:
     st.session_state['is_running'] = False
@@ -300,6 +487,18 @@ if 'current_index' not in st.session_state:
 if 'session_start_time' not in st.session_state:
     st.session_state['session_start_time'] = None
 
+if 'worker' not in st.session_state:
+    st.session_state['worker'] = None
+
+if 'last_seq' not in st.session_state:
+    st.session_state['last_seq'] = -1
+
+if 'session_id' not in st.session_state:
+    st.session_state['session_id'] = None
+
+if 'chart_key' not in st.session_state:
+    st.session_state['chart_key'] = uuid.uuid4().hex
+
 # ==========================================
 # 5. TABS LAYOUT
 # ==========================================
@@ -585,83 +784,140 @@ with tab1:
     # Control buttons
     col_btn1, col_btn2, col_btn3, col_btn4 = st.columns([1, 1, 1, 3])
 
+    with col_btn4:
+        st.checkbox(
+            "Smooth predictions", value=True, key='smooth_predictions',
+            disabled=st.session_state['is_running'],
+            help="Average class probabilities over recent samples and only switch the condition "
+                 "once a new one has persisted, instead of showing every raw prediction"
+        )
+        st.checkbox(
+            "Show pipeline timings", value=False, key='debug_panel',
+            help="Rolling latency of each live pipeline stage (also served on /metrics)"
+        )
+        st.text_input(
+            "Subject ID", value="subject-01", key='subject_id',
+            disabled=st.session_state['is_running'],
+            help="Sessions are saved under this ID and can be reopened from the Session Report tab"
+        )
+
     with col_btn1:
         if st.button("▶️ Start Session", disabled=st.session_state['is_running'], use_container_width=True):
+            stop_worker()
             st.session_state['is_running'] = True
             st.session_state['current_index'] = 0
-            st.session_state['history'] = []
+            reset_history()
+            st.session_state['last_seq'] = -1
             st.session_state['session_start_time'] = datetime.now()
+            st.session_state['session_writer'] = store.start_session(
+                st.session_state['subject_id'] or 'unknown',
+                st.session_state['session_start_time'], model.classes_
+            )
+            st.session_state['session_id'] = st.session_state['session_writer'].session_id
+            st.session_state['worker'] = start_worker()
+            if chart_server is not None:
+                chart_server.register(
+                    st.session_state['chart_key'], st.session_state['worker'].buffer,
+                    st.session_state['session_start_time']
+                )
             st.rerun()
 
     with col_btn2:
         if st.button("⏸️ Stop Session", disabled=not st.session_state['is_running'], use_container_width=True):
+            stop_worker()
             st.session_state['is_running'] = False
             st.rerun()
 
     with col_btn3:
         if st.button("🔄 Reset", use_container_width=True):
+            stop_worker()
             st.session_state['is_running'] = False
             st.session_state['current_index'] = 0
-            st.session_state['history'] = []
+            reset_history()
+            st.session_state['last_seq'] = -1
+            st.session_state['worker'] = None
             st.session_state['session_start_time'] = None
+            st.session_state['session_id'] = None
+            if chart_server is not None:
+                chart_server.unregister(st.session_state['chart_key'])
             st.rerun()
 
-    # Metrics Display
-    col1, col2, col3, col4 = st.columns(4)
-    metric_hr = col1.empty()
-    metric_hrv = col2.empty()
-    metric_status = col3.empty()
-    metric_time = col4.empty()
-
-    # Charts
-    st.markdown("### Physiological Signals")
-    chart_placeholder = st.empty()
-
-    # Progress bar
-    progress_bar = st.progress(0)
-    status_text = st.empty()
-
-    # Live streaming loop
-    if st.session_state['is_running'] and st.session_state['current_index'] < len(df_stream):
-        i = st.session_state['current_index']
-        row = df_stream.iloc[i]
-
-        # Prepare features
-        input_data = prepare_features(row)
-
-        if input_data is not None:
-            # Predict
-            try:
-                pred = model.predict(input_data)[0]
-            except Exception as e:
-                st.error(f"Prediction error: {str(e)}")
-                st.session_state['is_running'] = False
-                st.stop()
-
-            # Calculate elapsed time
-            elapsed = timedelta(seconds=i)
-            timestamp = st.session_state['session_start_time'] + elapsed
-
-            # Save to history
-            st.session_state['history'].append({
-                'Time': timestamp,
-                'Heart Rate': input_data['HR'].iloc[0],
-                'HRV (RMSSD)': row['RMSSD'],
-                'LF/HF': row['LF_HF'],
-                'Condition': pred
-            })
+    # Only this fragment reruns while a session is live; it polls the worker's
+    # result buffer instead of driving inference itself
+    @st.fragment(run_every=LIVE_REFRESH_SECONDS if st.session_state['is_running'] else None)
+    def live_panel():
+        worker = st.session_state['worker']
+
+        # Collect results published since the last poll
+        if worker is not None and st.session_state['is_running']:
+            drain_start = time.perf_counter()
+            results = worker.buffer.read_since(st.session_state['last_seq'], 'page')
+            conditions = st.session_state['smoother'].update_labels(
+                ['session'] * len(results), [result['proba'] for result in results]
+            )
+            for result, condition in zip(results, conditions):
+                i = result['seq']
+                st.session_state['history'].append(
+                    i, result['HR'], result['RMSSD'], result['LF_HF'], condition, result['proba']
+                )
+                st.session_state['aggregates'].update(
+                    i, result['HR'], result['RMSSD'], result['LF_HF'], condition
+                )
+                st.session_state['episodes'].update(i, result['HR'], result['RMSSD'], condition)
+                if 'session_writer' in st.session_state:
+                    st.session_state['session_writer'].append(
+                        i, result['HR'], result['RMSSD'], result['LF_HF'], condition, result['proba']
+                    )
+                st.session_state['last_seq'] = i
+                st.session_state['current_index'] = i + 1
+            metrics.observe('drain', time.perf_counter() - drain_start)
+            # Time from publication by the worker to reaching the page
+            now = time.time()
+            for result in results:
+                metrics.observe('display_lag', now - result['received'])
+            metrics.count('displayed', len(results))
+
+        render_start = time.perf_counter()
+
+        # Metrics Display
+        col1, col2, col3, col4 = st.columns(4)
+        metric_hr = col1.empty()
+        metric_hrv = col2.empty()
+        metric_status = col3.empty()
+        metric_time = col4.empty()
+
+        # Charts
+        st.markdown("### Physiological Signals")
+        chart_placeholder = st.empty()
+
+        # Progress bar
+        progress_bar = st.progress(0)
+        status_text = st.empty()
+
+        history = st.session_state['history']
+        streamed = worker is not None and live_chart_reachable()
+        if streamed:
+            # The browser-side figure is fed by the chart server; identical markup
+            # on every rerun keeps the same iframe, so nothing is redrawn here
+            with chart_placeholder:
+                components.html(chart_html(st.session_state['chart_key'], LIVE_CHART_PORT), height=360)
+
+        if len(history) > 0:
+            latest = history.last()
+            pred = latest['condition']
+            elapsed = timedelta(seconds=latest['time'])
 
             # Update metrics
             color, emoji = get_status_color(pred)
 
             metric_hr.metric(
                 "Heart Rate",
-                f"{int(input_data['HR'].iloc[0])} BPM",
-                delta=f"{int(input_data['HR'].iloc[0]) - 70} from baseline"
+                f"{int(latest['hr'])} BPM",
+                delta=f"{int(latest['hr']) - 70} from baseline"
             )
             metric_hrv.metric(
                 "HRV (RMSSD)",
-                f"{row['RMSSD']:.1f} ms"
+                f"{latest['rmssd']:.1f} ms"
             )
             metric_status.markdown(f"### {emoji} {pred.upper()}")
             metric_time.metric(
@@ -669,16 +925,32 @@ with tab1:
                 f"{int(elapsed.total_seconds())}s"
             )
 
-            # Update live chart (last 60 seconds)
-            history_df = pd.DataFrame(st.session_state['history'][-60:])
+            # Update progress
+            processed = st.session_state['current_index']
+            progress_bar.progress(min(processed / len(df_stream), 1.0))
+            status_text.text(f"Processing sample {processed} of {len(df_stream)}")
+
+        if len(history) > 0 and not streamed:
+            # When the previous render overran its frame budget, re-send the last
+            # figure instead of rebuilding it, so a slow page skips frames rather
+            # than falling further behind
+            fig = st.session_state.get('live_figure')
+            if fig is not None and st.session_state.get('last_render', 0.0) > RENDER_BUDGET_SECONDS:
+                metrics.count('frames_skipped')
+            else:
+                # Update live chart (last 60 seconds), read as views into the ring buffer
+                recent = history.window(60)
+                recent_times = st.session_state['session_start_time'] + pd.to_timedelta(recent['time'], unit='s')
 
-            if not history_df.empty:
+                build_start = time.perf_counter()
+                # Plotly is imported on first use so it stays off the cold-start path
+                import plotly.graph_objects as go
                 fig = go.Figure()
 
                 # Heart Rate trace
                 fig.add_trace(go.Scatter(
-                    x=history_df['Time'],
-                    y=history_df['Heart Rate'],
+                    x=recent_times,
+                    y=recent['hr'],
                     name='Heart Rate',
                     line=dict(color='#FF6B6B', width=2),
                     mode='lines'
@@ -686,8 +958,8 @@ with tab1:
 
                 # HRV trace on secondary axis
                 fig.add_trace(go.Scatter(
-                    x=history_df['Time'],
-                    y=history_df['HRV (RMSSD)'],
+                    x=recent_times,
+                    y=recent['rmssd'],
                     name='HRV (RMSSD)',
                     line=dict(color='#4ECDC4', width=2),
                     mode='lines',
@@ -708,21 +980,51 @@ with tab1:
                     legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1)
                 )
 
+                metrics.observe('chart_build', time.perf_counter() - build_start)
+                st.session_state['live_figure'] = fig
+
+            with metrics.timer('chart_send'):
                 chart_placeholder.plotly_chart(fig, use_container_width=True)
 
-            # Update progress
-            progress = (i + 1) / len(df_stream)
-            progress_bar.progress(progress)
-            status_text.text(f"Processing sample {i + 1} of {len(df_stream)}")
+        st.session_state['last_render'] = time.perf_counter() - render_start
+        metrics.observe('render', st.session_state['last_render'])
+
+        if st.session_state['debug_panel']:
+            st.markdown("### Pipeline Timings")
+            st.dataframe(metrics.REGISTRY.snapshot().round(3), hide_index=True, use_container_width=True)
+            counters = metrics.REGISTRY.counters
+            st.caption(
+                f"Samples scored: {counters.get('scored', 0)} · displayed: {counters.get('displayed', 0)} · "
+                f"dropped: {counters.get('dropped', 0)} · invalid: {counters.get('invalid', 0)} · "
+                f"failed: {counters.get('failed', 0)} · "
+                f"reader overruns: {sum(metrics.REGISTRY.families.get('reader_overrun', {}).values())} · "
+                f"late: {counters.get('late', 0)} · frames skipped: {counters.get('frames_skipped', 0)} · "
+                f"latencies over the last "
+                f"{metrics.DEFAULT_WINDOW} observations per stage"
+            )
+            if service is not None:
+                info = service.stats()
+                st.caption(
+                    f"Inference processes: {info['alive']}/{info['workers']} alive · "
+                    f"requests: {info['requests']} · rows: {info['rows']} · pending: {info['pending']} · restarts: {info['restarts']}"
+                )
 
-            # Increment index and continue
-            st.session_state['current_index'] += 1
-            time.sleep(0.1)  # Faster refresh for better UX
-            st.rerun()
+        # Hand control back to the full page once the worker has drained
+        if worker is not None and st.session_state['is_running']:
+            if worker.error is not None:
+                st.session_state['is_running'] = False
+                close_writer()
+                st.error(f"Prediction error: {str(worker.error)}")
+            elif worker.buffer.closed and st.session_state['last_seq'] + 1 >= worker.buffer.published:
+                st.session_state['is_running'] = False
+                st.session_state['session_completed'] = True
+                close_writer()
+                st.rerun()
+
+    live_panel()
 
-    elif st.session_state['is_running']:
+    if st.session_state.pop('session_completed', False):
         # Session completed
-        st.session_state['is_running'] = False
         st.success("✅ Session completed! Switch to the 'Session Report' tab for detailed analysis.")
         st.balloons()
 
@@ -733,9 +1035,26 @@ with tab2:
     st.title("📊 Clinical Session Report")
     st.markdown("---")
 
+    # Sessions persisted by this or any other app process can be reopened here
+    saved = store.sessions()
+    if not saved.empty:
+        with st.expander("📂 Saved Sessions"):
+            labels = {
+                row.id: f"{row.subject} · {row.started_at:%Y-%m-%d %H:%M:%S} · {row.samples} samples"
+                for row in saved.itertuples()
+            }
+            col_pick, col_load = st.columns([3, 1])
+            chosen = col_pick.selectbox(
+                "Session", list(labels), format_func=labels.get, label_visibility="collapsed"
+            )
+            if col_load.button("Open", disabled=st.session_state['is_running'], use_container_width=True):
+                load_session(chosen)
+                st.rerun()
+
     if len(st.session_state['history']) > 0:
-        report_df = pd.DataFrame(st.session_state['history'])
-        stats = calculate_session_stats(report_df)
+        report_df = history_frame()
+        aggregates = st.session_state['aggregates']
+        stats = aggregates.stats()
 
         # Session Overview
         st.subheader("📋 Session Overview")
@@ -752,13 +1071,15 @@ with tab2:
 
         st.markdown("---")
 
+        import plotly.express as px
+
         # Two-column layout for visualizations
         viz_col1, viz_col2 = st.columns([1, 1])
 
         # 1. Stress Distribution (Pie Chart)
         with viz_col1:
             st.subheader("Condition Distribution")
-            stress_counts = report_df['Condition'].value_counts()
+            stress_counts = aggregates.condition_counts()
             fig_pie = px.pie(
                 values=stress_counts.values,
                 names=stress_counts.index,
@@ -777,8 +1098,28 @@ with tab2:
         # 2. Heart Rate Timeline with Condition Overlay
         with viz_col2:
             st.subheader("Heart Rate Timeline")
+            timeline_df = report_df
+            start = st.session_state['session_start_time']
+            shade_range = (float('-inf'), float('inf'))
+            if len(report_df) > REPORT_MAX_POINTS:
+                # Decimate the zoomed range only, so narrowing it shows finer detail
+                window = st.session_state['history'].window()
+                first = start + timedelta(seconds=float(window['time'][0]))
+                last = start + timedelta(seconds=float(window['time'][-1]))
+                zoom = st.slider(
+                    "Zoom", min_value=first, max_value=last, value=(first, last),
+                    step=timedelta(seconds=1), format="HH:mm:ss"
+                )
+                shade_range = ((zoom[0] - start).total_seconds(), (zoom[1] - start).total_seconds())
+                visible = visible_range(window['time'], *shade_range)
+                keep = visible.start + decimate(
+                    window['time'][visible], window['hr'][visible], window['condition'][visible],
+                    REPORT_MAX_POINTS, REPORT_DECIMATION
+                )
+                timeline_df = report_df.iloc[keep]
+                st.caption(f"Showing {len(keep):,} of {visible.stop - visible.start:,} samples in range")
             fig_timeline = px.scatter(
-                report_df,
+                timeline_df,
                 x='Time',
                 y='Heart Rate',
                 color='Condition',
@@ -790,6 +1131,15 @@ with tab2:
                 title=""
             )
             fig_timeline.update_traces(marker=dict(size=8))
+            # Shade stress episodes from the episode index rather than per sample
+            shade_colors = {"interruption": "#FFA500", "time pressure": "#EF553B"}
+            shaded = st.session_state['episodes'].query(min_duration=EPISODE_SHADE_MIN_SECONDS)
+            for episode in shaded.itertuples(index=False):
+                if episode.condition in shade_colors and episode.end >= shade_range[0] and episode.start <= shade_range[1]:
+                    fig_timeline.add_vrect(
+                        x0=start + timedelta(seconds=episode.start), x1=start + timedelta(seconds=episode.end),
+                        fillcolor=shade_colors[episode.condition], opacity=0.12, line_width=0, layer='below'
+                    )
             fig_timeline.update_layout(height=350, xaxis_title="Time", yaxis_title="Heart Rate (BPM)")
             st.plotly_chart(fig_timeline, use_container_width=True)
 
@@ -801,14 +1151,8 @@ with tab2:
         analysis_col1, analysis_col2 = st.columns([2, 1])
 
         with analysis_col1:
-            # Group by condition
-            summary = report_df.groupby('Condition').agg({
-                'Heart Rate': ['mean', 'std', 'min', 'max'],
-                'HRV (RMSSD)': ['mean', 'std'],
-                'LF/HF': 'mean'
-            }).round(2)
-
-            summary.columns = ['HR Mean', 'HR Std', 'HR Min', 'HR Max', 'HRV Mean', 'HRV Std', 'LF/HF Ratio']
+            # Per-condition statistics, maintained online as predictions arrive
+            summary = aggregates.summary()
             st.dataframe(summary, use_container_width=True)
 
         with analysis_col2:
@@ -828,7 +1172,39 @@ with tab2:
             fig_bar.update_layout(showlegend=False, height=300)
             st.plotly_chart(fig_bar, use_container_width=True)
 
-        # 4. Clinical Insights
+        # 4. Stress Episodes
+        st.markdown("---")
+        st.subheader("⏱️ Condition Episodes")
+
+        episodes = st.session_state['episodes']
+        episode_col1, episode_col2, episode_col3 = st.columns(3)
+        longest_tp = episodes.longest('time pressure')
+        long_episodes = episodes.query(min_duration=30)
+        with episode_col1:
+            st.metric("Episodes", f"{len(episodes)}")
+        with episode_col2:
+            st.metric(
+                "Longest Time Pressure",
+                f"{int(longest_tp['duration'])}s" if longest_tp is not None else "—"
+            )
+        with episode_col3:
+            st.metric("Stress Episodes ≥ 30s", f"{int((long_episodes['condition'] != 'no stress').sum())}")
+
+        filter_col1, filter_col2 = st.columns(2)
+        with filter_col1:
+            episode_condition = st.selectbox("Condition", ["All"] + sorted(aggregates.conditions))
+        with filter_col2:
+            episode_min = st.number_input("Minimum duration (s)", min_value=0, value=30, step=5)
+        matching = episodes.query(None if episode_condition == "All" else episode_condition, episode_min)
+        st.dataframe(
+            matching.round(2).assign(
+                start=start + pd.to_timedelta(matching['start'], unit='s'),
+                end=start + pd.to_timedelta(matching['end'], unit='s'),
+            ),
+            use_container_width=True, hide_index=True
+        )
+
+        # 5. Clinical Insights
         st.markdown("---")
         st.subheader("💡 Clinical Insights")
 
@@ -883,27 +1259,58 @@ with tab2:
                 else:
                     st.info(insight['message'])
 
-        # 5. Export Options
+        # 6. Export Options
         st.markdown("---")
         st.subheader("📥 Export Data")
 
         export_col1, export_col2 = st.columns([1, 3])
 
         with export_col1:
-            csv = report_df.to_csv(index=False).encode('utf-8')
+            # The export is encoded from the session store in chunks, with class
+            # probabilities, and only built when the button is clicked; the
+            # finished file is held in memory to be served
+            export_format = st.selectbox(
+                "Format", list(FORMATS), key='export_format',
+                format_func={'csv': "CSV", 'csv.gz': "CSV (gzip)", 'parquet': "Parquet"}.get
+            )
+            if 'session_writer' in st.session_state:
+                st.session_state['session_writer'].flush()
+            extension, mime = FORMATS[export_format]
+            session_id = st.session_state['session_id']
+            stored = store.session(session_id)['samples'] if session_id is not None else 0
+            too_long = stored > EXPORT_MAX_ROWS
             st.download_button(
-                label="📄 Download CSV",
-                data=csv,
-                file_name=f"session_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
+                label="📄 Download Samples",
+                data=export_file(session_id, export_format),
+                file_name=f"session_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{extension}",
+                mime=mime,
+                disabled=session_id is None or too_long,
+                use_container_width=True
+            )
+            if too_long:
+                st.caption(
+                    f"{stored:,} samples is over the {EXPORT_MAX_ROWS:,}-row download limit "
+                    f"(downloads are held in memory). Export it from the command line: "
+                    f"`python export.py {session_id} --db {SESSION_DB} -o session_{session_id}.{extension}`"
+                )
+            st.download_button(
+                label="⏱️ Download Episodes CSV",
+                data=episodes.to_frame().to_csv(index=False).encode('utf-8'),
+                file_name=f"session_episodes_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
                 mime="text/csv",
                 use_container_width=True
             )
 
         with export_col2:
             if st.button("🗑️ Clear Session Data", use_container_width=True):
-                st.session_state['history'] = []
+                stop_worker()
+                st.session_state['is_running'] = False
+                st.session_state['worker'] = None
+                st.session_state['last_seq'] = -1
+                reset_history()
                 st.session_state['current_index'] = 0
                 st.session_state['session_start_time'] = None
+                st.session_state['session_id'] = None
                 st.rerun()
 
     else:
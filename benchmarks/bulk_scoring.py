@@ -0,0 +1,56 @@
+"""Throughput of score_sessions.py against the number of worker processes.
+
+Writes a directory of synthetic recordings (rows resampled from
+sample_data.csv), scores it with 1, 2, 4, ... workers up to the CPU count
+and reports files/s, rows/s and the speedup over one worker.
+
+Usage (from the repository root):
+    python -m benchmarks.bulk_scoring
+    python -m benchmarks.bulk_scoring --files 64 --rows 20000 --workers 1 2 4 8
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import pandas as pd
+
+from forest import DEFAULT_PATH
+from score_sessions import score_directory
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk scoring throughput vs worker count")
+    parser.add_argument('--files', type=int, default=32)
+    parser.add_argument('--rows', type=int, default=10000, help="Rows per file")
+    parser.add_argument('--workers', type=int, nargs='+')
+    parser.add_argument('--data', default='sample_data.csv')
+    parser.add_argument('--model', default=DEFAULT_PATH if os.path.isdir(DEFAULT_PATH) else 'stress_model.pkl')
+    args = parser.parse_args()
+
+    cpus = os.cpu_count() or 1
+    workers = args.workers or [2 ** i for i in range(cpus.bit_length()) if 2 ** i <= cpus]
+    data = pd.read_csv(args.data)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        input_dir = os.path.join(tmp, 'recordings')
+        os.makedirs(input_dir)
+        for i in range(args.files):
+            data.sample(n=args.rows, replace=True, random_state=i).to_csv(
+                os.path.join(input_dir, f"session_{i:03d}.csv"), index=False)
+        total = args.files * args.rows
+
+        print(f"{args.files} files x {args.rows:,} rows, {cpus} CPUs\n")
+        print(f"{'workers':>8} {'seconds':>8} {'files/s':>8} {'rows/s':>10} {'speedup':>8}")
+        base = None
+        for n in workers:
+            start = time.perf_counter()
+            score_directory(input_dir, os.path.join(tmp, f"scored_{n}"), args.model, n, log=lambda _: None)
+            elapsed = time.perf_counter() - start
+            base = base or elapsed
+            print(f"{n:>8} {elapsed:>8.2f} {args.files / elapsed:>8.1f} {total / elapsed:>10,.0f} "
+                  f"{base / elapsed:>7.2f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+"""Accuracy impact of the quantized prediction cache.
+
+Streams a dataset through the model in order, once exactly and once behind
+a PredictionCache at several multiples of the default resolution, and
+reports hit rate, agreement with the exact labels, accuracy against the
+recorded condition and the largest probability difference.
+
+Usage (from the repository root):
+    python -m benchmarks.cache
+    python -m benchmarks.cache --data train.csv --rows 20000 --batch 32 --scales 1 10 100
+"""
+import argparse
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from forest import DEFAULT_PATH, load_model
+from inference import FEATURES, feature_frame
+from prediction_cache import DEFAULT_RESOLUTION, PredictionCache
+
+
+def stream(model, X, batch):
+    """Probabilities for X scored batch rows at a time, and seconds per row"""
+    out = []
+    start = time.perf_counter()
+    for i in range(0, len(X), batch):
+        out.append(model.predict_proba(X[i:i + batch]))
+    return np.concatenate(out), (time.perf_counter() - start) / len(X)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cached vs exact predictions")
+    parser.add_argument('--data', default='sample_data.csv')
+    parser.add_argument('--rows', type=int, help="Only the first N rows")
+    parser.add_argument('--model', default=DEFAULT_PATH if os.path.isdir(DEFAULT_PATH) else 'stress_model.pkl')
+    parser.add_argument('--batch', type=int, default=1, help="Rows per predict call (1: live monitor)")
+    parser.add_argument('--scales', type=float, nargs='+', default=[1, 5, 20, 50, 100],
+                        help="Multiples of the default resolution to try")
+    parser.add_argument('--max-size', type=int, default=65536)
+    args = parser.parse_args()
+
+    data = pd.read_csv(args.data, nrows=args.rows)
+    X = feature_frame(data)[FEATURES].to_numpy()
+    truth = data['condition'].to_numpy(dtype=object) if 'condition' in data.columns else None
+    model = load_model(args.model, FEATURES)
+    classes = np.asarray(model.classes_)
+
+    exact, exact_time = stream(model, X, args.batch)
+    exact_labels = classes[exact.argmax(axis=1)]
+    print(f"{len(X):,} rows from {args.data}, batch {args.batch}")
+    print(f"Default resolution: {DEFAULT_RESOLUTION}")
+    if truth is not None:
+        print(f"Exact accuracy vs condition: {(exact_labels == truth).mean():.4f}\n")
+
+    header = f"{'scale':>7} {'hit rate':>9} {'agree':>8} {'accuracy':>9} {'max |Δp|':>9} {'µs/row':>8} {'exact µs':>9}"
+    print(header)
+    print('-' * len(header))
+    for scale in args.scales:
+        resolution = {name: step * scale for name, step in DEFAULT_RESOLUTION.items()}
+        cache = PredictionCache(model, resolution, max_size=args.max_size)
+        cached, cached_time = stream(cache, X, args.batch)
+        labels = classes[cached.argmax(axis=1)]
+        accuracy = f"{(labels == truth).mean():.4f}" if truth is not None else '-'
+        print(f"{scale:>7g} {cache.stats()['hit_rate']:>9.1%} {(labels == exact_labels).mean():>8.2%} "
+              f"{accuracy:>9} {np.abs(cached - exact).max():>9.3f} "
+              f"{cached_time * 1e6:>8.1f} {exact_time * 1e6:>9.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+"""Report timeline cost with and without decimation.
+
+Builds the Session Report's heart-rate scatter for a synthetic long session
+from all samples and from the decimated subset, and reports points, figure
+JSON size and build time. Two sessions are run: one with condition runs of
+30 s to 15 min, where every transition must survive decimation, and one
+whose condition flickers every few samples, where there are too many
+transitions to keep. Both must stay within --max-points.
+
+Usage (from the repository root):
+    python -m benchmarks.decimate
+    python -m benchmarks.decimate --hours 8 --max-points 2000 --method minmax
+"""
+import argparse
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import plotly.express as px
+
+from decimate import DEFAULT_MAX_POINTS, METHODS, condition_runs, decimate
+
+COLORS = {"no stress": "#00CC96", "interruption": "#FFA500", "time pressure": "#EF553B"}
+
+
+def synthetic_session(n, seed=0, run_lengths=(30, 900)):
+    rng = np.random.default_rng(seed)
+    names = np.array(list(COLORS))
+    lengths = rng.integers(*run_lengths, n // run_lengths[0] + 1)
+    condition = np.repeat(rng.integers(0, len(names), len(lengths)), lengths)[:n]
+    hr = 72 + np.cumsum(rng.normal(0, 0.3, n)) * 0.2 + 5 * (condition == 2)
+    return pd.DataFrame({
+        'Time': pd.Timestamp(datetime(2026, 1, 1, 9)) + pd.to_timedelta(np.arange(n), unit='s'),
+        'Heart Rate': hr,
+        'Condition': names[condition],
+    })
+
+
+def build(frame):
+    start = time.perf_counter()
+    fig = px.scatter(frame, x='Time', y='Heart Rate', color='Condition', color_discrete_map=COLORS)
+    fig.update_traces(marker=dict(size=8))
+    size = len(fig.to_json())
+    return time.perf_counter() - start, size
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Report timeline with and without decimation")
+    parser.add_argument('--hours', type=float, default=8.0, help="Session length at 1 Hz")
+    parser.add_argument('--max-points', type=int, default=DEFAULT_MAX_POINTS)
+    parser.add_argument('--method', choices=sorted(METHODS), default='lttb')
+    args = parser.parse_args()
+
+    n = int(args.hours * 3600)
+    failures = []
+    for name, run_lengths in [('long runs', (30, 900)), ('flicker', (1, 6))]:
+        frame = synthetic_session(n, run_lengths=run_lengths)
+        seconds = np.arange(len(frame), dtype=np.float64)
+
+        start = time.perf_counter()
+        keep = decimate(seconds, frame['Heart Rate'].to_numpy(), frame['Condition'].to_numpy(),
+                        args.max_points, args.method)
+        decimate_time = time.perf_counter() - start
+
+        runs = condition_runs(frame['Condition'].to_numpy())
+        kept = set(keep.tolist())
+        missing = sum((s not in kept) + (e - 1 not in kept) for s, e in runs)
+        print(f"\n{name}: {len(frame):,} samples, {len(runs):,} condition runs, "
+              f"{args.method} to {args.max_points} points")
+        print(f"Decimation: {decimate_time * 1e3:.1f} ms, {len(keep):,} points kept, "
+              f"{missing:,} run boundaries lost")
+
+        full_time, full_size = build(frame)
+        dec_time, dec_size = build(frame.iloc[keep])
+        print(f"{'':12} {'points':>8} {'JSON MB':>8} {'build ms':>9}")
+        print(f"{'full':12} {len(frame):>8,} {full_size / 1e6:>8.2f} {full_time * 1e3:>9.0f}")
+        print(f"{'decimated':12} {len(keep):>8,} {dec_size / 1e6:>8.2f} {(dec_time + decimate_time) * 1e3:>9.0f}")
+        if len(keep) > args.max_points:
+            failures.append(f"{name}: {len(keep):,} points kept, over the {args.max_points:,} cap")
+        # Every transition fits in the budget only with at most max_points // 2 runs
+        if missing and 2 * len(runs) <= args.max_points:
+            failures.append(f"{name}: condition transitions were dropped")
+    if failures:
+        raise SystemExit("FAILED: " + "; ".join(failures))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,153 @@
+"""Cross-process feature transport: multiprocessing.Queue vs the shared-memory FeatureRing.
+
+A producer process sends --rows samples (sample_data.csv looped) one at a
+time to the consumer, this process, which takes whatever has arrived in
+batches of up to --max-batch rows, as the ingest worker does. Transports:
+
+    queue_frame    one single-row DataFrame per sample, pickled through a Queue
+                   (what a per-row prepare_features call would ship)
+    queue_record   one dict of floats per sample through a Queue
+    queue_array    one float64 row per sample through a Queue
+    ring           one FeatureRing.append per sample; batches are read as views
+
+Reports samples/s and µs per sample end to end. With --predict the consumer
+also scores every batch with the compiled forest (DataFrame batches through
+score_batch, ring views through score_array).
+
+Usage (from the repository root):
+    python -m benchmarks.feature_ring
+    python -m benchmarks.feature_ring --rows 200000 --predict
+"""
+import argparse
+import multiprocessing
+import os
+import queue
+import time
+
+import numpy as np
+import pandas as pd
+
+from feature_ring import N_FEATURES, FeatureRing
+from forest import DEFAULT_PATH, CompiledForest, load_model
+from inference import FEATURES, feature_frame, score_array, score_batch
+
+TRANSPORTS = ['queue_frame', 'queue_record', 'queue_array', 'ring']
+
+
+def samples(path, n):
+    data = pd.read_csv(path)
+    return feature_frame(data).to_numpy()[np.arange(n) % len(data)]
+
+
+def produce(transport, path, n, channel, ready, go):
+    X = samples(path, n)
+    ring = FeatureRing.attach(channel) if transport == 'ring' else None
+    ready.set()
+    go.wait()
+    for row in X:
+        if transport == 'queue_frame':
+            channel.put(pd.DataFrame([row], columns=FEATURES))
+        elif transport == 'queue_record':
+            channel.put(dict(zip(FEATURES, row.tolist())))
+        elif transport == 'queue_array':
+            channel.put(row)
+        else:
+            while not ring.append(row.tolist()):
+                time.sleep(0)
+    if ring is not None:
+        ring.close_stream()
+        ring.close()
+    else:
+        channel.put(None)
+
+
+def consume_queue(transport, channel, max_batch, model):
+    received = 0
+    done = False
+    while not done:
+        batch = [channel.get()]
+        while len(batch) < max_batch:
+            try:
+                batch.append(channel.get_nowait())
+            except queue.Empty:
+                break
+        if batch[-1] is None:
+            done = True
+            batch.pop()
+        received += len(batch)
+        if model is not None and batch:
+            if transport == 'queue_frame':
+                score_batch(model, pd.concat(batch, ignore_index=True))
+            elif transport == 'queue_record':
+                score_batch(model, pd.DataFrame.from_records(batch))
+            else:
+                score_batch(model, np.vstack(batch))
+    return received
+
+
+def consume_ring(ring, max_batch, model):
+    received = 0
+    while True:
+        records, subjects = ring.read(max_batch)
+        n = len(records)
+        if not n:
+            if ring.done:
+                return received
+            time.sleep(0)
+            continue
+        if model is not None:
+            score_array(model, records[:, :N_FEATURES])
+        del records, subjects
+        ring.release(n)
+        received += n
+
+
+def run(transport, args, model):
+    context = multiprocessing.get_context('spawn')
+    ready, go = context.Event(), context.Event()
+    ring = FeatureRing.create(args.capacity) if transport == 'ring' else None
+    channel = ring.name if ring is not None else context.Queue()
+    producer = context.Process(target=produce, args=(transport, args.data, args.rows, channel, ready, go))
+    producer.start()
+    ready.wait()
+    start = time.perf_counter()
+    go.set()
+    if ring is not None:
+        received = consume_ring(ring, args.max_batch, model)
+    else:
+        received = consume_queue(transport, channel, args.max_batch, model)
+    elapsed = time.perf_counter() - start
+    producer.join()
+    if ring is not None:
+        ring.close()
+    return received, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Queue vs shared-memory ring between two processes")
+    parser.add_argument('--rows', type=int, default=50000, help="Samples sent per transport")
+    parser.add_argument('--transports', nargs='+', choices=TRANSPORTS, default=TRANSPORTS)
+    parser.add_argument('--max-batch', type=int, default=256, help="Largest batch the consumer takes")
+    parser.add_argument('--capacity', type=int, default=4096, help="Ring capacity in records")
+    parser.add_argument('--predict', action='store_true', help="Score every batch in the consumer")
+    parser.add_argument('--data', default='sample_data.csv')
+    parser.add_argument('--model', default=DEFAULT_PATH if os.path.isdir(DEFAULT_PATH) else 'stress_model.pkl')
+    args = parser.parse_args()
+
+    model = None
+    if args.predict:
+        model = load_model(args.model, FEATURES)
+        if not isinstance(model, CompiledForest):
+            model = CompiledForest.from_sklearn(model)
+    print(f"{args.rows:,} samples, batches of up to {args.max_batch}"
+          f"{', scored' if args.predict else ''}, {os.cpu_count()} CPUs\n")
+    print(f"{'transport':14} {'samples/s':>12} {'µs/sample':>10}")
+    for transport in args.transports:
+        received, elapsed = run(transport, args, model)
+        if received != args.rows:
+            raise SystemExit(f"{transport}: received {received} of {args.rows} samples")
+        print(f"{transport:14} {received / elapsed:>12,.0f} {elapsed / received * 1e6:>10.2f}")
+
+
+if __name__ == '__main__':
+    main()
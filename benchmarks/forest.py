@@ -0,0 +1,83 @@
+"""Parity check and microbenchmark: compiled forest vs the pickled sklearn model.
+
+Usage (from the repository root):
+    python -m benchmarks.forest
+    python -m benchmarks.forest --data train.csv --rows 100000
+"""
+import argparse
+import pickle
+import time
+
+import numpy as np
+import pandas as pd
+
+from forest import SKLEARN_BATCH, CompiledForest
+from inference import FEATURES, feature_frame
+
+
+def per_call(fn, repeat, number):
+    """Best-of-repeat mean seconds per call"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        best = min(best, (time.perf_counter() - start) / number)
+    return best
+
+
+def check_parity(model, forest, X):
+    """Compiled predictions must match sklearn exactly"""
+    expected_proba = model.predict_proba(X)
+    actual_proba = forest.predict_proba(X)
+    expected = model.predict(X)
+    actual = forest.predict(X)
+    mismatches = int((expected != actual).sum())
+    max_diff = float(np.abs(expected_proba - actual_proba).max())
+    print(f"Parity on {len(X):,} rows: {mismatches} label mismatches, max |Δproba| = {max_diff:.2e}")
+    if mismatches or max_diff > 1e-9:
+        raise SystemExit("FAILED: compiled forest does not match sklearn")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare compiled and sklearn Random Forest inference")
+    parser.add_argument('--model', default='stress_model.pkl', help="Pickled RandomForestClassifier")
+    parser.add_argument('--data', default='sample_data.csv', help="CSV in the sample_data.csv schema")
+    parser.add_argument('--rows', type=int, default=None, help="Only read the first N rows")
+    args = parser.parse_args()
+
+    with open(args.model, 'rb') as f:
+        model = pickle.load(f)
+    # The NumPy traversal on every batch size, without handing large ones to sklearn
+    forest = CompiledForest.from_sklearn(model, fallback=False)
+    X = feature_frame(pd.read_csv(args.data, nrows=args.rows))
+
+    # Also probe values sitting exactly on split thresholds, where float32
+    # rounding decides the branch
+    rng = np.random.default_rng(0)
+    probes = X.sample(min(len(X), 2000), replace=True, random_state=0).to_numpy()
+    internal = forest.threshold[np.isfinite(forest.threshold)]
+    columns = rng.integers(0, len(FEATURES), len(probes))
+    probes[np.arange(len(probes)), columns] = rng.choice(internal, len(probes))
+    check_parity(model, forest, pd.concat([X, pd.DataFrame(probes, columns=FEATURES)], ignore_index=True))
+
+    one = X.iloc[[0]]
+    one_array = one.to_numpy()
+    print()
+    print(f"{'':24}{'sklearn':>14}{'compiled':>14}{'speedup':>10}")
+    rows = [
+        ('single sample', per_call(lambda: model.predict_proba(one), 3, 20),
+         per_call(lambda: forest.predict_proba(one_array), 5, 2000)),
+        ('single sample DataFrame', per_call(lambda: model.predict_proba(one), 3, 20),
+         per_call(lambda: forest.predict_proba(one), 5, 2000)),
+        (f'batch ({len(X):,} rows)', per_call(lambda: model.predict_proba(X), 3, 1),
+         per_call(lambda: forest.predict_proba(X), 3, 1)),
+    ]
+    for name, sk, compiled in rows:
+        print(f"{name:24}{sk * 1e6:>12,.1f}µs{compiled * 1e6:>12,.1f}µs{sk / compiled:>9.1f}x")
+    print(f"\nCompiled per-row cost in batch: {rows[-1][2] / len(X) * 1e6:.2f}µs")
+    print(f"A forest compiled in-process hands batches over {SKLEARN_BATCH:,} rows to sklearn")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+"""Concurrent sessions: in-process prediction vs the shared inference processes.
+
+Starts --sessions threads that each score batches of --batch rows as fast
+as they can (the way several browser sessions drive their ingest workers),
+plus one UI-like thread that serializes a 60-point chart every 10 ms, as a
+Streamlit script thread rendering the live tab would. For each mode
+(0 = predict in-process, k = InferenceService with k worker processes)
+reports scored rows/s and how late the UI thread's ticks ran.
+
+Scaling with workers needs free cores: with one CPU, extra processes only
+share it.
+
+Usage (from the repository root):
+    python -m benchmarks.inference_service
+    python -m benchmarks.inference_service --sessions 16 --workers 0 1 2 4 --batch 1
+"""
+import argparse
+import json
+import os
+import threading
+import time
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from forest import DEFAULT_PATH, load_model
+from inference import FEATURES, feature_frame
+from inference_service import InferenceService, RemoteModel
+
+UI_PERIOD = 0.01
+
+
+def ui_thread(stop_event, lateness):
+    """Tick every UI_PERIOD seconds, building a chart payload, and record how late each tick ran"""
+    points = [{'x': k, 'hr': 70.0 + k % 7, 'rmssd': 20.0 - k % 5} for k in range(60)]
+    start = time.perf_counter()
+    tick = 0
+    while not stop_event.is_set():
+        tick += 1
+        due = start + tick * UI_PERIOD
+        now = time.perf_counter()
+        if due > now:
+            time.sleep(due - now)
+        lateness.append(max(time.perf_counter() - due, 0.0))
+        json.dumps({'data': points})
+
+
+def session_thread(model, X, batch, stop_event, counts, index):
+    n = len(X)
+    offset = index * batch
+    while not stop_event.is_set():
+        rows = np.arange(offset, offset + batch) % n
+        model.predict_proba(X[rows])
+        counts[index] += batch
+        offset += batch
+
+
+def run(model, X, sessions, batch, duration):
+    stop_event = threading.Event()
+    counts = [0] * sessions
+    lateness = []
+    threads = [threading.Thread(target=session_thread, args=(model, X, batch, stop_event, counts, k))
+               for k in range(sessions)]
+    threads.append(threading.Thread(target=ui_thread, args=(stop_event, lateness)))
+    for thread in threads:
+        thread.start()
+    time.sleep(duration)
+    stop_event.set()
+    for thread in threads:
+        thread.join()
+    lateness = np.asarray(lateness) * 1e3
+    return {
+        'rows_per_s': sum(counts) / duration,
+        'ui_p50': float(np.percentile(lateness, 50)),
+        'ui_p99': float(np.percentile(lateness, 99)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Throughput and UI responsiveness, in-process vs inference processes")
+    parser.add_argument('--sessions', type=int, default=8, help="Concurrent scoring threads")
+    parser.add_argument('--workers', type=int, nargs='+', default=[0, 1, 2],
+                        help="Inference processes per run (0 = predict in-process)")
+    parser.add_argument('--batch', type=int, default=10, help="Rows per predict call")
+    parser.add_argument('--duration', type=float, default=5.0, help="Seconds per run")
+    parser.add_argument('--data', default='sample_data.csv')
+    parser.add_argument('--model', default=DEFAULT_PATH if os.path.isdir(DEFAULT_PATH) else 'stress_model.pkl')
+    args = parser.parse_args()
+
+    # Sessions send bare arrays, as RemoteModel does; a DataFrame-fitted sklearn model warns on each
+    warnings.filterwarnings('ignore', message='X does not have valid feature names')
+    X = feature_frame(pd.read_csv(args.data)).to_numpy(dtype=np.float64)
+    print(f"{args.sessions} sessions, {args.batch} rows per call, {args.duration:g}s per run, "
+          f"{os.cpu_count()} CPUs\n")
+    print(f"{'mode':16} {'rows/s':>10} {'UI p50 ms':>10} {'UI p99 ms':>10}")
+    for workers in args.workers:
+        if workers:
+            service = InferenceService(args.model, workers).start()
+            model, name = RemoteModel(service), f"{workers} process(es)"
+        else:
+            service = None
+            model, name = load_model(args.model, FEATURES), "in-process"
+        try:
+            r = run(model, X, args.sessions, args.batch, args.duration)
+        finally:
+            if service is not None:
+                service.close()
+        print(f"{name:16} {r['rows_per_s']:>10,.0f} {r['ui_p50']:>10.2f} {r['ui_p99']:>10.2f}")
+
+
+if __name__ == '__main__':
+    main()
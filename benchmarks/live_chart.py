@@ -0,0 +1,96 @@
+"""Payload size and CPU time: full live-chart redraws vs incremental frames.
+
+Simulates a session at several sample rates. Every frame (1 / fps
+seconds), the full-redraw path builds the app's 60-point Plotly figure and
+serializes it, as ``st.plotly_chart`` does; the incremental path
+serializes just the samples that arrived since the previous frame, as
+live_chart.LiveChartServer sends them.
+
+Usage (from the repository root):
+    python -m benchmarks.live_chart
+    python -m benchmarks.live_chart --rates 1 10 100 1000 --fps 5 --duration 120
+"""
+import argparse
+import json
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+from live_chart import DEFAULT_WINDOW, chart_delta
+
+
+def full_figure(times, hr, rmssd):
+    """The live monitor's figure, as app.py builds it on every refresh"""
+    fig = go.Figure()
+    fig.add_trace(go.Scatter(x=times, y=hr, name='Heart Rate', line=dict(color='#FF6B6B', width=2), mode='lines'))
+    fig.add_trace(go.Scatter(x=times, y=rmssd, name='HRV (RMSSD)', line=dict(color='#4ECDC4', width=2),
+                             mode='lines', yaxis='y2'))
+    fig.add_hline(y=70, line_dash="dash", line_color="gray", annotation_text="Baseline HR", opacity=0.5)
+    fig.update_layout(
+        height=350,
+        margin=dict(l=20, r=20, t=20, b=20),
+        xaxis=dict(title="Time"),
+        yaxis=dict(title="Heart Rate (BPM)", side='left'),
+        yaxis2=dict(title="HRV (ms)", overlaying='y', side='right'),
+        hovermode='x unified',
+        legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1)
+    )
+    return fig
+
+
+def run(rate, fps, duration, window, data):
+    n = int(rate * duration)
+    start_time = datetime.now()
+    hr = data['HR'].to_numpy()[np.arange(n) % len(data)]
+    rmssd = data['RMSSD'].to_numpy()[np.arange(n) % len(data)]
+    results = [{'seq': i, 'HR': hr[i], 'RMSSD': rmssd[i]} for i in range(n)]
+
+    frames = int(duration * fps)
+    full_bytes = delta_bytes = 0
+    full_time = delta_time = 0.0
+    sent = 0
+    for f in range(1, frames + 1):
+        upto = min(int(f / fps * rate), n)
+        lo = max(upto - window, 0)
+
+        t = time.perf_counter()
+        times = start_time + pd.to_timedelta(np.arange(lo, upto), unit='s')
+        full_bytes += len(full_figure(times, hr[lo:upto], rmssd[lo:upto]).to_json())
+        full_time += time.perf_counter() - t
+
+        t = time.perf_counter()
+        new = results[max(sent, upto - window):upto]
+        if new:
+            delta_bytes += len(json.dumps(chart_delta(new), separators=(',', ':')))
+        delta_time += time.perf_counter() - t
+        sent = upto
+    return frames, full_bytes, full_time, delta_bytes, delta_time
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Full redraw vs incremental live chart")
+    parser.add_argument('--data', default='sample_data.csv')
+    parser.add_argument('--rates', type=float, nargs='+', default=[1, 10, 100], help="Samples per second")
+    parser.add_argument('--fps', type=float, default=5.0, help="Chart frames per second")
+    parser.add_argument('--duration', type=float, default=60.0, help="Simulated session seconds")
+    parser.add_argument('--window', type=int, default=DEFAULT_WINDOW, help="Points shown")
+    args = parser.parse_args()
+
+    data = pd.read_csv(args.data)
+    print(f"{args.duration:g}s session, {args.fps:g} frames/s, {args.window}-point window\n")
+    header = (f"{'rate/s':>7} {'frames':>7} {'full KB/frame':>14} {'delta B/frame':>14} "
+              f"{'full ms/frame':>14} {'delta µs/frame':>15} {'bytes saved':>12}")
+    print(header)
+    print('-' * len(header))
+    for rate in args.rates:
+        frames, full_bytes, full_time, delta_bytes, delta_time = run(rate, args.fps, args.duration, args.window, data)
+        print(f"{rate:>7g} {frames:>7} {full_bytes / frames / 1e3:>14.1f} {delta_bytes / frames:>14.0f} "
+              f"{full_time / frames * 1e3:>14.2f} {delta_time / frames * 1e6:>15.1f} "
+              f"{1 - delta_bytes / full_bytes:>12.1%}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+"""Load generator for monitor_server.py.
+
+Replays sample_data.csv as N synthetic subjects, each on its own
+connection, and reports sustained throughput and round-trip latency.
+
+Usage (from the repository root, with the server running):
+    python -m benchmarks.loadgen --subjects 50 --rate 1 --duration 30
+    python -m benchmarks.loadgen --subjects 50 --rate 0     # as fast as possible
+"""
+import argparse
+import asyncio
+import json
+import time
+
+import numpy as np
+import pandas as pd
+
+FEATURES = ['MEAN_RR', 'RMSSD', 'LF_HF', 'HR']
+
+
+async def run_subject(k, rows, args, latencies, counters, stop_at):
+    reader, writer = await asyncio.open_connection(args.host, args.port)
+    inflight = asyncio.Semaphore(args.inflight)
+    subject = f"subject-{k:03d}"
+    offset = (k * 37) % len(rows)  # Desynchronize the replays
+
+    async def receive():
+        while True:
+            line = await reader.readline()
+            if not line:
+                return
+            reply = json.loads(line)
+            if 'error' in reply:
+                counters['errors'] += 1
+            else:
+                latencies.append(time.monotonic() - reply['t'])
+                counters['received'] += 1
+            inflight.release()
+
+    receiver = asyncio.create_task(receive())
+    period = 1.0 / args.rate if args.rate > 0 else 0.0
+    next_send = time.monotonic()
+    i = 0
+    while time.monotonic() < stop_at:
+        await inflight.acquire()
+        if period:
+            delay = next_send - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            next_send += period
+        sample = dict(zip(FEATURES, rows[(offset + i) % len(rows)]))
+        sample['subject'] = subject
+        sample['t'] = time.monotonic()
+        writer.write((json.dumps(sample) + '\n').encode())
+        await writer.drain()
+        counters['sent'] += 1
+        i += 1
+
+    # Wait for outstanding replies before hanging up
+    try:
+        for _ in range(args.inflight):
+            await asyncio.wait_for(inflight.acquire(), timeout=5.0)
+    except asyncio.TimeoutError:
+        pass
+    receiver.cancel()
+    writer.close()
+
+
+async def fetch_stats(args):
+    reader, writer = await asyncio.open_connection(args.host, args.port)
+    writer.write(b'{"cmd": "stats"}\n')
+    await writer.drain()
+    stats = json.loads(await reader.readline())
+    writer.close()
+    return stats
+
+
+async def run(args):
+    rows = pd.read_csv(args.data)[FEATURES].to_numpy().tolist()
+    latencies = []
+    counters = {'sent': 0, 'received': 0, 'errors': 0}
+    start = time.monotonic()
+    stop_at = start + args.duration
+    await asyncio.gather(*(
+        run_subject(k, rows, args, latencies, counters, stop_at) for k in range(args.subjects)
+    ))
+    elapsed = time.monotonic() - start
+    stats = await fetch_stats(args)
+
+    lat_ms = np.array(latencies) * 1000
+    print(f"Subjects:        {args.subjects}")
+    print(f"Samples:         {counters['sent']} sent, {counters['received']} answered, {counters['errors']} errors")
+    print(f"Throughput:      {counters['received'] / elapsed:,.0f} samples/s over {elapsed:.1f}s")
+    if len(lat_ms):
+        print(f"Latency (ms):    p50 {np.percentile(lat_ms, 50):.2f}  p99 {np.percentile(lat_ms, 99):.2f}  max {lat_ms.max():.2f}")
+    print(f"Server batches:  {stats['batches']} (mean size {stats['mean_batch']:.1f})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay sample_data.csv as many concurrent subjects")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--data', default='sample_data.csv')
+    parser.add_argument('--subjects', type=int, default=20)
+    parser.add_argument('--rate', type=float, default=1.0, help="Samples/sec per subject; 0 = as fast as possible")
+    parser.add_argument('--inflight', type=int, default=8, help="Unanswered samples allowed per subject")
+    parser.add_argument('--duration', type=float, default=10.0, help="Seconds to run")
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+"""Cost and effect of per-subject label smoothing.
+
+Decoding cost: every tick, each of N subjects delivers one probability row
+and the whole tick is folded in with one ProbaSmoother.update call, as the
+monitoring server does with a micro-batch. Also times one-row calls, as the
+live monitor makes them.
+
+Effect: replays sample_data.csv through the model and counts how often the
+displayed condition changes, raw vs smoothed.
+
+Usage (from the repository root):
+    python -m benchmarks.smoothing
+    python -m benchmarks.smoothing --subjects 1000 10000 50000 --ticks 50
+"""
+import argparse
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from forest import DEFAULT_PATH, load_model
+from inference import FEATURES, score_batch
+from smoothing import DEFAULT_ALPHA, DEFAULT_MIN_DWELL, ProbaSmoother
+
+
+def switches(labels):
+    labels = np.asarray(labels)
+    return int((labels[1:] != labels[:-1]).sum())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Label smoothing cost and flicker reduction")
+    parser.add_argument('--subjects', type=int, nargs='+', default=[100, 1000, 10000])
+    parser.add_argument('--ticks', type=int, default=20, help="Samples per subject")
+    parser.add_argument('--alpha', type=float, default=DEFAULT_ALPHA)
+    parser.add_argument('--min-dwell', type=int, default=DEFAULT_MIN_DWELL)
+    parser.add_argument('--data', default='sample_data.csv')
+    parser.add_argument('--model', default=DEFAULT_PATH if os.path.isdir(DEFAULT_PATH) else 'stress_model.pkl')
+    args = parser.parse_args()
+
+    classes = ['interruption', 'no stress', 'time pressure']
+    rng = np.random.default_rng(0)
+    print(f"alpha={args.alpha}, min_dwell={args.min_dwell}\n")
+    print(f"{'subjects':>9} {'ms/tick':>9} {'ns/sample':>10}")
+    for n in args.subjects:
+        smoother = ProbaSmoother(classes, args.alpha, args.min_dwell)
+        subjects = [f"s{i}" for i in range(n)]
+        proba = rng.dirichlet(np.ones(len(classes)), size=(args.ticks, n))
+        smoother.update(subjects, proba[0])  # register subjects outside the timing
+        start = time.perf_counter()
+        for tick in range(1, args.ticks):
+            smoother.update(subjects, proba[tick])
+        elapsed = (time.perf_counter() - start) / (args.ticks - 1)
+        print(f"{n:>9,} {elapsed * 1e3:>9.2f} {elapsed / n * 1e9:>10.0f}")
+
+    smoother = ProbaSmoother(classes, args.alpha, args.min_dwell)
+    rows = rng.dirichlet(np.ones(len(classes)), size=2000)
+    start = time.perf_counter()
+    for row in rows:
+        smoother.update(['session'], row)
+    print(f"\nOne-row calls: {(time.perf_counter() - start) / len(rows) * 1e6:.1f} µs/sample")
+
+    data = pd.read_csv(args.data)
+    model = load_model(args.model, FEATURES)
+    raw, proba = score_batch(model, data)
+    smoothed = ProbaSmoother(model.classes_, args.alpha, args.min_dwell).update_labels(['session'] * len(raw), proba)
+    print(f"\n{args.data} replay ({len(raw)} samples): {switches(raw)} raw condition changes, "
+          f"{switches(smoothed)} smoothed ({(smoothed == raw).mean():.1%} of labels unchanged)")
+
+
+if __name__ == '__main__':
+    main()
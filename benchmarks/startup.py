@@ -0,0 +1,79 @@
+"""Cold-start benchmark: import time and model-load time, measured separately.
+
+Every measurement runs in a fresh interpreter so nothing is already
+imported or cached; the median of several runs is reported. Model loads
+are timed after their imports (sklearn for the pickle), so the two costs
+do not blur together.
+
+Usage (from the repository root):
+    python -m benchmarks.startup
+    python -m benchmarks.startup --runs 10 --pickle stress_model.pkl --compiled stress_model_forest
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+from forest import DEFAULT_PATH
+
+IMPORTS = [
+    ('numpy', 'import numpy'),
+    ('pandas', 'import pandas'),
+    ('streamlit', 'import streamlit'),
+    ('plotly (deferred in app)', 'import plotly.express, plotly.graph_objects'),
+    ('sklearn (pickle only)', 'import sklearn.ensemble'),
+    ('app modules', 'import forest, inference, history, aggregates, dataset_store, ingest'),
+]
+
+# Run in the child: `setup` untimed, then `stmt` timed
+CHILD = """
+import json, time
+{setup}
+start = time.perf_counter()
+{stmt}
+print(json.dumps(time.perf_counter() - start))
+"""
+
+
+def time_in_fresh_process(stmt, setup='', runs=5):
+    """Median seconds of stmt across fresh interpreters"""
+    code = CHILD.format(setup=setup, stmt=stmt)
+    timings = []
+    for _ in range(runs):
+        out = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True)
+        timings.append(json.loads(out.stdout.strip().splitlines()[-1]))
+    timings.sort()
+    return timings[len(timings) // 2]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure cold import and model-load times")
+    parser.add_argument('--runs', type=int, default=5, help="Fresh interpreters per measurement")
+    parser.add_argument('--pickle', default='stress_model.pkl')
+    parser.add_argument('--compiled', default=DEFAULT_PATH)
+    args = parser.parse_args()
+
+    print("Imports (cold)")
+    for name, stmt in IMPORTS:
+        print(f"  {name:<28} {time_in_fresh_process(stmt, runs=args.runs) * 1e3:8.1f} ms")
+
+    print("\nModel load (imports excluded)")
+    loads = []
+    if os.path.exists(args.pickle):
+        loads.append(('pickle (sklearn)', 'import pickle, sklearn.ensemble',
+                      f"pickle.load(open({args.pickle!r}, 'rb'))"))
+    if os.path.isdir(args.compiled):
+        loads.append(('compiled forest (mmap)', 'from forest import CompiledForest',
+                      f"CompiledForest.load({args.compiled!r})"))
+        # First prediction after a mmap load pays for paging the trees in
+        loads.append(('  + first prediction', f"from forest import CompiledForest; m = CompiledForest.load({args.compiled!r})",
+                      "m.predict_proba([[800.0, 20.0, 1.0, 75.0]])"))
+    if not loads:
+        raise SystemExit(f"No model found at {args.pickle} or {args.compiled}")
+    for name, setup, stmt in loads:
+        print(f"  {name:<28} {time_in_fresh_process(stmt, setup, args.runs) * 1e3:8.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
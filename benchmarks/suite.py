@@ -0,0 +1,285 @@
+"""Headless benchmark suite, one layer of the pipeline at a time.
+
+Measures, at several session lengths (sample_data.csv looped to length,
+at 1 Hz):
+
+    features     feature_frame on a DataFrame, and on records as the ingest worker builds it
+    predict      one-row calls (as the old live loop made them) and whole-session batches,
+                 for the pickled sklearn forest and the compiled forest
+    aggregate    session stats and per-condition summary: the old DataFrame path
+                 (calculate_session_stats + groupby) vs SessionAggregator, plus EpisodeIndex
+    figures      the live chart (60 points), the report's timeline with every sample (the
+                 old figure) and decimated, and the pie, built and serialized to JSON as
+                 st.plotly_chart does
+    export       the old in-memory CSV export vs streaming CSV / gzip CSV / Parquet
+                 from the session store
+
+Each case reports the median of --repeat runs. Results, with the commit and
+library versions, are written as JSON; --compare prints the ratio against
+an earlier results file.
+
+Usage (from the repository root):
+    python -m benchmarks.suite
+    python -m benchmarks.suite --rows 300 10000 100000 1000000 -o bench_before.json
+    python -m benchmarks.suite --layers predict aggregate --compare bench_before.json
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from aggregates import SessionAggregator
+from decimate import DEFAULT_MAX_POINTS, decimate
+from episodes import EpisodeIndex
+from export import FORMATS, export
+from forest import DEFAULT_PATH, CompiledForest, load_model
+from history import SessionHistory
+from inference import FEATURES, feature_frame, score_batch
+from session_store import SessionStore
+
+DEFAULT_ROWS = [300, 10000, 100000, 1000000]
+LAYERS = ['features', 'predict', 'aggregate', 'figures', 'export']
+SINGLE_CALLS = 200  # one-row predictions timed per model (per-row cost does not depend on length)
+COLORS = {"no stress": "#00CC96", "interruption": "#FFA500", "time pressure": "#EF553B"}
+
+
+def timed(fn, repeat):
+    """Median wall time of fn() over repeat runs"""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def session(data, n, model):
+    """An n-row session (the recording looped): raw rows, model features, labels and probabilities"""
+    raw = data.iloc[np.arange(n) % len(data)].reset_index(drop=True)
+    X = feature_frame(raw)
+    labels, proba = score_batch(model, X)
+    frame = pd.DataFrame({
+        'Time': pd.Timestamp(datetime(2026, 1, 1, 9)) + pd.to_timedelta(np.arange(n), unit='s'),
+        'Heart Rate': X['HR'].to_numpy(),
+        'HRV (RMSSD)': X['RMSSD'].to_numpy(),
+        'LF/HF': X['LF_HF'].to_numpy(),
+        'Condition': labels,
+    })
+    return raw, X, labels, proba, frame
+
+
+def calculate_session_stats(history_df):
+    """The report's original DataFrame implementation, kept as the baseline"""
+    return {
+        'duration': (history_df['Time'].max() - history_df['Time'].min()).total_seconds(),
+        'avg_hr': history_df['Heart Rate'].mean(),
+        'max_hr': history_df['Heart Rate'].max(),
+        'min_hr': history_df['Heart Rate'].min(),
+        'avg_hrv': history_df['HRV (RMSSD)'].mean(),
+        'stress_percentage': (history_df['Condition'] != 'no stress').sum() / len(history_df) * 100,
+    }
+
+
+def groupby_summary(history_df):
+    return history_df.groupby('Condition').agg({
+        'Heart Rate': ['mean', 'std', 'min', 'max'],
+        'HRV (RMSSD)': ['mean', 'std'],
+        'LF/HF': 'mean',
+    }).round(2)
+
+
+def bench_features(n, ctx, repeat):
+    raw = ctx['raw']
+    records = raw[FEATURES].head(min(n, 256)).to_dict('records')
+    yield 'feature_frame', n, timed(lambda: feature_frame(raw), repeat)
+    yield 'records_batch_256', len(records), timed(lambda: feature_frame(pd.DataFrame.from_records(records)), repeat)
+
+
+def bench_predict(n, ctx, repeat):
+    X = ctx['X']
+    for name, model in ctx['models'].items():
+        rows = [X.iloc[[k]] for k in range(min(n, SINGLE_CALLS))]
+        yield f'{name}_single', len(rows), timed(lambda: [model.predict_proba(row) for row in rows], repeat)
+        yield f'{name}_batch', n, timed(lambda: score_batch(model, X), repeat)
+
+
+def bench_aggregate(n, ctx, repeat):
+    frame, X, labels = ctx['frame'], ctx['X'], ctx['labels']
+    t = np.arange(n, dtype=np.float64)
+
+    def aggregator():
+        aggregates = SessionAggregator()
+        aggregates.update_batch(t, X['HR'], X['RMSSD'], X['LF_HF'], labels)
+        aggregates.stats()
+        aggregates.summary()
+
+    def episodes():
+        index = EpisodeIndex()
+        index.update_batch(t, X['HR'], X['RMSSD'], labels)
+        index.to_frame()
+
+    def history():
+        history = SessionHistory(ctx['classes'], max(n, 1))
+        codes = np.searchsorted(ctx['classes'], labels)
+        history.extend(t, X['HR'], X['RMSSD'], X['LF_HF'], codes, ctx['proba'])
+        history.to_frame(datetime(2026, 1, 1, 9))
+
+    yield 'dataframe_stats_groupby', n, timed(lambda: (calculate_session_stats(frame), groupby_summary(frame)), repeat)
+    yield 'aggregator_batch', n, timed(aggregator, repeat)
+    yield 'episodes_batch', n, timed(episodes, repeat)
+    yield 'history_extend_to_frame', n, timed(history, repeat)
+
+
+def bench_figures(n, ctx, repeat):
+    import plotly.express as px
+    import plotly.graph_objects as go
+    frame = ctx['frame']
+
+    def live():
+        recent = frame.tail(60)
+        fig = go.Figure()
+        fig.add_trace(go.Scatter(x=recent['Time'], y=recent['Heart Rate'], name='Heart Rate', mode='lines'))
+        fig.add_trace(go.Scatter(x=recent['Time'], y=recent['HRV (RMSSD)'], name='HRV (RMSSD)',
+                                 mode='lines', yaxis='y2'))
+        fig.update_layout(height=350, yaxis2=dict(overlaying='y', side='right'))
+        fig.to_json()
+
+    def timeline_full():
+        fig = px.scatter(frame, x='Time', y='Heart Rate', color='Condition', color_discrete_map=COLORS)
+        fig.to_json()
+
+    def timeline():
+        keep = decimate(np.arange(n, dtype=np.float64), frame['Heart Rate'].to_numpy(),
+                        frame['Condition'].to_numpy(), DEFAULT_MAX_POINTS)
+        fig = px.scatter(frame.iloc[keep], x='Time', y='Heart Rate', color='Condition',
+                         color_discrete_map=COLORS)
+        fig.to_json()
+
+    def pie():
+        counts = frame['Condition'].value_counts()
+        px.pie(values=counts.values, names=counts.index, color=counts.index,
+               color_discrete_map=COLORS).to_json()
+
+    yield 'live_chart', min(n, 60), timed(live, repeat)
+    yield 'report_timeline_full', n, timed(timeline_full, repeat)
+    yield 'report_timeline_decimated', n, timed(timeline, repeat)
+    yield 'report_pie', n, timed(pie, repeat)
+
+
+def bench_export(n, ctx, repeat):
+    frame, store, session_id = ctx['frame'], ctx['store'], ctx['session_id']
+    yield 'dataframe_to_csv', n, timed(lambda: frame.to_csv(index=False).encode('utf-8'), repeat)
+    for fmt in FORMATS:
+        def stream():
+            with open(os.devnull, 'wb') as f:
+                export(store, session_id, f, fmt)
+        yield f'stream_{fmt}', n, timed(stream, repeat)
+
+
+BENCHES = {
+    'features': bench_features,
+    'predict': bench_predict,
+    'aggregate': bench_aggregate,
+    'figures': bench_figures,
+    'export': bench_export,
+}
+
+
+def environment():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                                text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    import plotly
+    import sklearn
+    return {
+        'commit': commit,
+        'date': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'versions': {'numpy': np.__version__, 'pandas': pd.__version__,
+                     'scikit-learn': sklearn.__version__, 'plotly': plotly.__version__},
+    }
+
+
+def compare(results, path):
+    with open(path) as f:
+        before = {(r['layer'], r['case'], r['session_rows']): r['seconds'] for r in json.load(f)['results']}
+    print(f"\nCompared with {path} (ratio > 1: slower now)")
+    print(f"{'layer':10} {'case':28} {'session':>9} {'before ms':>10} {'now ms':>10} {'ratio':>7}")
+    for r in results:
+        old = before.get((r['layer'], r['case'], r['session_rows']))
+        if old:
+            print(f"{r['layer']:10} {r['case']:28} {r['session_rows']:>9,} {old * 1e3:>10.2f} "
+                  f"{r['seconds'] * 1e3:>10.2f} {r['seconds'] / old:>7.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-layer benchmarks at several session lengths")
+    parser.add_argument('--rows', type=int, nargs='+', default=DEFAULT_ROWS, help="Session lengths")
+    parser.add_argument('--layers', nargs='+', choices=LAYERS, default=LAYERS)
+    parser.add_argument('--repeat', type=int, default=3, help="Runs per case (median reported)")
+    parser.add_argument('--data', default='sample_data.csv')
+    parser.add_argument('--pickle', default='stress_model.pkl')
+    parser.add_argument('--compiled', default=DEFAULT_PATH)
+    parser.add_argument('-o', '--output', help="JSON results file (default: bench_<commit>.json)")
+    parser.add_argument('--compare', metavar='JSON', help="Earlier results to compare against")
+    args = parser.parse_args()
+
+    models = {}
+    if os.path.exists(args.pickle):
+        models['sklearn'] = load_model(args.pickle, FEATURES)
+    if os.path.exists(args.compiled):
+        models['compiled'] = load_model(args.compiled, FEATURES)
+    elif 'sklearn' in models:
+        models['compiled'] = CompiledForest.from_sklearn(models['sklearn'], fallback=False)
+    if not models:
+        sys.exit(f"No model found at {args.pickle} or {args.compiled}")
+    reference = models.get('compiled') or models['sklearn']
+    classes = np.asarray(reference.classes_).astype(str)
+
+    data = pd.read_csv(args.data)
+    env = environment()
+    results = []
+    print(f"{'layer':10} {'case':28} {'rows':>9} {'ms':>10} {'µs/row':>9}")
+    with tempfile.TemporaryDirectory() as tmp:
+        store = SessionStore(os.path.join(tmp, 'bench.db'))
+        for n in args.rows:
+            raw, X, labels, proba, frame = session(data, n, reference)
+            ctx = {'raw': raw, 'X': X, 'labels': labels, 'proba': proba, 'frame': frame,
+                   'models': models, 'classes': classes, 'store': store}
+            if 'export' in args.layers:
+                writer = store.start_session('bench', datetime(2026, 1, 1, 9), classes)
+                writer.extend(np.arange(n), X['HR'].to_numpy(), X['RMSSD'].to_numpy(), X['LF_HF'].to_numpy(),
+                              labels, proba)
+                writer.close()
+                ctx['session_id'] = writer.session_id
+            for layer in args.layers:
+                for case, rows, seconds in BENCHES[layer](n, ctx, args.repeat):
+                    result = {'layer': layer, 'case': case, 'session_rows': n, 'rows': rows,
+                              'seconds': seconds, 'us_per_row': seconds / max(rows, 1) * 1e6}
+                    results.append(result)
+                    print(f"{layer:10} {case:28} {rows:>9,} {seconds * 1e3:>10.2f} {result['us_per_row']:>9.2f}")
+        store.close()
+
+    output = args.output or f"bench_{env['commit'] or 'local'}.json"
+    with open(output, 'w') as f:
+        json.dump({**env, 'repeat': args.repeat, 'results': results}, f, indent=2)
+    print(f"\nResults written to {output}")
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,161 @@
+"""Memory-mapped columnar store for the SWELL feature datasets.
+
+Converts a CSV (train.csv, sample_data.csv) once into a directory holding
+one ``.npy`` file per column plus ``meta.json``. Loading then memory-maps
+only the requested columns: no float parsing, and untouched columns are
+never read. Text columns such as ``condition`` are stored as integer codes
+with their categories in the metadata.
+
+Usage:
+    python dataset_store.py train.csv                # -> train_store/
+    python dataset_store.py sample_data.csv --columns MEAN_RR RMSSD LF_HF HR condition
+"""
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+FORMAT_VERSION = 1
+
+# What the app and the training cell actually use
+DEFAULT_COLUMNS = ['MEAN_RR', 'RMSSD', 'LF_HF', 'HR', 'condition']
+
+
+def default_store_path(csv_path):
+    """train.csv -> train_store"""
+    return os.path.splitext(csv_path)[0] + '_store'
+
+
+def count_csv_rows(csv_path):
+    """Data rows in a CSV (newline count minus the header)"""
+    lines = 0
+    last = b'\n'
+    with open(csv_path, 'rb') as f:
+        while True:
+            block = f.read(1 << 24)
+            if not block:
+                break
+            lines += block.count(b'\n')
+            last = block[-1:]
+    if last != b'\n':
+        lines += 1
+    return max(lines - 1, 0)
+
+
+def convert(csv_path, store_path=None, columns=None, chunksize=100_000):
+    """Stream a CSV into a columnar store; returns the store path"""
+    store_path = store_path or default_store_path(csv_path)
+    os.makedirs(store_path, exist_ok=True)
+    n_rows = count_csv_rows(csv_path)
+
+    arrays = {}
+    meta = {'format_version': FORMAT_VERSION, 'rows': n_rows, 'source': os.path.basename(csv_path), 'columns': {}}
+    categories = {}
+    offset = 0
+
+    for chunk in pd.read_csv(csv_path, usecols=columns, chunksize=chunksize):
+        if not arrays:
+            # Column layout is fixed by the first chunk
+            for name in chunk.columns:
+                series = chunk[name]
+                if pd.api.types.is_numeric_dtype(series):
+                    dtype = np.int64 if pd.api.types.is_integer_dtype(series) else np.float64
+                    meta['columns'][name] = {'dtype': np.dtype(dtype).name}
+                else:
+                    dtype = np.int16
+                    categories[name] = {}
+                    meta['columns'][name] = {'dtype': np.dtype(dtype).name, 'categories': []}
+                arrays[name] = np.lib.format.open_memmap(
+                    os.path.join(store_path, f'{name}.npy'), mode='w+', dtype=dtype, shape=(n_rows,)
+                )
+
+        stop = offset + len(chunk)
+        for name, out in arrays.items():
+            series = chunk[name]
+            if name in categories:
+                mapping = categories[name]
+                for value in series.dropna().unique():
+                    mapping.setdefault(value, len(mapping))
+                out[offset:stop] = series.map(mapping).fillna(-1).to_numpy(dtype=out.dtype)
+            else:
+                if out.dtype.kind == 'i' and series.isna().any():
+                    raise ValueError(f"Column {name!r} is integer in the first chunk but has missing values later")
+                out[offset:stop] = series.to_numpy(dtype=out.dtype)
+        offset = stop
+
+    for name, out in arrays.items():
+        out.flush()
+    for name, mapping in categories.items():
+        meta['columns'][name]['categories'] = [str(value) for value in mapping]
+    with open(os.path.join(store_path, 'meta.json'), 'w') as f:
+        json.dump(meta, f, indent=2)
+    return store_path
+
+
+def read_meta(store_path):
+    with open(os.path.join(store_path, 'meta.json')) as f:
+        meta = json.load(f)
+    if meta.get('format_version') != FORMAT_VERSION:
+        raise ValueError(f"Unsupported dataset store version {meta.get('format_version')} in {store_path}")
+    return meta
+
+
+def load_columns(store_path, columns=None, mmap=True):
+    """Dict of column arrays (memory-mapped by default); categorical columns stay as codes"""
+    meta = read_meta(store_path)
+    columns = list(meta['columns']) if columns is None else columns
+    missing = [name for name in columns if name not in meta['columns']]
+    if missing:
+        raise KeyError(f"Columns not in {store_path}: {missing}")
+    return {
+        name: np.load(os.path.join(store_path, f'{name}.npy'), mmap_mode='r' if mmap else None)
+        for name in columns
+    }
+
+
+def load_frame(store_path, columns=DEFAULT_COLUMNS):
+    """DataFrame of the requested columns, with text columns as pandas Categoricals"""
+    meta = read_meta(store_path)
+    arrays = load_columns(store_path, columns)
+    data = {}
+    for name, values in arrays.items():
+        cats = meta['columns'][name].get('categories')
+        if cats is not None:
+            data[name] = pd.Categorical.from_codes(np.asarray(values), categories=cats)
+        else:
+            data[name] = values
+    return pd.DataFrame(data)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert a CSV dataset into a memory-mappable columnar store")
+    parser.add_argument('csv', help="Input CSV (e.g. train.csv)")
+    parser.add_argument('store', nargs='?', help="Output directory (default: <name>_store)")
+    parser.add_argument('--columns', nargs='+', help="Only store these columns (default: all)")
+    parser.add_argument('--chunksize', type=int, default=100_000, help="CSV rows parsed per chunk")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    store = convert(args.csv, args.store, args.columns, args.chunksize)
+    convert_time = time.perf_counter() - start
+
+    meta = read_meta(store)
+    size = sum(os.path.getsize(os.path.join(store, f'{name}.npy')) for name in meta['columns'])
+    print(f"Wrote {meta['rows']:,} rows x {len(meta['columns'])} columns to {store} "
+          f"({size / 1e6:.1f} MB) in {convert_time:.1f}s")
+
+    columns = [name for name in DEFAULT_COLUMNS if name in meta['columns']]
+    start = time.perf_counter()
+    pd.read_csv(args.csv, usecols=columns)
+    csv_time = time.perf_counter() - start
+    start = time.perf_counter()
+    load_frame(store, columns)
+    store_time = time.perf_counter() - start
+    print(f"Loading {columns}: CSV {csv_time * 1e3:.0f} ms, store {store_time * 1e3:.0f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,141 @@
+"""Downsampling of long session timelines for plotting.
+
+An 8-hour session at 1 Hz is 28,800 samples, far more markers than a chart
+a few hundred pixels wide can show. ``decimate`` picks at most
+``max_points`` sample indices with Largest-Triangle-Three-Buckets (keeps
+the visual shape) or min/max bucketing (keeps every extreme), per run of
+constant condition: the first and last sample of every run are kept, so
+condition transitions stay exactly where they happened. A condition that
+flickers can have more transitions than that allows; its shortest runs
+are then merged into mixed segments, decimated like any other run, so
+the cap holds at the cost of some brief episodes.
+
+Usage:
+    python -m benchmarks.decimate
+"""
+import numpy as np
+
+DEFAULT_MAX_POINTS = 2000
+
+
+def condition_runs(condition):
+    """(start, stop) index pairs of consecutive equal values"""
+    condition = np.asarray(condition)
+    if not len(condition):
+        return []
+    edges = np.flatnonzero(condition[1:] != condition[:-1]) + 1
+    starts = np.concatenate([[0], edges])
+    stops = np.concatenate([edges, [len(condition)]])
+    return list(zip(starts.tolist(), stops.tolist()))
+
+
+def lttb(x, y, n_out):
+    """Indices of n_out points chosen by Largest-Triangle-Three-Buckets"""
+    n = len(x)
+    if n_out >= n or n < 3:
+        return np.arange(n)
+    if n_out < 3:
+        return np.array([0, n - 1])[:n_out]
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    # Interior points split into n_out - 2 buckets; endpoints are always kept
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.intp)
+    selected = np.empty(n_out, dtype=np.intp)
+    selected[0] = 0
+    selected[-1] = n - 1
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        # Third vertex: the average of the next bucket (the last point for the final one)
+        if i + 2 < len(edges):
+            nxt = slice(edges[i + 1], edges[i + 2])
+            cx, cy = x[nxt].mean(), y[nxt].mean()
+        else:
+            cx, cy = x[-1], y[-1]
+        area = np.abs((x[a] - cx) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (cy - y[a]))
+        a = lo + int(np.argmax(area))
+        selected[i + 1] = a
+    return selected
+
+
+def minmax(y, n_out):
+    """Indices of the endpoints and the minimum and maximum of (n_out - 2) // 2 equal buckets"""
+    n = len(y)
+    if n_out >= n:
+        return np.arange(n)
+    if n_out < 4:
+        return np.array([0, n - 1])[:n_out]
+    n_buckets = (n_out - 2) // 2
+    bucket = np.arange(n) * n_buckets // n
+    order = np.lexsort((np.asarray(y), bucket))
+    # Sorted by (bucket, y): each bucket's first entry is its min, its last its max
+    first = np.flatnonzero(np.r_[True, bucket[order][1:] != bucket[order][:-1]])
+    last = np.r_[first[1:] - 1, n - 1]
+    return np.unique(np.concatenate([[0, n - 1], order[first], order[last]]))
+
+
+METHODS = {'lttb': lambda x, y, k: lttb(x, y, k), 'minmax': lambda x, y, k: minmax(y, k)}
+
+
+def merge_short_runs(runs, max_segments):
+    """Merge consecutive short runs so that at most max_segments (start, stop) segments remain.
+
+    "Short" is below the smallest length threshold that is enough; runs at
+    least that long stay segments of their own.
+    """
+    starts = np.array([start for start, _ in runs])
+    stops = np.array([stop for _, stop in runs])
+    lengths = stops - starts
+
+    def segment_starts(threshold):
+        short = lengths < threshold
+        # A segment begins at every long run and at the first of each block of short runs
+        return np.flatnonzero(~short | np.r_[True, ~short[:-1]])
+
+    # Merging more runs never adds segments, so bisect over the candidate thresholds
+    thresholds = np.unique(lengths) + 1
+    lo, hi = 0, len(thresholds) - 1
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if len(segment_starts(thresholds[mid])) <= max_segments:
+            hi = mid
+        else:
+            lo = mid + 1
+    first = segment_starts(thresholds[lo])
+    return list(zip(starts[first].tolist(), np.r_[starts[first[1:]], stops[-1]].tolist()))
+
+
+def decimate(x, y, condition, max_points=DEFAULT_MAX_POINTS, method='lttb'):
+    """Sorted indices of at most max_points samples, keeping condition transitions.
+
+    The point budget is shared between condition runs in proportion to
+    their length; every run keeps at least its first and last sample. If
+    there are more than max_points // 2 runs, short ones are merged first
+    (merge_short_runs) and only the transitions between the remaining
+    segments are guaranteed.
+    """
+    n = len(x)
+    if n <= max_points:
+        return np.arange(n)
+    pick = METHODS[method]
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    runs = condition_runs(condition)
+    if 2 * len(runs) > max_points:
+        runs = merge_short_runs(runs, max(max_points // 2, 1))
+    spare = max(max_points - 2 * len(runs), 0)
+    keep = []
+    for start, stop in runs:
+        length = stop - start
+        # Both methods keep the endpoints within the budget
+        budget = min(2 + spare * length // n, max_points)
+        if length <= budget:
+            keep.append(np.arange(start, stop))
+        else:
+            keep.append(start + pick(x[start:stop], y[start:stop], budget))
+    return np.unique(np.concatenate(keep))
+
+
+def visible_range(x, low, high):
+    """Slice of the sorted array x with low <= x <= high"""
+    return slice(int(np.searchsorted(x, low, side='left')), int(np.searchsorted(x, high, side='right')))
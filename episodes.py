@@ -0,0 +1,94 @@
+"""Run-length-encoded index of condition episodes.
+
+Consecutive predictions with the same condition form one episode. The
+index is extended as predictions arrive (O(1) per sample), so report
+questions such as "longest time-pressure episode" or "episodes over 30 s"
+and the timeline shading work on a handful of episodes rather than
+rescanning every sample.
+
+Times are seconds since the start of the session. An episode's ``end`` is
+the start of the next episode (so durations add up to the session
+duration); for the episode still in progress it is its latest sample.
+"""
+import numpy as np
+import pandas as pd
+
+from decimate import condition_runs
+
+EPISODE_COLUMNS = ['start', 'end', 'condition', 'duration', 'samples', 'mean_hr', 'mean_rmssd']
+
+
+class EpisodeIndex:
+    """Episodes of constant condition, built incrementally"""
+
+    def __init__(self):
+        self.closed = []  # tuples in EPISODE_COLUMNS order
+        self._open = None  # [start, last_time, condition, samples, sum_hr, sum_rmssd]
+
+    def __len__(self):
+        return len(self.closed) + (self._open is not None)
+
+    def update(self, time, hr, rmssd, condition):
+        time, hr, rmssd, condition = float(time), float(hr), float(rmssd), str(condition)
+        current = self._open
+        if current is not None and current[2] == condition:
+            current[1] = time
+            current[3] += 1
+            current[4] += hr
+            current[5] += rmssd
+            return
+        if current is not None:
+            self._close(end=time)
+        self._open = [time, time, condition, 1, hr, rmssd]
+
+    def update_batch(self, time, hr, rmssd, condition):
+        """Fold arrays of samples in at once (one step per run, not per sample)"""
+        time = np.asarray(time, dtype=np.float64)
+        hr = np.asarray(hr, dtype=np.float64)
+        rmssd = np.asarray(rmssd, dtype=np.float64)
+        condition = np.asarray(condition).astype(str)
+        for start, stop in condition_runs(condition):
+            name = condition[start]
+            current = self._open
+            if current is not None and current[2] == name:
+                current[1] = float(time[stop - 1])
+            else:
+                if current is not None:
+                    self._close(end=float(time[start]))
+                current = self._open = [float(time[start]), float(time[stop - 1]), name, 0, 0.0, 0.0]
+            current[3] += stop - start
+            current[4] += float(hr[start:stop].sum())
+            current[5] += float(rmssd[start:stop].sum())
+
+    def _close(self, end):
+        self.closed.append(self._record(self._open, end))
+        self._open = None
+
+    @staticmethod
+    def _record(episode, end):
+        start, _, condition, samples, sum_hr, sum_rmssd = episode
+        return (start, end, condition, end - start, samples, sum_hr / samples, sum_rmssd / samples)
+
+    def episodes(self):
+        """All episodes as tuples, including the one in progress"""
+        if self._open is None:
+            return list(self.closed)
+        return self.closed + [self._record(self._open, self._open[1])]
+
+    def to_frame(self):
+        return pd.DataFrame(self.episodes(), columns=EPISODE_COLUMNS)
+
+    def query(self, condition=None, min_duration=0.0):
+        """Episodes of a condition (any by default) lasting at least min_duration seconds"""
+        frame = self.to_frame()
+        mask = frame['duration'] >= min_duration
+        if condition is not None:
+            mask &= frame['condition'] == condition
+        return frame[mask]
+
+    def longest(self, condition=None):
+        """The longest episode (of a condition) as a Series, or None"""
+        frame = self.query(condition)
+        if frame.empty:
+            return None
+        return frame.loc[frame['duration'].idxmax()]
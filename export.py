@@ -0,0 +1,152 @@
+"""Streaming export of stored sessions as CSV, gzip-compressed CSV or Parquet.
+
+Rows are read from the session store in fixed-size chunks and encoded one
+chunk at a time, so memory use depends on ``chunk_rows``, not on the length
+of the session. Columns follow the report layout (Time, Heart Rate,
+HRV (RMSSD), LF/HF, Condition) followed by one probability column per
+class.
+
+Usage:
+    python export.py 3 -o session_3.parquet
+    python export.py 3 --format csv.gz -o session_3.csv.gz --db sessions.db
+"""
+import argparse
+import io
+import zlib
+
+import numpy as np
+import pandas as pd
+
+from inference import proba_columns
+from session_store import DEFAULT_PATH, SessionStore
+
+FORMATS = {
+    'csv': ('csv', 'text/csv'),
+    'csv.gz': ('csv.gz', 'application/gzip'),
+    'parquet': ('parquet', 'application/vnd.apache.parquet'),
+}
+DEFAULT_CHUNK_ROWS = 10000
+
+
+def frames(store, session_id, start=None, end=None, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """Yield the session's rows as report-layout DataFrames of at most chunk_rows rows"""
+    info = store.session(session_id)
+    names = np.asarray(info['classes'], dtype=object)
+    started_at = pd.Timestamp(info['started_at'])
+    columns = proba_columns(info['classes'])
+    for chunk in store.iter_samples(session_id, start, end, chunk_rows):
+        frame = pd.DataFrame({
+            'Time': started_at + pd.to_timedelta(chunk['t'], unit='s'),
+            'Heart Rate': chunk['hr'],
+            'HRV (RMSSD)': chunk['rmssd'],
+            'LF/HF': chunk['lf_hf'],
+            'Condition': names[chunk['condition']],
+        })
+        for j, name in enumerate(columns):
+            frame[name] = chunk['proba'][:, j]
+        yield frame
+
+
+def csv_chunks(frames):
+    header = True
+    for frame in frames:
+        yield frame.to_csv(index=False, header=header).encode('utf-8')
+        header = False
+
+
+def gzip_chunks(chunks, level=6):
+    # wbits=31 writes a gzip header and trailer around the deflate stream
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+class _Sink(io.RawIOBase):
+    """Write-only file that hands out what was written since the last drain"""
+
+    def __init__(self):
+        self._parts = []
+        self._size = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._parts.append(bytes(data))
+        self._size += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._size
+
+    def drain(self):
+        data = b''.join(self._parts)
+        self._parts = []
+        return data
+
+
+def parquet_chunks(frames):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    sink = _Sink()
+    writer = None
+    for frame in frames:
+        table = pa.Table.from_pandas(frame, preserve_index=False)
+        if writer is None:
+            writer = pq.ParquetWriter(sink, table.schema, compression='zstd')
+        # One row group per chunk; its bytes are complete once written
+        writer.write_table(table)
+        data = sink.drain()
+        if data:
+            yield data
+    if writer is not None:
+        writer.close()
+    yield sink.drain()
+
+
+def export_chunks(store, session_id, fmt='csv', start=None, end=None, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """Yield the encoded bytes of a stored session, chunk by chunk"""
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown export format {fmt!r}, expected one of {sorted(FORMATS)}")
+    rows = frames(store, session_id, start, end, chunk_rows)
+    if fmt == 'parquet':
+        return parquet_chunks(rows)
+    if fmt == 'csv.gz':
+        return gzip_chunks(csv_chunks(rows))
+    return csv_chunks(rows)
+
+
+def export(store, session_id, fileobj, fmt='csv', start=None, end=None, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """Write a stored session to a binary file object; returns the bytes written"""
+    written = 0
+    for data in export_chunks(store, session_id, fmt, start, end, chunk_rows):
+        fileobj.write(data)
+        written += len(data)
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export a stored session")
+    parser.add_argument('session', type=int, help="Session id (see python session_store.py)")
+    parser.add_argument('-o', '--output', required=True)
+    parser.add_argument('--format', choices=sorted(FORMATS),
+                        help="Default: inferred from the output file name, else csv")
+    parser.add_argument('--db', default=DEFAULT_PATH)
+    parser.add_argument('--chunk-rows', type=int, default=DEFAULT_CHUNK_ROWS)
+    args = parser.parse_args()
+
+    fmt = args.format
+    if fmt is None:
+        fmt = next((f for f, (ext, _) in FORMATS.items() if args.output.endswith('.' + ext)), 'csv')
+    store = SessionStore(args.db)
+    with open(args.output, 'wb') as f:
+        written = export(store, args.session, f, fmt, chunk_rows=args.chunk_rows)
+    print(f"Wrote {written / 1e6:.1f} MB to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
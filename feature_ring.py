@@ -0,0 +1,279 @@
+"""Shared-memory ring of feature records between an ingest and an inference process.
+
+Handing feature samples to another process over a ``multiprocessing.Queue``
+pickles every batch (and, for the per-row DataFrames the live loop used to
+build, a whole frame per sample). ``FeatureRing`` instead places a
+fixed-size ring of records in shared memory: float32 feature rows
+
+    MEAN_RR, RMSSD, LF_HF, HR, t
+
+and, alongside them, an int64 subject id per record. ``t`` is the
+producer's ``time.monotonic()`` when the record was written, stored
+relative to the ring's epoch so float32 resolves it to 1 ms for the first
+four hours and to 8 ms after a day. float32 loses nothing the compiled
+forest would keep: it rounds inputs to float32 before comparing them, as
+sklearn's trees do.
+
+The ring has one producer and one consumer. The producer writes records and
+then advances ``head``; the consumer reads up to ``head`` and then advances
+``tail``. Records themselves are never locked, but every load and store of
+an index happens under a cross-process lock (``flock`` on a file next to the
+segment). Taking that lock is the synchronization point that makes records
+written before a ``head`` store visible to the consumer that loads it, on
+weakly ordered CPUs (ARM) as well as x86. ``read`` returns the unread
+records as NumPy views of the shared buffer, so a batch reaches the model
+without being copied; they are valid until ``release``.
+
+Usage:
+    python feature_ring.py --name stress_ring --replay sample_data.csv --rate 10
+    python ingest.py --ring stress_ring
+    python -m benchmarks.feature_ring
+"""
+import argparse
+import fcntl
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from inference import FEATURES
+
+COLUMNS = FEATURES + ['t']
+N_FEATURES = len(FEATURES)
+TIME = COLUMNS.index('t')
+DEFAULT_CAPACITY = 65536
+
+# Header: each index on its own cache line, then (epoch, capacity, creator pid)
+HEAD_OFFSET = 0
+CLOSED_OFFSET = 8
+TAIL_OFFSET = 64
+META_OFFSET = 128
+HEADER_BYTES = 192
+
+
+def lock_path(name):
+    return os.path.join(tempfile.gettempdir(), f'{name.lstrip("/")}.ring.lock')
+
+
+class IndexLock:
+    """Cross-process lock around the ring's index loads and stores.
+
+    ``flock`` works between unrelated processes (a multiprocessing.Lock
+    only reaches the creator's children), and the kernel lock it takes
+    orders memory on both sides.
+    """
+
+    def __init__(self, path, create=False):
+        self.path = path
+        self._fd = os.open(path, os.O_RDWR | (os.O_CREAT if create else 0), 0o600)
+
+    def __enter__(self):
+        fcntl.flock(self._fd, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc):
+        fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def close(self):
+        os.close(self._fd)
+
+
+class FeatureRing:
+    """Single-producer/single-consumer ring of feature records in shared memory"""
+
+    def __init__(self, shm, owner, lock):
+        self._shm = shm
+        self.owner = owner
+        self._lock = lock
+        buf = shm.buf
+        self._head = np.ndarray((1,), np.uint64, buf, HEAD_OFFSET)
+        self._closed = np.ndarray((1,), np.uint64, buf, CLOSED_OFFSET)
+        self._tail = np.ndarray((1,), np.uint64, buf, TAIL_OFFSET)
+        self._meta = np.ndarray((3,), np.float64, buf, META_OFFSET)
+        self.epoch = float(self._meta[0])
+        self.capacity = int(self._meta[1])
+        self.creator = int(self._meta[2])
+        self.records = np.ndarray((self.capacity, len(COLUMNS)), np.float32, buf, HEADER_BYTES)
+        self.subjects = np.ndarray((self.capacity,), np.int64, buf, HEADER_BYTES + self.records.nbytes)
+        # Each side keeps its own index locally and only ever stores it
+        with self._lock:
+            self._written = int(self._head[0])
+            self._read = int(self._tail[0])
+        self.full = 0
+
+    @classmethod
+    def create(cls, capacity=DEFAULT_CAPACITY, name=None):
+        """Allocate a new ring (the caller owns it and unlinks it on close)"""
+        size = HEADER_BYTES + capacity * (len(COLUMNS) * np.dtype(np.float32).itemsize + np.dtype(np.int64).itemsize)
+        shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        np.ndarray((HEADER_BYTES // 8,), np.uint64, shm.buf)[:] = 0
+        np.ndarray((3,), np.float64, shm.buf, META_OFFSET)[:] = (time.monotonic(), capacity, os.getpid())
+        return cls(shm, owner=True, lock=IndexLock(lock_path(shm.name), create=True))
+
+    @classmethod
+    def attach(cls, name):
+        """Open a ring created by another process"""
+        lock = IndexLock(lock_path(name))
+        if sys.version_info >= (3, 13):
+            return cls(shared_memory.SharedMemory(name=name, track=False), owner=False, lock=lock)
+        ring = cls(shared_memory.SharedMemory(name=name), owner=False, lock=lock)
+        # Before Python 3.13 every attaching process registers the segment with
+        # its resource tracker, which unlinks it on exit. The creator's own
+        # process and its multiprocessing children share the creator's tracker
+        # (and its registration); anyone else must drop theirs.
+        parent = multiprocessing.parent_process()
+        if ring.creator not in (os.getpid(), parent.pid if parent is not None else None):
+            from multiprocessing import resource_tracker
+            resource_tracker.unregister(ring._shm._name, 'shared_memory')
+        return ring
+
+    @property
+    def name(self):
+        return self._shm.name
+
+    def __len__(self):
+        """Records written but not yet released"""
+        with self._lock:
+            return int(self._head[0]) - int(self._tail[0])
+
+    def _free(self):
+        with self._lock:
+            return self.capacity - (self._written - int(self._tail[0]))
+
+    def _publish(self, head):
+        self._written = head
+        # Records written before this store are visible to whoever loads it under the lock
+        with self._lock:
+            self._head[0] = head
+
+    def append(self, row, subject=0, t=None):
+        """Append one sample (FEATURES order; HR may be NaN). False if the ring is full"""
+        if self._free() <= 0:
+            self.full += 1
+            return False
+        mean_rr, rmssd, lf_hf, hr = row
+        if hr is None or hr != hr:
+            hr = 60000 / max(mean_rr, 1)
+        pos = self._written % self.capacity
+        self.records[pos] = (mean_rr, rmssd, lf_hf, hr, (time.monotonic() if t is None else t) - self.epoch)
+        self.subjects[pos] = subject
+        self._publish(self._written + 1)
+        return True
+
+    def extend(self, features, subject=0, t=None):
+        """Append rows of FEATURES (HR may be NaN: derived from MEAN_RR).
+
+        ``subject`` is one id or one per row, ``t`` the monotonic time of
+        each row (default: now). Returns how many rows fitted; the rest are
+        the caller's to retry or drop.
+        """
+        values = np.asarray(features, dtype=np.float32).reshape(-1, N_FEATURES)
+        n = min(len(values), self._free())
+        if n < len(values):
+            self.full += len(values) - n
+        if n <= 0:
+            return 0
+        t = time.monotonic() if t is None else np.asarray(t, dtype=np.float64)
+        times = np.broadcast_to(t - self.epoch, (len(values),))
+        subjects = np.broadcast_to(np.asarray(subject, dtype=np.int64), (len(values),))
+        pos = self._written % self.capacity
+        first = min(n, self.capacity - pos)
+        for dst, src, count in ((pos, 0, first), (0, first, n - first)):
+            if not count:
+                continue
+            block = self.records[dst:dst + count]
+            block[:, :N_FEATURES] = values[src:src + count]
+            block[:, TIME] = times[src:src + count]
+            hr = block[:, FEATURES.index('HR')]
+            missing = np.isnan(hr)
+            if missing.any():
+                hr[missing] = 60000 / np.maximum(block[missing, FEATURES.index('MEAN_RR')], 1)
+            self.subjects[dst:dst + count] = subjects[src:src + count]
+        self._publish(self._written + n)
+        return n
+
+    def read(self, max_rows=None):
+        """Views (records, subjects) of the oldest unread records.
+
+        Contiguous, so a read may stop at the wrap point.
+        """
+        with self._lock:
+            available = int(self._head[0]) - self._read
+        if max_rows is not None:
+            available = min(available, max_rows)
+        pos = self._read % self.capacity
+        end = pos + min(available, self.capacity - pos)
+        return self.records[pos:end], self.subjects[pos:end]
+
+    def release(self, n):
+        """Hand the n oldest records read back to the producer"""
+        self._read += n
+        with self._lock:
+            self._tail[0] = self._read
+
+    def arrivals(self, records):
+        """Monotonic write times of records read from this ring"""
+        return self.epoch + records[:, TIME].astype(np.float64)
+
+    def close_stream(self):
+        """Producer: no more records will be written"""
+        with self._lock:
+            self._closed[0] = 1
+
+    @property
+    def done(self):
+        """The producer has closed the stream and every record has been released"""
+        with self._lock:
+            return bool(self._closed[0]) and int(self._head[0]) == int(self._tail[0])
+
+    def close(self):
+        """Detach (views returned by read must be gone); the owner also frees the memory"""
+        self.records = self.subjects = self._head = self._closed = self._tail = self._meta = None
+        self._shm.close()
+        self._lock.close()
+        if self.owner:
+            self._shm.unlink()
+            os.unlink(self._lock.path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write feature samples into a shared-memory ring")
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument('--stdin', action='store_true', help="Read samples from standard input")
+    group.add_argument('--replay', metavar='CSV', help="Replay a recorded CSV")
+    parser.add_argument('--name', default='stress_ring', help="Shared memory name the consumer attaches to")
+    parser.add_argument('--capacity', type=int, default=DEFAULT_CAPACITY, help="Records the ring holds")
+    parser.add_argument('--rate', type=float, default=None, help="Replay rate in samples/sec (default: as fast as possible)")
+    parser.add_argument('--subject', type=int, default=0, help="Subject id written with every sample")
+    args = parser.parse_args()
+
+    import pandas as pd
+    from ingest import replay_source, stdin_source
+
+    source = stdin_source() if args.stdin else replay_source(pd.read_csv(args.replay), args.rate)
+    ring = FeatureRing.create(args.capacity, args.name)
+    print(f"Writing to ring {ring.name}; consume with: python ingest.py --ring {ring.name}", file=sys.stderr)
+    written = 0
+    try:
+        for record in source:
+            row = [record.get(name, np.nan) for name in FEATURES]
+            while not ring.append(row, args.subject):
+                time.sleep(0.001)  # Full: wait for the consumer
+            written += 1
+        ring.close_stream()
+        # The segment disappears with its owner, so wait for the consumer to drain it
+        while not ring.done:
+            time.sleep(0.05)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print(f"Wrote {written} samples ({ring.full} rows refused by a full ring and retried)", file=sys.stderr)
+        ring.close()
+
+
+if __name__ == '__main__':
+    main()
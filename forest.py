@@ -0,0 +1,249 @@
+"""Compiled Random Forest inference.
+
+Flattens a fitted sklearn RandomForestClassifier into contiguous NumPy node
+arrays (feature, threshold, children, leaf values) and evaluates it with a
+vectorized traversal, avoiding sklearn's per-call validation and per-tree
+dispatch. Predictions are identical to the sklearn estimator.
+
+The saved artifact is a directory with one ``.npy`` file per node array and
+a ``meta.json`` header (format version, classes, feature names, depth).
+Loading memory-maps the arrays, so it costs a few file opens rather than
+unpickling every tree, and needs neither pickle nor sklearn.
+
+Usage:
+    python forest.py stress_model.pkl stress_model_forest
+"""
+import argparse
+import json
+import os
+import pickle
+
+import numpy as np
+
+# Rows traversed together; keeps intermediate arrays cache-sized on big batches
+CHUNK_SIZE = 4096
+# Above this many rows sklearn's per-tree C loops beat the NumPy traversal
+# (about 4 µs vs 16 µs per row, against some 20 ms fixed cost per sklearn call)
+SKLEARN_BATCH = 1500
+
+FORMAT_VERSION = 1
+DEFAULT_PATH = 'stress_model_forest'
+NODE_ARRAYS = ('feature', 'threshold', 'children', 'value', 'roots')
+
+
+class CompiledForest:
+    """A random forest stored as flat node arrays.
+
+    All trees share one set of arrays; ``roots`` holds the index of each
+    tree's root node. Leaves point to themselves with an infinite threshold,
+    so a fixed number of traversal steps (the deepest tree's depth) lands
+    every sample on its leaf without per-step leaf checks.
+
+    A forest compiled in-process from an estimator keeps it in ``estimator``
+    and hands it batches larger than SKLEARN_BATCH rows; a loaded artifact
+    has none and traverses every batch itself.
+    """
+
+    def __init__(self, feature, threshold, children, value, roots, classes, features, depth=None,
+                 estimator=None):
+        self.feature = feature
+        self.threshold = threshold
+        self.children = children
+        self.value = value
+        self.roots = roots
+        self.classes_ = np.asarray(classes)
+        self.feature_names_in_ = np.asarray(features, dtype=object)
+        self.n_features_in_ = len(features)
+        self.depth = self._depth() if depth is None else depth
+        self.estimator = estimator
+        self._names = [str(name) for name in features]
+
+    @classmethod
+    def from_sklearn(cls, model, fallback=True):
+        """Flatten a fitted RandomForestClassifier (kept for large batches unless fallback is False)"""
+        features, thresholds, children, values, roots = [], [], [], [], []
+        offset = 0
+        for estimator in model.estimators_:
+            tree = estimator.tree_
+            n = tree.node_count
+            is_leaf = tree.children_left < 0
+            node_ids = np.arange(offset, offset + n)
+
+            left = np.where(is_leaf, node_ids, tree.children_left + offset)
+            right = np.where(is_leaf, node_ids, tree.children_right + offset)
+            features.append(np.where(is_leaf, 0, tree.feature))
+            thresholds.append(np.where(is_leaf, np.inf, tree.threshold))
+            children.append(np.stack([left, right], axis=1))
+
+            # Per-tree class probabilities at each node, as DecisionTreeClassifier.predict_proba
+            value = tree.value[:, 0, :].astype(np.float64)
+            totals = value.sum(axis=1, keepdims=True)
+            totals[totals == 0] = 1
+            values.append(value / totals)
+
+            roots.append(offset)
+            offset += n
+
+        names = getattr(model, 'feature_names_in_', None)
+        if names is None:
+            names = [f'x{j}' for j in range(model.n_features_in_)]
+        return cls(
+            feature=np.ascontiguousarray(np.concatenate(features), dtype=np.intp),
+            threshold=np.ascontiguousarray(np.concatenate(thresholds), dtype=np.float64),
+            children=np.ascontiguousarray(np.concatenate(children), dtype=np.intp),
+            value=np.ascontiguousarray(np.concatenate(values), dtype=np.float64),
+            roots=np.asarray(roots, dtype=np.intp),
+            classes=model.classes_,
+            features=list(names),
+            estimator=model if fallback else None,
+        )
+
+    def _depth(self):
+        """Number of traversal steps needed to reach the deepest leaf"""
+        depth = 0
+        nodes = self.roots
+        while True:
+            nxt = self.children[nodes].ravel()
+            nxt = np.unique(nxt[nxt != np.repeat(nodes, 2)])
+            if not len(nxt):
+                return depth
+            depth += 1
+            nodes = nxt
+
+    def _as_array(self, X):
+        if hasattr(X, 'columns'):
+            # Selecting columns builds a new frame (~0.5 ms); skip it when they already line up
+            columns = X.columns.tolist()
+            if columns == self._names:
+                X = X.to_numpy(dtype=np.float32)
+            elif len(columns) == len(self._names) and set(columns) == set(self._names):
+                X = X.to_numpy(dtype=np.float32)[:, [columns.index(name) for name in self._names]]
+            else:
+                X = X[self._names].to_numpy()
+        # sklearn trees compare float32 inputs against float64 thresholds; widening
+        # the rounded values back to float64 keeps those comparisons exact and
+        # spares NumPy a mixed-dtype compare on every traversal step
+        X = np.asarray(X, dtype=np.float32).astype(np.float64)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        if X.shape[1] != self.n_features_in_:
+            raise ValueError(f"Expected {self.n_features_in_} features, got {X.shape[1]}")
+        return X
+
+    def apply(self, X):
+        """Leaf index reached in every tree, shape (n_samples, n_trees)"""
+        return self._apply(self._as_array(X))
+
+    def _apply(self, X):
+        n_samples, n_features = X.shape
+        flat_X = X.ravel()
+        children = self.children.ravel()  # [left, right] pairs
+        if n_samples == 1:
+            # Single-sample fast path: one node per tree, no row offsets
+            node = self.roots
+            for _ in range(self.depth):
+                go_right = flat_X.take(self.feature.take(node)) > self.threshold.take(node)
+                node = children.take(2 * node + go_right)
+            return node.reshape(1, -1)
+
+        row_offset = (np.arange(n_samples, dtype=np.intp) * n_features)[:, None]
+        node = np.broadcast_to(self.roots, (n_samples, len(self.roots))).copy()
+        for _ in range(self.depth):
+            go_right = flat_X.take(row_offset + self.feature.take(node)) > self.threshold.take(node)
+            node = children.take(2 * node + go_right)
+        return node
+
+    def predict_proba(self, X):
+        X = self._as_array(X)
+        if self.estimator is not None and len(X) > SKLEARN_BATCH:
+            return self._sklearn_proba(X)
+        if len(X) <= CHUNK_SIZE:
+            return self._proba(self._apply(X))
+        # Bound the (n_samples, n_trees) working arrays on large inputs
+        return np.concatenate([
+            self._proba(self._apply(X[start:start + CHUNK_SIZE]))
+            for start in range(0, len(X), CHUNK_SIZE)
+        ])
+
+    def _sklearn_proba(self, X):
+        if getattr(self.estimator, 'feature_names_in_', None) is not None:
+            # Fitted on a DataFrame: named columns avoid a warning per call
+            import pandas as pd
+            X = pd.DataFrame(X, columns=self._names)
+        return self.estimator.predict_proba(X)
+
+    def _proba(self, leaves):
+        return self.value.take(leaves, axis=0).sum(axis=1) / leaves.shape[1]
+
+    def predict(self, X):
+        return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
+
+    def save(self, path):
+        """Write the artifact directory (see the module docstring)"""
+        os.makedirs(path, exist_ok=True)
+        for name in NODE_ARRAYS:
+            np.save(os.path.join(path, f'{name}.npy'), getattr(self, name))
+        meta = {
+            'format_version': FORMAT_VERSION,
+            'classes': [str(c) for c in self.classes_],
+            'features': [str(f) for f in self.feature_names_in_],
+            'trees': len(self.roots),
+            'nodes': len(self.feature),
+            'depth': int(self.depth),
+        }
+        # Header last: a directory without one is an incomplete write
+        with open(os.path.join(path, 'meta.json'), 'w') as f:
+            json.dump(meta, f, indent=2)
+
+    @classmethod
+    def load(cls, path, features=None, mmap=True):
+        """Load a saved forest, checking its version and (optionally) its feature names"""
+        with open(os.path.join(path, 'meta.json')) as f:
+            meta = json.load(f)
+        if meta.get('format_version') != FORMAT_VERSION:
+            raise ValueError(f"Unsupported forest format version {meta.get('format_version')} in {path}")
+        # asarray drops the np.memmap subclass (and its per-op overhead) but keeps the mapping
+        arrays = {
+            name: np.asarray(np.load(os.path.join(path, f'{name}.npy'), mmap_mode='r' if mmap else None))
+            for name in NODE_ARRAYS
+        }
+        forest = cls(classes=np.asarray(meta['classes'], dtype=object), features=meta['features'],
+                     depth=meta['depth'], **arrays)
+        if features is not None:
+            check_features(forest, features)
+        return forest
+
+
+def check_features(model, features):
+    """Raise ValueError unless the model was trained on exactly these feature columns"""
+    names = getattr(model, 'feature_names_in_', None)
+    if names is not None and list(names) != list(features):
+        raise ValueError(f"Model expects features {list(names)}, not {list(features)}")
+
+
+def load_model(path, features=None):
+    """Load a compiled forest directory, or a pickled sklearn estimator otherwise"""
+    if os.path.isdir(path):
+        return CompiledForest.load(path, features)
+    with open(path, 'rb') as f:
+        model = pickle.load(f)
+    if features is not None:
+        check_features(model, features)
+    return model
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compile a pickled Random Forest into flat node arrays")
+    parser.add_argument('model', nargs='?', default='stress_model.pkl', help="Pickled RandomForestClassifier")
+    parser.add_argument('output', nargs='?', default=DEFAULT_PATH, help="Directory to write the compiled forest to")
+    args = parser.parse_args()
+
+    with open(args.model, 'rb') as f:
+        model = pickle.load(f)
+    forest = CompiledForest.from_sklearn(model)
+    forest.save(args.output)
+    print(f"Compiled {len(forest.roots)} trees ({len(forest.feature):,} nodes, depth {forest.depth}) to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
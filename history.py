@@ -0,0 +1,124 @@
+"""Columnar ring buffer for a monitoring session's history.
+
+Replaces the ever-growing list of dicts in ``st.session_state['history']``
+with preallocated NumPy columns. Every sample is written twice, at ``i`` and
+``i + capacity`` (a mirrored ring), so the most recent ``k <= capacity``
+samples are always one contiguous slice: windowed reads for the live chart
+are zero-copy views, whatever the write position.
+"""
+import numpy as np
+import pandas as pd
+
+from inference import proba_columns
+
+# 8 hours at 1 Hz
+DEFAULT_CAPACITY = 8 * 60 * 60
+
+
+class SessionHistory:
+    """Fixed-capacity columnar history of classified samples.
+
+    Columns: ``time`` (seconds since session start), ``hr``, ``rmssd``,
+    ``lf_hf``, ``condition`` (index into ``classes``) and ``proba``
+    (one column per class). Once full, the oldest samples are overwritten.
+    """
+
+    def __init__(self, classes, capacity=DEFAULT_CAPACITY):
+        self.classes = np.asarray([str(c) for c in classes], dtype=object)
+        self._codes = {name: code for code, name in enumerate(self.classes)}
+        self.capacity = capacity
+        self.total = 0  # Samples ever appended, including overwritten ones
+        size = 2 * capacity
+        self._time = np.zeros(size, dtype=np.float64)
+        self._hr = np.zeros(size, dtype=np.float64)
+        self._rmssd = np.zeros(size, dtype=np.float64)
+        self._lf_hf = np.zeros(size, dtype=np.float64)
+        self._condition = np.zeros(size, dtype=np.int8)
+        self._proba = np.zeros((size, len(self.classes)), dtype=np.float32)
+
+    def __len__(self):
+        return min(self.total, self.capacity)
+
+    def code(self, condition):
+        return self._codes[str(condition)]
+
+    def append(self, time, hr, rmssd, lf_hf, condition, proba=None):
+        i = self.total % self.capacity
+        code = self.code(condition)
+        for j in (i, i + self.capacity):
+            self._time[j] = time
+            self._hr[j] = hr
+            self._rmssd[j] = rmssd
+            self._lf_hf[j] = lf_hf
+            self._condition[j] = code
+            if proba is not None:
+                self._proba[j] = proba
+        self.total += 1
+
+    def extend(self, time, hr, rmssd, lf_hf, codes, proba=None):
+        """Append arrays of samples at once; conditions given as class codes"""
+        time = np.asarray(time, dtype=np.float64)
+        n = len(time)
+        if not n:
+            return
+        columns = [
+            (self._time, time), (self._hr, hr), (self._rmssd, rmssd),
+            (self._lf_hf, lf_hf), (self._condition, codes),
+        ]
+        if proba is not None:
+            columns.append((self._proba, proba))
+        # Only the last `capacity` samples survive; scatter them to their ring slots and mirrors
+        keep = min(n, self.capacity)
+        positions = (self.total + n - keep + np.arange(keep)) % self.capacity
+        for column, values in columns:
+            values = np.asarray(values)[n - keep:]
+            column[positions] = values
+            column[positions + self.capacity] = values
+        self.total += n
+
+    def window(self, k=None):
+        """Views of the last k samples (all retained samples by default)"""
+        k = len(self) if k is None else min(k, len(self))
+        start = (self.total - k) % self.capacity
+        stop = start + k
+        return {
+            'time': self._time[start:stop],
+            'hr': self._hr[start:stop],
+            'rmssd': self._rmssd[start:stop],
+            'lf_hf': self._lf_hf[start:stop],
+            'condition': self._condition[start:stop],
+            'proba': self._proba[start:stop],
+        }
+
+    def last(self):
+        """The most recent sample as a dict, or None if empty"""
+        if not self.total:
+            return None
+        view = self.window(1)
+        return {
+            'time': float(view['time'][0]),
+            'hr': float(view['hr'][0]),
+            'rmssd': float(view['rmssd'][0]),
+            'lf_hf': float(view['lf_hf'][0]),
+            'condition': self.classes[view['condition'][0]],
+            'proba': view['proba'][0].copy(),
+        }
+
+    def labels(self, codes):
+        """Condition names for an array of codes"""
+        return self.classes[codes]
+
+    def to_frame(self, start_time, k=None, proba=False):
+        """Report/export DataFrame in the app's column layout"""
+        view = self.window(k)
+        frame = pd.DataFrame({
+            'Time': pd.Timestamp(start_time) + pd.to_timedelta(view['time'], unit='s'),
+            'Heart Rate': view['hr'],
+            'HRV (RMSSD)': view['rmssd'],
+            'LF/HF': view['lf_hf'],
+            'Condition': self.labels(view['condition']),
+        })
+        if proba:
+            for j, name in enumerate(proba_columns(self.classes)):
+                frame[name] = view['proba'][:, j]
+        return frame
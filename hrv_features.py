@@ -0,0 +1,229 @@
+"""HRV feature extraction from raw RR intervals.
+
+Computes the SWELL time-domain features (MEAN_RR, SDRR, RMSSD, SDSD,
+SDRR_RMSSD, HR, pNN25, pNN50, SD1, SD2) over a sliding time window of RR
+intervals. Window statistics are kept as running sums that are updated as
+beats enter and leave, so each beat costs O(1) regardless of window length.
+Standard deviations are population (ddof=0) values, matching the dataset.
+The frequency-domain columns come from spectral.py over the same window.
+
+MEDIAN_RR and the other order statistics are not provided: they cannot be
+maintained in O(1) per beat.
+
+Usage:
+    python hrv_features.py rr_intervals.txt -o features.csv
+"""
+import argparse
+import math
+import sys
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+from spectral import SPECTRAL_FEATURES, SlidingLombScargle
+
+TIME_DOMAIN_FEATURES = [
+    'MEAN_RR', 'SDRR', 'RMSSD', 'SDSD', 'SDRR_RMSSD', 'HR', 'pNN25', 'pNN50', 'SD1', 'SD2'
+]
+
+
+def rr_from_peaks(peak_times):
+    """RR intervals (ms) from R-peak times in seconds"""
+    return np.diff(np.asarray(peak_times, dtype=np.float64)) * 1000.0
+
+
+def _features_from_sums(n, sum_rr, sum_rr2, sum_hr, n_d, sum_d, sum_d2, nn25, nn50):
+    mean_rr = sum_rr / n
+    sdrr = math.sqrt(max(sum_rr2 / n - mean_rr * mean_rr, 0.0))
+    mean_d = sum_d / n_d
+    rmssd = math.sqrt(sum_d2 / n_d)
+    sdsd = math.sqrt(max(sum_d2 / n_d - mean_d * mean_d, 0.0))
+    return {
+        'MEAN_RR': mean_rr,
+        'SDRR': sdrr,
+        'RMSSD': rmssd,
+        'SDSD': sdsd,
+        'SDRR_RMSSD': sdrr / rmssd if rmssd else float('nan'),
+        'HR': sum_hr / n,
+        'pNN25': 100.0 * nn25 / n_d,
+        'pNN50': 100.0 * nn50 / n_d,
+        'SD1': sdsd / math.sqrt(2),
+        'SD2': math.sqrt(max(2 * sdrr * sdrr - 0.5 * sdsd * sdsd, 0.0)),
+    }
+
+
+def time_domain_features(rr):
+    """Reference (non-incremental) computation over a whole array of RR intervals"""
+    rr = np.asarray(rr, dtype=np.float64)
+    if len(rr) < 2:
+        return None
+    d = np.diff(rr)
+    return _features_from_sums(
+        len(rr), rr.sum(), (rr * rr).sum(), (60000.0 / rr).sum(),
+        len(d), d.sum(), (d * d).sum(), int((np.abs(d) > 25).sum()), int((np.abs(d) > 50).sum()),
+    )
+
+
+class RRWindow:
+    """Sliding window of RR intervals with running sums.
+
+    Beats older than ``window_seconds`` (by beat time) are evicted as new
+    ones arrive. The sums are rebuilt from the window every
+    ``resync_every`` beats so floating-point drift from repeated add/subtract
+    cannot accumulate over long sessions.
+    """
+
+    def __init__(self, window_seconds=300.0, resync_every=10000):
+        self.window_seconds = window_seconds
+        self.resync_every = resync_every
+        self.beats = deque()  # [time_s, rr_ms, diff_to_previous or None]
+        self.last_time = None
+        self._since_resync = 0
+        self._reset_sums()
+
+    def _reset_sums(self):
+        self.n = 0
+        self.sum_rr = 0.0
+        self.sum_rr2 = 0.0
+        self.sum_hr = 0.0
+        self.n_d = 0
+        self.sum_d = 0.0
+        self.sum_d2 = 0.0
+        self.nn25 = 0
+        self.nn50 = 0
+
+    def _add_diff(self, d, sign):
+        self.n_d += sign
+        self.sum_d += sign * d
+        self.sum_d2 += sign * d * d
+        if abs(d) > 25:
+            self.nn25 += sign
+        if abs(d) > 50:
+            self.nn50 += sign
+
+    def add(self, rr, t=None):
+        """Add one RR interval (ms); t is the beat time in seconds (default: cumulative RR)"""
+        rr = float(rr)
+        if t is None:
+            t = (self.last_time or 0.0) + rr / 1000.0
+        self.last_time = t
+
+        d = rr - self.beats[-1][1] if self.beats else None
+        self.beats.append([t, rr, d])
+        self.n += 1
+        self.sum_rr += rr
+        self.sum_rr2 += rr * rr
+        self.sum_hr += 60000.0 / rr
+        if d is not None:
+            self._add_diff(d, +1)
+
+        self._evict(t - self.window_seconds)
+
+        self._since_resync += 1
+        if self._since_resync >= self.resync_every:
+            self.resync()
+
+    def _evict(self, cutoff):
+        while self.beats and self.beats[0][0] <= cutoff:
+            _, rr, _ = self.beats.popleft()
+            self.n -= 1
+            self.sum_rr -= rr
+            self.sum_rr2 -= rr * rr
+            self.sum_hr -= 60000.0 / rr
+            if self.beats:
+                # The new oldest beat no longer has a predecessor in the window
+                head = self.beats[0]
+                if head[2] is not None:
+                    self._add_diff(head[2], -1)
+                    head[2] = None
+
+    def resync(self):
+        """Recompute the running sums exactly from the beats in the window"""
+        self._reset_sums()
+        for _, rr, d in self.beats:
+            self.n += 1
+            self.sum_rr += rr
+            self.sum_rr2 += rr * rr
+            self.sum_hr += 60000.0 / rr
+            if d is not None:
+                self._add_diff(d, +1)
+        self._since_resync = 0
+
+    def features(self):
+        """Current window's time-domain features, or None until two beats are in it"""
+        if self.n < 2 or self.n_d < 1:
+            return None
+        return _features_from_sums(
+            self.n, self.sum_rr, self.sum_rr2, self.sum_hr,
+            self.n_d, self.sum_d, self.sum_d2, self.nn25, self.nn50,
+        )
+
+
+class RRFeatureExtractor:
+    """Turn a beat stream into feature rows at a fixed output rate.
+
+    Feed beats with ``add``; it returns the feature rows (usually zero or
+    one) that became due, one every ``output_interval`` seconds of beat time
+    once ``min_window`` seconds of data have been seen. With ``spectral``
+    the rows also carry the frequency-domain columns (LF_HF etc.) from a
+    SlidingLombScargle over the same window.
+    """
+
+    def __init__(self, window_seconds=300.0, output_interval=1.0, min_window=None, spectral=True):
+        self.window = RRWindow(window_seconds)
+        self.spectrum = SlidingLombScargle(window_seconds) if spectral else None
+        self.output_interval = output_interval
+        self.min_window = window_seconds if min_window is None else min_window
+        self.start_time = None
+        self.next_output = None
+
+    def add(self, rr, t=None):
+        self.window.add(rr, t)
+        t = self.window.last_time
+        if self.spectrum is not None:
+            self.spectrum.add(float(rr), t)
+        if self.start_time is None:
+            self.start_time = t - rr / 1000.0
+            self.next_output = self.start_time + self.min_window
+
+        rows = []
+        while t >= self.next_output:
+            row = self.window.features()
+            if row is not None and self.spectrum is not None:
+                spectral = self.spectrum.features()
+                row = None if spectral is None else {**row, **spectral}
+            if row is not None:
+                row['time'] = self.next_output
+                rows.append(row)
+            self.next_output += self.output_interval
+        return rows
+
+    def extend(self, rr_intervals):
+        rows = []
+        for rr in rr_intervals:
+            rows.extend(self.add(rr))
+        return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compute windowed HRV features from RR intervals")
+    parser.add_argument('input', nargs='?', help="Text file with one RR interval (ms) per line; default stdin")
+    parser.add_argument('-o', '--output', help="Where to write the feature rows (CSV); default stdout")
+    parser.add_argument('--window', type=float, default=300.0, help="Window length in seconds")
+    parser.add_argument('--interval', type=float, default=1.0, help="Seconds between output rows")
+    parser.add_argument('--min-window', type=float, default=None, help="Seconds of data before the first row (default: --window)")
+    parser.add_argument('--no-spectral', action='store_true', help="Skip the frequency-domain features")
+    args = parser.parse_args()
+
+    lines = open(args.input) if args.input else sys.stdin
+    extractor = RRFeatureExtractor(args.window, args.interval, args.min_window, spectral=not args.no_spectral)
+    rows = extractor.extend(float(line) for line in lines if line.strip())
+
+    columns = ['time'] + TIME_DOMAIN_FEATURES + ([] if args.no_spectral else SPECTRAL_FEATURES)
+    frame = pd.DataFrame(rows, columns=columns)
+    frame.to_csv(args.output or sys.stdout, index=False)
+
+
+if __name__ == '__main__':
+    main()
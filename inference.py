@@ -0,0 +1,120 @@
+"""Vectorized stress inference over whole sessions.
+
+Scores a DataFrame (or ndarray) of HRV features with a single
+``predict_proba`` call instead of one ``predict`` per row.
+
+Usage:
+    python inference.py sample_data.csv -o predictions.csv
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from forest import load_model
+
+# Feature order the model was trained on (see analysis.ipynb)
+FEATURES = ['MEAN_RR', 'RMSSD', 'LF_HF', 'HR']
+
+# The forests compare features as float32; larger magnitudes overflow to inf
+FLOAT32_MAX = float(np.finfo(np.float32).max)
+
+
+def finite_rows(X):
+    """Boolean mask of the rows of X whose features are all finite as float32"""
+    values = np.asarray(X, dtype=np.float64)
+    if values.ndim == 1:
+        values = values.reshape(1, -1)
+    return (np.abs(values) <= FLOAT32_MAX).all(axis=1)
+
+
+def feature_frame(data):
+    """Build the model input frame for a batch of samples.
+
+    Accepts a DataFrame with the SWELL feature columns or an array of shape
+    (n_samples, 4) in FEATURES order. HR is derived from MEAN_RR when the
+    column (or a value in it) is missing, as the live monitor has always done.
+    """
+    if isinstance(data, pd.DataFrame):
+        frame = pd.DataFrame(index=data.index)
+        for name in ('MEAN_RR', 'RMSSD', 'LF_HF'):
+            frame[name] = data[name].astype(np.float64)
+        derived_hr = 60000 / np.maximum(frame['MEAN_RR'], 1)  # Avoid division by zero
+        if 'HR' in data.columns:
+            frame['HR'] = data['HR'].astype(np.float64).fillna(derived_hr)
+        else:
+            frame['HR'] = derived_hr
+        return frame.reset_index(drop=True)
+
+    values = np.asarray(data, dtype=np.float64)
+    if values.ndim == 1:
+        values = values.reshape(1, -1)
+    if values.shape[1] != len(FEATURES):
+        raise ValueError(f"Expected {len(FEATURES)} feature columns {FEATURES}, got {values.shape[1]}")
+    return pd.DataFrame(values, columns=FEATURES)
+
+
+def proba_columns(classes):
+    """Column names for the per-class probabilities, e.g. ``p_no_stress``"""
+    return [f"p_{str(name).replace(' ', '_')}" for name in classes]
+
+
+def score_batch(model, data):
+    """Classify a batch of samples in one vectorized pass.
+
+    Returns (labels, probabilities) where probabilities has one column per
+    entry of ``model.classes_``.
+    """
+    X = feature_frame(data)
+    if X.empty:
+        return np.empty(0, dtype=object), np.empty((0, len(model.classes_)))
+    proba = model.predict_proba(X)
+    # Same rule RandomForestClassifier.predict applies internally
+    labels = np.asarray(model.classes_)[np.argmax(proba, axis=1)]
+    return labels, proba
+
+
+def score_array(model, X):
+    """score_batch for an array already in FEATURES order, passed to the model as is.
+
+    No DataFrame is built and nothing is copied, so a view of a shared
+    buffer (feature_ring.py) reaches ``predict_proba`` directly. Meant for
+    models that take arrays (CompiledForest, RemoteModel, PredictionCache).
+    """
+    if not len(X):
+        return np.empty(0, dtype=object), np.empty((0, len(model.classes_)))
+    proba = model.predict_proba(X)
+    labels = np.asarray(model.classes_)[np.argmax(proba, axis=1)]
+    return labels, proba
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Score a CSV of HRV features in one batch")
+    parser.add_argument('input', help="CSV in the sample_data.csv schema")
+    parser.add_argument('-o', '--output', help="Where to write predictions (CSV)")
+    parser.add_argument('--model', default='stress_model.pkl', help="Pickled classifier or compiled forest directory")
+    args = parser.parse_args()
+
+    model = load_model(args.model, FEATURES)
+
+    start = time.perf_counter()
+    df = pd.read_csv(args.input)
+    read_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    labels, proba = score_batch(model, df)
+    score_time = time.perf_counter() - start
+
+    print(f"Read {len(df)} rows in {read_time:.2f}s")
+    print(f"Scored {len(df)} rows in {score_time:.2f}s ({len(df) / max(score_time, 1e-9):,.0f} rows/s)")
+
+    if args.output:
+        out = pd.DataFrame(proba, columns=proba_columns(model.classes_))
+        out.insert(0, 'prediction', labels)
+        out.to_csv(args.output, index=False)
+        print(f"Predictions written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,264 @@
+"""Dedicated inference worker processes shared by every session of the app.
+
+The model lives in one or more worker processes rather than in the
+Streamlit process, so predictions no longer compete with page rendering for
+the GIL, and several workers spread prediction CPU over cores. Sessions
+send feature matrices to the worker with the fewest requests in flight; a
+dispatcher thread in the parent routes each answer back to the Future of
+its request.
+
+The dispatcher is also the watchdog: a worker process that dies (killed,
+out of memory, a crash in native code) has the futures of its in-flight
+requests failed and is restarted. A request that times out or is cancelled
+is forgotten, and its answer discarded if it ever arrives.
+
+``RemoteModel`` wraps the service in the ``classes_``/``predict_proba``
+interface, so IngestWorker, score_batch and PredictionCache use it like any
+local model.
+
+Usage:
+    service = InferenceService('stress_model_forest', workers=2).start()
+    model = RemoteModel(service)
+    labels, proba = score_batch(model, features)
+
+    python -m benchmarks.inference_service --sessions 8 --workers 1 2
+"""
+import functools
+import itertools
+import multiprocessing
+import threading
+import time
+from concurrent.futures import Future, TimeoutError
+from multiprocessing.connection import wait
+
+import numpy as np
+
+from forest import DEFAULT_PATH
+from inference import FEATURES
+
+DEFAULT_WORKERS = 1
+START_TIMEOUT = 60.0
+WATCHDOG_INTERVAL = 0.5
+
+
+def _serve(model_path, requests, responses):
+    """Worker process: load the model once, then answer requests until None"""
+    # Imported here so a spawned worker only pays for what the model needs
+    import pandas as pd
+    from forest import CompiledForest, load_model
+
+    try:
+        model = load_model(model_path, FEATURES)
+    except Exception as e:
+        responses.send(('error', None, f"{type(e).__name__}: {e}"))
+        return
+    named = getattr(model, 'feature_names_in_', None) is not None and not isinstance(model, CompiledForest)
+    responses.send(('ready', [str(c) for c in model.classes_], None))
+    while True:
+        request = requests.get()
+        if request is None:
+            break
+        request_id, X = request
+        try:
+            if named:
+                # sklearn estimators fitted on a DataFrame warn on bare arrays
+                X = pd.DataFrame(X, columns=FEATURES)
+            responses.send((request_id, model.predict_proba(X), None))
+        except Exception as e:
+            responses.send((request_id, None, f"{type(e).__name__}: {e}"))
+
+
+class InferenceService:
+    """A pool of model-owning processes answering predict_proba requests"""
+
+    def __init__(self, model_path=DEFAULT_PATH, workers=DEFAULT_WORKERS):
+        self.model_path = model_path
+        self.workers = workers
+        self.classes_ = None
+        self.requests = 0
+        self.rows = 0
+        self.restarts = 0
+        self._ids = itertools.count()
+        self._pending = {}  # request id -> (future, worker slot)
+        self._lock = threading.Lock()
+        # Per worker slot. Each worker has its own request queue and answer
+        # pipe, so one dying mid-message cannot corrupt another's channel.
+        self._processes = []
+        self._queues = []
+        self._connections = []
+        self._in_flight = []
+        self._broken = set()  # Slots whose restarted worker could not load the model
+        self._closing = False
+        self._watched = 0.0
+        self._dispatcher = None
+
+    def start(self, timeout=START_TIMEOUT):
+        # Spawned, not forked: the Streamlit process has threads (and sockets) a fork would copy
+        self._context = multiprocessing.get_context('spawn')
+        for slot in range(self.workers):
+            self._processes.append(None)
+            self._queues.append(None)
+            self._connections.append(None)
+            self._in_flight.append(0)
+            self._spawn(slot)
+        for connection in self._connections:
+            kind, classes, error = 'error', None, f"not ready after {timeout:g}s"
+            try:
+                if connection.poll(timeout):
+                    kind, classes, error = connection.recv()
+            except (EOFError, OSError):
+                error = "worker exited"
+            if kind == 'error':
+                self.close()
+                raise RuntimeError(f"Inference worker failed to load {self.model_path}: {error}")
+            self.classes_ = np.asarray(classes, dtype=object)
+        self._dispatcher = threading.Thread(target=self._dispatch, daemon=True)
+        self._dispatcher.start()
+        return self
+
+    def _spawn(self, slot):
+        requests = self._context.Queue()
+        reader, writer = self._context.Pipe(duplex=False)
+        process = self._context.Process(target=_serve, args=(self.model_path, requests, writer), daemon=True)
+        process.start()
+        writer.close()  # Only the worker holds the write end, so its death reads as EOF
+        self._processes[slot] = process
+        self._queues[slot] = requests
+        self._connections[slot] = reader
+
+    def _take(self, request_id):
+        """Remove a request from the pending table; the caller then owns its future"""
+        with self._lock:
+            entry = self._pending.pop(request_id, None)
+            if entry is not None:
+                self._in_flight[entry[1]] -= 1
+        return entry
+
+    def _dispatch(self):
+        while not self._closing:
+            slots = {connection: slot for slot, connection in enumerate(self._connections) if connection is not None}
+            if not slots:
+                time.sleep(WATCHDOG_INTERVAL)
+            for connection in wait(list(slots), timeout=WATCHDOG_INTERVAL) if slots else ():
+                slot = slots[connection]
+                try:
+                    request_id, proba, error = connection.recv()
+                except (EOFError, OSError):
+                    # The worker is gone: stop listening, the watchdog restarts it
+                    self._connections[slot] = None
+                    connection.close()
+                    continue
+                if request_id == 'ready':
+                    continue
+                if request_id == 'error':
+                    self._broken.add(slot)
+                    continue
+                entry = self._take(request_id)
+                if entry is None or not entry[0].set_running_or_notify_cancel():
+                    continue  # Timed out, cancelled or failed already
+                if error is not None:
+                    entry[0].set_exception(RuntimeError(error))
+                else:
+                    entry[0].set_result(proba)
+            self._watch()
+
+    def _watch(self):
+        """Fail the requests of dead workers and restart them"""
+        now = time.monotonic()
+        if now - self._watched < WATCHDOG_INTERVAL:
+            return
+        self._watched = now
+        for slot, process in enumerate(self._processes):
+            if self._closing or process.is_alive() or slot in self._broken:
+                continue
+            with self._lock:
+                lost = [request_id for request_id, (_, owner) in self._pending.items() if owner == slot]
+                self._queues[slot].cancel_join_thread()
+                if self._connections[slot] is not None:
+                    self._connections[slot].close()
+                self._spawn(slot)
+                self.restarts += 1
+            for request_id in lost:
+                self._fail(request_id, f"Inference worker exited with code {process.exitcode}")
+
+    def _fail(self, request_id, message):
+        entry = self._take(request_id)
+        if entry is not None and entry[0].set_running_or_notify_cancel():
+            entry[0].set_exception(RuntimeError(message))
+
+    def _forget(self, request_id, future):
+        if future.cancelled():
+            self._take(request_id)
+
+    def submit(self, X):
+        """Queue a feature matrix (rows in FEATURES order); returns a Future of its probabilities"""
+        X = np.ascontiguousarray(X, dtype=np.float64)
+        future = Future()
+        request_id = next(self._ids)
+        with self._lock:
+            slots = [slot for slot in range(len(self._processes)) if slot not in self._broken]
+            if not slots:
+                future.set_exception(RuntimeError("No inference worker available"))
+                return future
+            slot = min(slots, key=self._in_flight.__getitem__)
+            self._pending[request_id] = (future, slot)
+            self._in_flight[slot] += 1
+            self.requests += 1
+            self.rows += len(X)
+            requests = self._queues[slot]
+        future.add_done_callback(functools.partial(self._forget, request_id))
+        requests.put((request_id, X))
+        return future
+
+    def predict_proba(self, X, timeout=None):
+        future = self.submit(X)
+        try:
+            return future.result(timeout)
+        except TimeoutError:
+            future.cancel()  # Its answer, if it comes, is dropped
+            raise
+
+    @property
+    def alive(self):
+        return sum(process is not None and process.is_alive() for process in self._processes)
+
+    def stats(self):
+        return {'workers': self.workers, 'alive': self.alive, 'requests': self.requests,
+                'rows': self.rows, 'pending': len(self._pending), 'restarts': self.restarts}
+
+    def close(self):
+        self._closing = True
+        for requests in self._queues:
+            if requests is not None:
+                requests.put(None)
+        for process in self._processes:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+        if self._dispatcher is not None:
+            self._dispatcher.join()
+        for connection in self._connections:
+            if connection is not None:
+                connection.close()
+        self._processes, self._queues, self._connections = [], [], []
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        for future, _ in pending.values():
+            if future.set_running_or_notify_cancel():
+                future.set_exception(RuntimeError("Inference service closed"))
+
+
+class RemoteModel:
+    """Model interface backed by an InferenceService"""
+
+    def __init__(self, service, timeout=None):
+        self.service = service
+        self.classes_ = service.classes_
+        self.feature_names_in_ = np.asarray(FEATURES, dtype=object)
+        self.timeout = timeout
+
+    def predict_proba(self, X):
+        return self.service.predict_proba(np.asarray(X, dtype=np.float64), self.timeout)
+
+    def predict(self, X):
+        return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
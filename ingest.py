@@ -0,0 +1,490 @@
+"""Headless ingestion and inference worker.
+
+Reads HRV feature samples from stdin, a TCP socket, a tailed file or a
+replayed DataFrame, classifies them in micro-batches on a background thread
+and publishes the results into a ResultBuffer. The Streamlit Live Monitor
+only polls that buffer, so the inference rate no longer depends on how fast
+the page can redraw.
+
+Input lines are either JSON objects ({"MEAN_RR": 812.4, "RMSSD": 21.0, ...})
+or CSV rows preceded by a header line in the sample_data.csv schema. With
+--rr, lines are raw RR intervals in ms (one per line) and features are
+extracted over a sliding window at 1 Hz by hrv_features.py. With --ring,
+samples come from another process through a shared-memory FeatureRing
+(feature_ring.py) and are scored straight from it by a RingWorker.
+
+Usage:
+    python ingest.py --stdin < sample_data.csv
+    python ingest.py --tail session.csv
+    python ingest.py --listen 127.0.0.1:9000
+    python ingest.py --stdin --rr < rr_intervals.txt
+    python ingest.py --replay sample_data.csv --rate 10
+    python ingest.py --ring stress_ring
+"""
+import argparse
+import csv
+import json
+import queue
+import socket
+import sys
+import threading
+import time
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+import metrics
+from feature_ring import N_FEATURES, FeatureRing
+from forest import CompiledForest, load_model
+from hrv_features import RRFeatureExtractor
+from inference import FEATURES, FLOAT32_MAX, feature_frame, score_array, score_batch
+from prediction_cache import PredictionCache
+from scheduler import DEFAULT_MAX_LAG, DEFAULT_POLICY, POLICIES, Backpressure, SensorClock
+
+
+# ==========================================
+# 1. SOURCES
+# ==========================================
+def parse_lines(lines):
+    """Turn JSON or CSV text lines into feature records (dicts of floats)"""
+    header = None
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        if line.startswith('{'):
+            try:
+                raw = json.loads(line)
+            except ValueError:
+                continue
+        elif header is None:
+            header = next(csv.reader([line]))
+            continue
+        else:
+            raw = dict(zip(header, next(csv.reader([line]))))
+
+        record = {}
+        try:
+            for name in FEATURES:
+                if raw.get(name) not in (None, ''):
+                    record[name] = float(raw[name])
+        except (TypeError, ValueError):
+            continue
+        # HR is optional, it is derived from MEAN_RR downstream
+        if all(name in record for name in ('MEAN_RR', 'RMSSD', 'LF_HF')):
+            yield record
+
+
+def scorable(record):
+    """Whether a record's features are finite as float32 (HR may be missing or NaN: it is derived)"""
+    try:
+        for name in FEATURES:
+            value = record.get(name)
+            if name == 'HR' and (value is None or value != value):
+                continue
+            if not abs(float(value)) <= FLOAT32_MAX:
+                return False
+    except (TypeError, ValueError):
+        return False
+    return True
+
+
+def parse_rr_lines(lines, window_seconds=300.0):
+    """Turn RR intervals (ms, one per line) into feature records at 1 Hz"""
+    extractor = RRFeatureExtractor(window_seconds)
+    for line in lines:
+        try:
+            rr = float(line)
+        except ValueError:
+            continue
+        if rr <= 0:
+            continue
+        for row in extractor.add(rr):
+            yield {name: row[name] for name in FEATURES}
+
+
+def stdin_source(parse=parse_lines):
+    """Samples piped into the worker"""
+    return parse(sys.stdin)
+
+
+def tail_source(path, poll_interval=0.2, stop_event=None, parse=parse_lines):
+    """Follow a growing file like ``tail -f``, starting from its beginning"""
+    def follow():
+        with open(path, 'r') as f:
+            pending = ''
+            while stop_event is None or not stop_event.is_set():
+                chunk = f.readline()
+                if not chunk:
+                    time.sleep(poll_interval)
+                    continue
+                pending += chunk
+                if pending.endswith('\n'):
+                    yield pending
+                    pending = ''
+    return parse(follow())
+
+
+def socket_source(host, port, stop_event=None, parse=parse_lines):
+    """Accept TCP connections and read newline-delimited samples from each in turn"""
+    def lines():
+        with socket.create_server((host, port)) as server:
+            server.settimeout(0.5)
+            while stop_event is None or not stop_event.is_set():
+                try:
+                    conn, _ = server.accept()
+                except socket.timeout:
+                    continue
+                with conn, conn.makefile('r') as f:
+                    # Each connection starts its own CSV header (or RR window)
+                    yield from parse(f)
+    return lines()
+
+
+def replay_source(df, rate_hz=None, stop_event=None):
+    """Replay a DataFrame of samples, optionally paced at rate_hz on the sensor clock"""
+    columns = [name for name in FEATURES if name in df.columns]
+    clock = SensorClock(rate_hz) if rate_hz else None
+    for values in df[columns].itertuples(index=False, name=None):
+        if stop_event is not None and stop_event.is_set():
+            return
+        if clock is not None:
+            clock.wait()
+        yield dict(zip(columns, values))
+
+
+# ==========================================
+# 2. SHARED RESULT BUFFER
+# ==========================================
+class ResultBuffer:
+    """Thread-safe bounded buffer of classified samples.
+
+    Every published result gets a sequence number; readers keep the last
+    number they saw and ask for everything after it.
+    """
+
+    def __init__(self, maxlen=10000):
+        self._items = deque(maxlen=maxlen)
+        self._lock = threading.Lock()
+        self._next_seq = 0
+        self.closed = False
+
+    def publish(self, results):
+        with self._lock:
+            for result in results:
+                result['seq'] = self._next_seq
+                self._next_seq += 1
+                self._items.append(result)
+
+    def read_since(self, seq, reader=None):
+        """Return results with a sequence number greater than seq.
+
+        Results evicted before the reader got to them are counted as
+        ``reader_overrun{reader=...}`` when a reader name is given; they were
+        scored and published, so they are not ``dropped``.
+        """
+        with self._lock:
+            if not self._items or self._items[-1]['seq'] <= seq:
+                return []
+            start = seq + 1 - self._items[0]['seq']
+            if start < 0:
+                # The reader fell more than maxlen results behind
+                if reader is not None:
+                    metrics.count_for('reader_overrun', 'reader', reader, -start)
+                start = 0
+            return [self._items[k] for k in range(start, len(self._items))]
+
+    @property
+    def published(self):
+        return self._next_seq
+
+    def close(self):
+        self.closed = True
+
+
+# ==========================================
+# 3. WORKER
+# ==========================================
+class IngestWorker:
+    """Pull samples from a source, score them in micro-batches, publish results"""
+
+    def __init__(self, model, source, buffer=None, max_batch=256, stop_event=None, backpressure=None):
+        self.model = model
+        self.source = source
+        self.buffer = buffer if buffer is not None else ResultBuffer()
+        self.max_batch = max_batch
+        self.backpressure = backpressure if backpressure is not None else Backpressure()
+        self.stop_event = stop_event if stop_event is not None else threading.Event()
+        self.error = None  # What stopped the worker (a failing source)
+        self.invalid = 0   # Samples skipped for non-finite features
+        self.failed = 0    # Samples in batches whose prediction raised
+        self.last_failure = None
+        self._queue = queue.Queue()
+        self._reader = threading.Thread(target=self._read, daemon=True)
+        self._scorer = threading.Thread(target=self._score, daemon=True)
+
+    def start(self):
+        self._reader.start()
+        self._scorer.start()
+        return self
+
+    def stop(self):
+        self.stop_event.set()
+
+    def join(self, timeout=None):
+        self._scorer.join(timeout)
+
+    @property
+    def running(self):
+        return self._scorer.is_alive()
+
+    def _read(self):
+        try:
+            for record in self.source:
+                if self.stop_event.is_set():
+                    break
+                if not scorable(record):
+                    # One inf or NaN would fail the whole batch it lands in
+                    self.invalid += 1
+                    metrics.count('invalid')
+                    continue
+                self._queue.put((time.monotonic(), record))
+        except Exception as e:
+            self.error = e
+        finally:
+            self._queue.put(None)  # End of stream
+
+    def _score(self):
+        done = False
+        try:
+            while not done and not self.stop_event.is_set():
+                try:
+                    batch = [self._queue.get(timeout=0.5)]
+                except queue.Empty:
+                    continue
+                # Drain whatever else has arrived into the same predict call; under
+                # the 'latest' policy take the whole backlog so stale samples can go
+                limit = None if self.backpressure.policy == 'latest' else self.max_batch
+                while limit is None or len(batch) < limit:
+                    try:
+                        batch.append(self._queue.get_nowait())
+                    except queue.Empty:
+                        break
+                if batch[-1] is None:
+                    done = True
+                    batch.pop()
+                arrivals = [arrived for arrived, _ in batch]
+                keep = self.backpressure.admit(arrivals)
+                for start in range(0, len(keep), self.max_batch):
+                    part = keep[start:start + self.max_batch]
+                    try:
+                        self._publish([batch[k][1] for k in part])
+                    except Exception as e:
+                        self._fail(len(part), e)
+                    self.backpressure.complete([arrivals[k] for k in part])
+        except Exception as e:
+            self.error = e
+        finally:
+            self.buffer.close()
+
+    def _fail(self, n, error):
+        """Count a batch whose scoring raised and carry on with the next one"""
+        self.failed += n
+        self.last_failure = f"{type(error).__name__}: {error}"
+        metrics.count('failed', n)
+
+    def _publish(self, batch):
+        with metrics.timer('features'):
+            features = feature_frame(pd.DataFrame.from_records(batch))
+        with metrics.timer('predict'):
+            labels, proba = score_batch(self.model, features)
+        self._emit(features[FEATURES].itertuples(index=False, name=None), labels, proba)
+
+    def _emit(self, rows, labels, proba, subjects=None):
+        metrics.count('scored', len(labels))
+        now = time.time()
+        with metrics.timer('publish'):
+            results = [
+                {
+                    'received': now,
+                    'MEAN_RR': mean_rr,
+                    'RMSSD': rmssd,
+                    'LF_HF': lf_hf,
+                    'HR': hr,
+                    'condition': labels[k],
+                    'proba': tuple(proba[k]),
+                }
+                for k, (mean_rr, rmssd, lf_hf, hr) in enumerate(rows)
+            ]
+            if subjects is not None:
+                for result, subject in zip(results, subjects):
+                    result['subject'] = subject
+            self.buffer.publish(results)
+
+
+class RingWorker(IngestWorker):
+    """IngestWorker fed by a shared-memory FeatureRing instead of a source.
+
+    The ring's producer runs in another process, so there is no reader
+    thread: the scorer polls the ring and passes each batch to the model as
+    a float32 view of the shared buffer, with no records, DataFrame or copy.
+    Lag is measured from the producer's write time.
+    """
+
+    def __init__(self, model, ring, buffer=None, max_batch=256, stop_event=None, backpressure=None,
+                 poll_interval=0.005):
+        super().__init__(model, None, buffer, max_batch, stop_event, backpressure)
+        self.ring = ring
+        self.poll_interval = poll_interval
+
+    def start(self):
+        self._scorer.start()
+        return self
+
+    def _score(self):
+        try:
+            while not self.stop_event.is_set():
+                limit = None if self.backpressure.policy == 'latest' else self.max_batch
+                records, subjects = self.ring.read(limit)
+                n = len(records)
+                if not n:
+                    if self.ring.done:
+                        break
+                    time.sleep(self.poll_interval)
+                    continue
+                arrivals = self.ring.arrivals(records)
+                keep = self.backpressure.admit(arrivals)
+                for start in range(n - len(keep), n, self.max_batch):
+                    part = slice(start, start + self.max_batch)
+                    try:
+                        self._publish_records(records[part], subjects[part])
+                    except Exception as e:
+                        self._fail(len(records[part]), e)
+                    self.backpressure.complete(arrivals[part])
+                del records, subjects  # The views must not outlive the release
+                self.ring.release(n)
+        except Exception as e:
+            self.error = e
+        finally:
+            self.buffer.close()
+
+    def _publish_records(self, records, subjects):
+        features = records[:, :N_FEATURES]
+        valid = np.isfinite(features).all(axis=1)
+        if not valid.all():
+            skipped = int((~valid).sum())
+            self.invalid += skipped
+            metrics.count('invalid', skipped)
+            features, subjects = features[valid], subjects[valid]
+            if not len(features):
+                return
+        with metrics.timer('predict'):
+            labels, proba = score_array(self.model, features)
+        self._emit(features.tolist(), labels, proba, subjects.tolist())
+
+
+# ==========================================
+# 4. COMMAND LINE
+# ==========================================
+def main():
+    parser = argparse.ArgumentParser(description="Classify a stream of HRV samples headlessly")
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument('--stdin', action='store_true', help="Read samples from standard input")
+    group.add_argument('--tail', metavar='FILE', help="Follow a file as it grows")
+    group.add_argument('--listen', metavar='HOST:PORT', help="Accept samples over TCP")
+    group.add_argument('--replay', metavar='CSV', help="Replay a recorded CSV")
+    group.add_argument('--ring', metavar='NAME', help="Read from a shared-memory ring (feature_ring.py)")
+    parser.add_argument('--rr', action='store_true', help="Input lines are raw RR intervals (ms)")
+    parser.add_argument('--window', type=float, default=300.0, help="Feature window in seconds for --rr")
+    parser.add_argument('--rate', type=float, default=None, help="Replay rate in samples/sec (default: as fast as possible)")
+    parser.add_argument('--model', default='stress_model.pkl', help="Pickled classifier or compiled forest directory")
+    parser.add_argument('--quiet', action='store_true', help="Only print throughput, not results")
+    parser.add_argument('--cache', type=int, default=0, metavar='N',
+                        help="Memoize predictions for up to N quantized feature vectors (0: off)")
+    parser.add_argument('--cache-resolution', type=float, nargs='+', metavar='STEP',
+                        help="Quantization step, one for all features or one per feature in model order")
+    parser.add_argument('--policy', choices=POLICIES, default=DEFAULT_POLICY,
+                        help="When scoring falls behind: score the whole backlog (batch) or drop samples "
+                             "older than --max-lag (latest)")
+    parser.add_argument('--max-lag', type=float, default=DEFAULT_MAX_LAG,
+                        help="Seconds from arrival to publication before a sample counts as late")
+    parser.add_argument('--metrics-port', type=int, default=0,
+                        help=f"Serve Prometheus metrics on this port (0: off, e.g. {metrics.DEFAULT_PORT})")
+    args = parser.parse_args()
+    # Check every argument before the model is loaded or a port is opened
+    if args.rr and (args.replay or args.ring):
+        parser.error("--rr reads raw intervals; it cannot be combined with --replay or --ring")
+    if args.listen:
+        host, _, port = args.listen.rpartition(':')
+        if not host or not port.isdigit():
+            parser.error(f"--listen takes HOST:PORT, not {args.listen!r}")
+    if args.cache_resolution and len(args.cache_resolution) not in (1, len(FEATURES)):
+        parser.error(f"--cache-resolution takes one step or one per feature ({len(FEATURES)})")
+
+    model = load_model(args.model, FEATURES)
+    if args.ring and not isinstance(model, CompiledForest):
+        # Ring batches are float32 arrays, which the compiled forest takes as they are
+        model = CompiledForest.from_sklearn(model)
+    if args.cache:
+        model = PredictionCache(model, args.cache_resolution, max_size=args.cache)
+    if args.metrics_port:
+        metrics.MetricsServer(port=args.metrics_port).start()
+
+    stop_event = threading.Event()
+    parse = (lambda lines: parse_rr_lines(lines, args.window)) if args.rr else parse_lines
+    if args.stdin:
+        source = stdin_source(parse)
+    elif args.tail:
+        source = tail_source(args.tail, stop_event=stop_event, parse=parse)
+    elif args.listen:
+        host, port = args.listen.rsplit(':', 1)
+        source = socket_source(host, int(port), stop_event=stop_event, parse=parse)
+    elif args.replay:
+        source = replay_source(pd.read_csv(args.replay), args.rate, stop_event=stop_event)
+
+    backpressure = Backpressure(args.policy, args.max_lag)
+    if args.ring:
+        try:
+            ring = FeatureRing.attach(args.ring)
+        except FileNotFoundError:
+            sys.exit(f"No ring named {args.ring}; start its producer first (python feature_ring.py --name {args.ring} ...)")
+        worker = RingWorker(model, ring, stop_event=stop_event, backpressure=backpressure).start()
+    else:
+        worker = IngestWorker(model, source, stop_event=stop_event, backpressure=backpressure).start()
+
+    last_seq = -1
+    start = time.perf_counter()
+    try:
+        while True:
+            results = worker.buffer.read_since(last_seq, 'cli')
+            for result in results:
+                last_seq = result['seq']
+                if not args.quiet:
+                    print(json.dumps({k: v for k, v in result.items() if k != 'received'}), flush=True)
+            if not results:
+                if worker.buffer.closed:
+                    break
+                time.sleep(0.05)
+    except KeyboardInterrupt:
+        worker.stop()
+
+    elapsed = time.perf_counter() - start
+    print(f"Classified {worker.buffer.published} samples in {elapsed:.2f}s "
+          f"({worker.buffer.published / max(elapsed, 1e-9):,.0f} samples/s)", file=sys.stderr)
+    print(f"Backpressure: {worker.backpressure.stats()}", file=sys.stderr)
+    if worker.invalid or worker.failed:
+        print(f"Skipped {worker.invalid} non-finite samples; {worker.failed} samples in failed batches"
+              + (f" (last: {worker.last_failure})" if worker.last_failure else ""), file=sys.stderr)
+    if isinstance(model, PredictionCache):
+        print(f"Prediction cache: {model.stats()}", file=sys.stderr)
+    if args.ring:
+        worker.join()
+        ring.close()
+    if worker.error is not None:
+        print(f"Worker error: {worker.error}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,245 @@
+"""Incremental live chart: push only new points to a client-side Plotly figure.
+
+Redrawing the live chart with ``st.plotly_chart`` re-serializes and re-sends
+the whole figure (every point of the window, plus layout) on every refresh.
+Here the browser keeps one Plotly figure and a small websocket server sends
+it just the samples published since its last frame, which it appends with
+``Plotly.extendTraces`` (trimming to the window client-side).
+
+Frames go out at ``frame_rate`` per second whatever the sample rate: all
+samples that arrived in between are coalesced into one message, and idle
+frames send nothing.
+
+Messages are JSON:
+    {"type": "reset", "start": <session start, epoch ms>, "window": 60}
+    {"type": "extend", "x": [seq, ...], "hr": [...], "rmssd": [...]}
+``x`` is the sample index, i.e. seconds since the start of the session.
+
+The browser connects to this port directly with plain ``ws:``, so the
+chart only works where that port is reachable and the page is not served
+over https (mixed content); the app therefore streams only when asked to.
+The server binds to 127.0.0.1 by default and refuses websocket handshakes
+whose Origin is not an allowed app page.
+
+Usage:
+    python -m benchmarks.live_chart
+"""
+import asyncio
+import json
+import os
+import threading
+import time
+from urllib.parse import parse_qs, urlsplit
+
+import metrics
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8502
+DEFAULT_APP_PORT = 8501
+DEFAULT_FRAME_RATE = 5.0
+DEFAULT_WINDOW = 60
+
+
+def chart_delta(results):
+    """Compact extend message for a list of published results"""
+    return {
+        'type': 'extend',
+        'x': [r['seq'] for r in results],
+        'hr': [round(float(r['HR']), 2) for r in results],
+        'rmssd': [round(float(r['RMSSD']), 2) for r in results],
+    }
+
+
+def local_origins(app_port=DEFAULT_APP_PORT):
+    """Origins of an app page opened on this machine"""
+    return [f'http://{host}:{app_port}' for host in ('localhost', '127.0.0.1')]
+
+
+class LiveChartServer:
+    """Websocket server streaming session result buffers to live charts.
+
+    Sessions are registered under a key with their ``ResultBuffer``; a
+    browser connects to ``ws://host:port/?session=<key>``. Registering a
+    new buffer under the same key (a restarted session) makes connected
+    charts reset. The server also serves ``/plotly.min.js`` from the
+    installed plotly package so the chart needs no CDN. Websocket
+    connections must come from one of ``origins`` (default: the app on
+    localhost).
+    """
+
+    def __init__(self, host=DEFAULT_HOST, port=DEFAULT_PORT, frame_rate=DEFAULT_FRAME_RATE, window=DEFAULT_WINDOW,
+                 origins=None):
+        self.host = host
+        self.origins = set(origins if origins is not None else local_origins())
+        self.port = port
+        self.frame_rate = frame_rate
+        self.window = window
+        self.sessions = {}  # key -> (buffer, start epoch ms)
+        self.frames = 0
+        self.bytes_sent = 0
+        self._lock = threading.Lock()
+        self._ready = threading.Event()
+        self._error = None
+        self._loop = None
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        """Start serving on a background thread; raises if the port cannot be bound"""
+        self._thread.start()
+        self._ready.wait()
+        if self._error is not None:
+            raise self._error
+        return self
+
+    def register(self, key, buffer, start_time):
+        with self._lock:
+            self.sessions[key] = (buffer, start_time.timestamp() * 1000)
+
+    def unregister(self, key):
+        with self._lock:
+            self.sessions.pop(key, None)
+
+    def _session(self, key):
+        with self._lock:
+            return self.sessions.get(key)
+
+    def _run(self):
+        from websockets.asyncio.server import serve
+
+        async def main():
+            async with serve(self._handle, self.host, self.port, process_request=self._process_request):
+                self._ready.set()
+                await asyncio.Future()
+
+        self._loop = asyncio.new_event_loop()
+        try:
+            self._loop.run_until_complete(main())
+        except Exception as e:
+            self._error = e
+            self._ready.set()
+
+    def _process_request(self, connection, request):
+        if urlsplit(request.path).path != '/plotly.min.js':
+            # A page from another site must not read session data over the socket
+            if request.headers.get('Origin') not in self.origins:
+                return connection.respond(403, "Origin not allowed\n")
+            return None
+        response = connection.respond(200, _plotly_js())
+        del response.headers['Content-Type']
+        response.headers['Content-Type'] = 'application/javascript'
+        response.headers['Cache-Control'] = 'max-age=86400'
+        return response
+
+    async def _handle(self, websocket):
+        key = parse_qs(urlsplit(websocket.request.path).query).get('session', [''])[0]
+        period = 1.0 / self.frame_rate
+        current = None
+        last_seq = -1
+        while True:
+            session = self._session(key)
+            if session is not None and session[0] is not current:
+                current, start_ms = session
+                last_seq = -1
+                await self._send(websocket, {'type': 'reset', 'start': start_ms, 'window': self.window})
+            if current is not None:
+                # A fresh connection only wants the newest window, so nothing it skips is an overrun
+                results = current.read_since(last_seq, 'chart' if last_seq >= 0 else None)
+                if results:
+                    # Only the last window's worth matters to a chart that just (re)connected
+                    results = results[-self.window:]
+                    last_seq = results[-1]['seq']
+                    await self._send(websocket, chart_delta(results))
+            await asyncio.sleep(period)
+
+    async def _send(self, websocket, message):
+        start = time.perf_counter()
+        payload = json.dumps(message, separators=(',', ':'))
+        await websocket.send(payload)
+        metrics.observe('chart_frame', time.perf_counter() - start)
+        self.frames += 1
+        self.bytes_sent += len(payload)
+
+    def stats(self):
+        return {'sessions': len(self.sessions), 'frames': self.frames, 'bytes_sent': self.bytes_sent}
+
+
+_PLOTLY_JS = None
+
+
+def _plotly_js():
+    global _PLOTLY_JS
+    if _PLOTLY_JS is None:
+        import plotly
+        path = os.path.join(os.path.dirname(plotly.__file__), 'package_data', 'plotly.min.js')
+        with open(path, encoding='utf-8') as f:
+            _PLOTLY_JS = f.read()
+    return _PLOTLY_JS
+
+
+CHART_TEMPLATE = """
+<div id="chart" style="height:{height}px"></div>
+<script>
+(function () {{
+  // The iframe is a srcdoc document, so take host and scheme from the app page
+  var host = 'localhost', secure = false;
+  try {{
+    host = window.parent.location.hostname || host;
+    secure = window.parent.location.protocol === 'https:';
+  }} catch (e) {{}}
+  var base = '//' + host + ':{port}';
+  var script = document.createElement('script');
+  script.src = (secure ? 'https:' : 'http:') + base + '/plotly.min.js';
+  script.onload = start;
+  document.head.appendChild(script);
+
+  var layout = {{
+    height: {height}, margin: {{l: 20, r: 20, t: 20, b: 20}},
+    xaxis: {{title: {{text: 'Time'}}, type: 'date'}},
+    yaxis: {{title: {{text: 'Heart Rate (BPM)'}}, side: 'left'}},
+    yaxis2: {{title: {{text: 'HRV (ms)'}}, overlaying: 'y', side: 'right'}},
+    hovermode: 'x unified',
+    legend: {{orientation: 'h', yanchor: 'bottom', y: 1.02, xanchor: 'right', x: 1}},
+    shapes: [{{type: 'line', xref: 'paper', x0: 0, x1: 1, y0: 70, y1: 70,
+               line: {{dash: 'dash', color: 'gray'}}, opacity: 0.5}}],
+    annotations: [{{xref: 'paper', x: 1, xanchor: 'right', y: 70, yanchor: 'bottom',
+                    text: 'Baseline HR', showarrow: false, opacity: 0.5}}]
+  }};
+  var traces = [
+    {{x: [], y: [], name: 'Heart Rate', mode: 'lines', line: {{color: '#FF6B6B', width: 2}}}},
+    {{x: [], y: [], name: 'HRV (RMSSD)', mode: 'lines', yaxis: 'y2', line: {{color: '#4ECDC4', width: 2}}}}
+  ];
+  var start_ms = 0, window_size = {window};
+
+  function start() {{
+    Plotly.newPlot('chart', traces, layout, {{responsive: true, displaylogo: false}});
+    connect();
+  }}
+
+  function connect() {{
+    var ws = new WebSocket((secure ? 'wss:' : 'ws:') + base + '/?session={session}');
+    ws.onmessage = function (event) {{
+      var msg = JSON.parse(event.data);
+      if (msg.type === 'reset') {{
+        start_ms = msg.start;
+        window_size = msg.window;
+        Plotly.restyle('chart', {{x: [[], []], y: [[], []]}});
+      }} else if (msg.type === 'extend') {{
+        var x = msg.x.map(function (s) {{ return new Date(start_ms + 1000 * s); }});
+        Plotly.extendTraces('chart', {{x: [x, x], y: [msg.hr, msg.rmssd]}}, [0, 1], window_size);
+      }}
+    }};
+    ws.onclose = function () {{ setTimeout(connect, 1000); }};
+  }}
+}})();
+</script>
+"""
+
+
+def chart_html(session, port=DEFAULT_PORT, height=350, window=DEFAULT_WINDOW):
+    """HTML for a components.html iframe holding the live chart of one session.
+
+    The markup only depends on its arguments, so re-rendering it with the
+    same session keeps the existing iframe (and its figure) in place.
+    """
+    return CHART_TEMPLATE.format(session=session, port=port, height=height, window=window)
+
@@ -0,0 +1,222 @@
+"""Hot-path latency instrumentation for the live pipeline.
+
+Stages are timed with ``timer(stage)`` (or ``observe(stage, seconds)``) and
+recorded in one histogram per stage: cumulative buckets for Prometheus plus
+a ring of the most recent observations for rolling percentiles. Sample
+events (scored, displayed, dropped, ...) are plain counters; per-reader or
+per-client events go to labelled counters (``count_for``). Recording is a
+bisect and a few additions under a lock, cheap enough for every batch.
+
+``MetricsServer`` serves the process-wide registry in the Prometheus text
+format on ``/metrics``; ``snapshot()`` feeds the app's debug panel.
+
+Usage:
+    with metrics.timer('predict'):
+        labels, proba = score_batch(model, features)
+    metrics.count('scored', len(labels))
+
+    curl http://127.0.0.1:9108/metrics
+"""
+import bisect
+import math
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+DEFAULT_PORT = 9108
+# Seconds, from 50 µs (a compiled-forest predict) to 2.5 s (a stalled rerun)
+DEFAULT_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+                   0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+DEFAULT_WINDOW = 1024
+
+PREFIX = 'stress'
+SNAPSHOT_COLUMNS = ['stage', 'count', 'mean_ms', 'p50_ms', 'p99_ms', 'max_ms']
+FAMILY_HELP = {
+    'reader_overrun': "Results evicted from a result buffer before the reader saw them",
+}
+
+
+class Histogram:
+    """Cumulative bucket counts plus a rolling window of recent observations"""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS, window=DEFAULT_WINDOW):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # last bucket is +Inf
+        self.count = 0
+        self.sum = 0.0
+        self._recent = [math.nan] * window
+        self._lock = threading.Lock()
+
+    def observe(self, seconds):
+        i = bisect.bisect_left(self.buckets, seconds)
+        with self._lock:
+            self.counts[i] += 1
+            self._recent[self.count % len(self._recent)] = seconds
+            self.count += 1
+            self.sum += seconds
+
+    def recent(self):
+        """The last ``window`` observations (unordered)"""
+        with self._lock:
+            n = min(self.count, len(self._recent))
+            return np.array(self._recent[:n])
+
+
+class _Timer:
+    __slots__ = ('registry', 'stage', 'start')
+
+    def __init__(self, registry, stage):
+        self.registry = registry
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.registry.observe(self.stage, time.perf_counter() - self.start)
+
+
+class Registry:
+    """Per-stage latency histograms and sample counters"""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS, window=DEFAULT_WINDOW):
+        self.buckets = buckets
+        self.window = window
+        self.stages = {}
+        self.counters = {}
+        self.families = {}  # name -> {(label, value): count}
+        self._lock = threading.Lock()
+
+    def histogram(self, stage):
+        histogram = self.stages.get(stage)
+        if histogram is None:
+            with self._lock:
+                histogram = self.stages.setdefault(stage, Histogram(self.buckets, self.window))
+        return histogram
+
+    def observe(self, stage, seconds):
+        self.histogram(stage).observe(seconds)
+
+    def timer(self, stage):
+        return _Timer(self, stage)
+
+    def count(self, event, n=1):
+        with self._lock:
+            self.counters[event] = self.counters.get(event, 0) + n
+
+    def count_for(self, name, label, value, n=1):
+        """Add n to the counter ``name{label="value"}``"""
+        with self._lock:
+            family = self.families.setdefault(name, {})
+            family[(label, value)] = family.get((label, value), 0) + n
+
+    def reset(self):
+        with self._lock:
+            self.stages = {}
+            self.counters = {}
+            self.families = {}
+
+    def snapshot(self):
+        """Rolling latency percentiles per stage, in milliseconds, as a DataFrame"""
+        import pandas as pd
+        rows = []
+        for stage, histogram in sorted(self.stages.items()):
+            recent = histogram.recent() * 1e3
+            if not len(recent):
+                continue
+            p50, p99 = np.percentile(recent, [50, 99])
+            rows.append((stage, histogram.count, recent.mean(), p50, p99, recent.max()))
+        return pd.DataFrame(rows, columns=SNAPSHOT_COLUMNS)
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format"""
+        lines = [
+            f"# HELP {PREFIX}_stage_seconds Latency of live pipeline stages",
+            f"# TYPE {PREFIX}_stage_seconds histogram",
+        ]
+        for stage, histogram in sorted(self.stages.items()):
+            with histogram._lock:
+                counts, total, count = list(histogram.counts), histogram.sum, histogram.count
+            cumulative = 0
+            for bound, n in zip(histogram.buckets + (math.inf,), counts):
+                cumulative += n
+                le = '+Inf' if bound == math.inf else repr(bound)
+                lines.append(f'{PREFIX}_stage_seconds_bucket{{stage="{stage}",le="{le}"}} {cumulative}')
+            lines.append(f'{PREFIX}_stage_seconds_sum{{stage="{stage}"}} {total!r}')
+            lines.append(f'{PREFIX}_stage_seconds_count{{stage="{stage}"}} {count}')
+        lines += [
+            f"# HELP {PREFIX}_samples_total Samples by pipeline event",
+            f"# TYPE {PREFIX}_samples_total counter",
+        ]
+        for event, n in sorted(self.counters.items()):
+            lines.append(f'{PREFIX}_samples_total{{event="{event}"}} {n}')
+        for name, family in sorted(self.families.items()):
+            lines += [
+                f"# HELP {PREFIX}_{name}_total {FAMILY_HELP.get(name, name)}",
+                f"# TYPE {PREFIX}_{name}_total counter",
+            ]
+            for (label, value), n in sorted(family.items()):
+                lines.append(f'{PREFIX}_{name}_total{{{label}="{value}"}} {n}')
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+
+def timer(stage):
+    """Context manager timing a block into the process-wide registry"""
+    return REGISTRY.timer(stage)
+
+
+def observe(stage, seconds):
+    REGISTRY.observe(stage, seconds)
+
+
+def count(event, n=1):
+    REGISTRY.count(event, n)
+
+
+def count_for(name, label, value, n=1):
+    REGISTRY.count_for(name, label, value, n)
+
+
+class MetricsServer:
+    """Serve a registry on /metrics from a background thread"""
+
+    def __init__(self, host='127.0.0.1', port=DEFAULT_PORT, registry=REGISTRY):
+        self.host = host
+        self.port = port
+        self.registry = registry
+        self._server = None
+
+    def start(self):
+        registry = self.registry
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] != '/metrics':
+                    self.send_error(404)
+                    return
+                body = registry.render().encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((self.host, self.port), Handler)
+        self._server.daemon_threads = True
+        self.port = self._server.server_address[1]
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
@@ -0,0 +1,273 @@
+"""Asyncio monitoring server for many concurrent subjects.
+
+Each client connection streams newline-delimited JSON samples:
+
+    {"subject": "p01", "MEAN_RR": 812.4, "RMSSD": 21.0, "LF_HF": 3.2, "HR": 74.1, "t": 1712.05}
+
+Samples from every connection are micro-batched into a single
+``predict_proba`` call, and each one is answered on its own connection:
+
+    {"subject": "p01", "seq": 17, "condition": "no stress", "smoothed": "no stress", "proba": [...], "t": 1712.05}
+
+``condition`` is the raw prediction, ``smoothed`` the subject's label after
+temporal smoothing (smoothing.py). ``t`` is echoed back untouched so
+clients can measure round-trip latency.
+Sending {"cmd": "stats"} returns server counters instead of a prediction.
+A sample with a missing or non-finite feature, or one in a batch the model
+fails on, is answered with {"error": ...}; other clients are unaffected.
+
+Replies are written by each connection's own task. A client that stops
+reading only fills its own reply queue and is disconnected once more than
+``max_replies`` replies are waiting; the others keep being served. The
+queue of samples waiting to be batched is bounded too, so a server that
+falls behind stops reading from the sockets instead of buffering.
+
+Usage:
+    python monitor_server.py --port 8765
+    python -m benchmarks.loadgen --subjects 50
+"""
+import argparse
+import asyncio
+import json
+import time
+
+import numpy as np
+
+import metrics
+from forest import load_model
+from inference import FEATURES, finite_rows, score_batch
+from prediction_cache import PredictionCache
+from smoothing import DEFAULT_ALPHA, DEFAULT_MIN_DWELL, ProbaSmoother
+
+
+class SubjectState:
+    """What the server remembers about one monitored subject"""
+
+    def __init__(self, subject, n_classes):
+        self.subject = subject
+        self.samples = 0
+        self.class_counts = np.zeros(n_classes, dtype=np.int64)
+        self.last_condition = None
+        self.last_smoothed = None
+        self.last_proba = None
+        self.last_seen = None
+
+
+class Connection:
+    """One client's socket and the replies queued for it"""
+
+    def __init__(self, writer, max_replies):
+        self.writer = writer
+        self.replies = asyncio.Queue(maxsize=max_replies)
+        self.closed = False
+
+    def send(self, message):
+        """Queue a reply; False (and the client dropped) if its queue is full"""
+        try:
+            self.replies.put_nowait((json.dumps(message) + '\n').encode())
+        except asyncio.QueueFull:
+            self.drop()
+            return False
+        return True
+
+    def drop(self):
+        """Disconnect without flushing, discarding the replies still queued"""
+        self.closed = True
+        metrics.count('undelivered', self.replies.qsize() + 1)
+        self.writer.transport.abort()
+
+    def close(self):
+        """Hand the replies still queued to the transport, which flushes them on close"""
+        self.closed = True
+        while not self.replies.empty():
+            self.writer.write(self.replies.get_nowait())
+        self.writer.close()
+
+    async def write_loop(self):
+        try:
+            while True:
+                data = await self.replies.get()
+                self.writer.write(data)
+                await self.writer.drain()
+        except ConnectionError:
+            pass
+
+
+class MonitorServer:
+    """Accept feature streams and score them across subjects in micro-batches"""
+
+    def __init__(self, model, max_batch=512, max_wait=0.005, smoother=None, max_pending=None, max_replies=1024):
+        self.model = model
+        self.classes = [str(c) for c in model.classes_]
+        self.smoother = smoother if smoother is not None else ProbaSmoother(self.classes)
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.max_pending = max_pending if max_pending is not None else 4 * max_batch
+        self.max_replies = max_replies
+        self.subjects = {}
+        self.connections = 0
+        self.slow_clients = 0
+        self.samples = 0
+        self.batches = 0
+        self._pending = None
+
+    async def serve(self, host, port):
+        self._pending = asyncio.Queue(maxsize=self.max_pending)
+        batcher = asyncio.create_task(self._batch_loop())
+        server = await asyncio.start_server(self._handle, host, port)
+        print(f"Monitoring server listening on {host}:{port}")
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            batcher.cancel()
+
+    def stats(self):
+        stats = {
+            'subjects': len(self.subjects),
+            'connections': self.connections,
+            'slow_clients': self.slow_clients,
+            'samples': self.samples,
+            'batches': self.batches,
+            'mean_batch': self.samples / self.batches if self.batches else 0.0,
+        }
+        if isinstance(self.model, PredictionCache):
+            stats['cache'] = self.model.stats()
+        return stats
+
+    async def _handle(self, reader, writer):
+        self.connections += 1
+        connection = Connection(writer, self.max_replies)
+        sender = asyncio.create_task(connection.write_loop())
+        try:
+            while not connection.closed:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    message = json.loads(line)
+                    if message.get('cmd') == 'stats':
+                        self._send(connection, self.stats())
+                        continue
+                    features = [float(message[name]) for name in FEATURES]
+                    if not finite_rows(features)[0]:
+                        raise ValueError("features must be finite (as float32)")
+                except (ValueError, KeyError, TypeError, AttributeError) as e:
+                    self._send(connection, {'error': f"bad sample: {e}"})
+                    continue
+
+                subject = str(message.get('subject', 'default'))
+                state = self.subjects.get(subject)
+                if state is None:
+                    state = self.subjects[subject] = SubjectState(subject, len(self.classes))
+                # Waits while the batcher is behind, so fast senders are held
+                # back by their socket buffers rather than by server memory
+                await self._pending.put((state, features, message.get('t'), connection))
+        except ConnectionError:
+            pass
+        finally:
+            self.connections -= 1
+            sender.cancel()
+            if not connection.closed:
+                connection.close()
+
+    def _send(self, connection, message):
+        if connection.closed:
+            metrics.count('undelivered')  # Client gone; not a backpressure drop
+        elif not connection.send(message):
+            self.slow_clients += 1
+
+    async def _batch_loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._pending.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._pending.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            X = np.array([features for _, features, _, _ in batch], dtype=np.float64)
+            # Keep the event loop serving sockets while the forest runs
+            start = time.perf_counter()
+            try:
+                labels, proba = await loop.run_in_executor(None, score_batch, self.model, X)
+            except Exception as e:
+                # Fail this batch's samples only; the loop keeps serving everyone
+                metrics.count('failed', len(batch))
+                error = f"prediction failed: {type(e).__name__}: {e}"
+                for state, _, t, connection in batch:
+                    self._send(connection, {'subject': state.subject, 'error': error, 't': t})
+                continue
+            metrics.observe('predict', time.perf_counter() - start)
+            metrics.count('scored', len(batch))
+            self.batches += 1
+            self.samples += len(batch)
+            with metrics.timer('smoothing'):
+                smoothed = self.smoother.update_labels([state.subject for state, _, _, _ in batch], proba)
+            reply_start = time.perf_counter()
+
+            now = time.time()
+            for k, (state, _, t, connection) in enumerate(batch):
+                state.samples += 1
+                state.class_counts[np.argmax(proba[k])] += 1
+                state.last_condition = str(labels[k])
+                state.last_smoothed = smoothed[k]
+                state.last_proba = proba[k]
+                state.last_seen = now
+                reply = {
+                    'subject': state.subject,
+                    'seq': state.samples - 1,
+                    'condition': state.last_condition,
+                    'smoothed': state.last_smoothed,
+                    'proba': proba[k].tolist(),
+                    't': t,
+                }
+                self._send(connection, reply)
+            metrics.observe('reply', time.perf_counter() - reply_start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Multi-subject stress monitoring server")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--model', default='stress_model.pkl', help="Pickled classifier or compiled forest directory")
+    parser.add_argument('--max-batch', type=int, default=512, help="Largest micro-batch per predict call")
+    parser.add_argument('--max-wait', type=float, default=0.005, help="Seconds to wait while filling a batch")
+    parser.add_argument('--max-pending', type=int, default=None,
+                        help="Samples waiting to be batched before sockets stop being read (default: 4 x --max-batch)")
+    parser.add_argument('--max-replies', type=int, default=1024,
+                        help="Replies queued for a client before it is disconnected for not reading")
+    parser.add_argument('--smooth-alpha', type=float, default=DEFAULT_ALPHA,
+                        help="EMA weight of each new probability row (1: no averaging)")
+    parser.add_argument('--min-dwell', type=int, default=DEFAULT_MIN_DWELL,
+                        help="Samples a new class must persist before the smoothed label switches")
+    parser.add_argument('--cache', type=int, default=0, metavar='N',
+                        help="Memoize predictions for up to N quantized feature vectors (0: off)")
+    parser.add_argument('--cache-resolution', type=float, nargs='+', metavar='STEP',
+                        help="Quantization step, one for all features or one per feature in model order")
+    parser.add_argument('--metrics-port', type=int, default=0,
+                        help=f"Serve Prometheus metrics on this port (0: off, e.g. {metrics.DEFAULT_PORT})")
+    args = parser.parse_args()
+
+    model = load_model(args.model, FEATURES)
+    if args.cache:
+        model = PredictionCache(model, args.cache_resolution, max_size=args.cache)
+    if args.metrics_port:
+        metrics.MetricsServer(args.host, args.metrics_port).start()
+
+    smoother = ProbaSmoother(model.classes_, args.smooth_alpha, args.min_dwell)
+    server = MonitorServer(model, max_batch=args.max_batch, max_wait=args.max_wait, smoother=smoother,
+                           max_pending=args.max_pending, max_replies=args.max_replies)
+    try:
+        asyncio.run(server.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
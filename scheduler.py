@@ -0,0 +1,116 @@
+"""Real-time pacing, lag tracking and backpressure for the live pipeline.
+
+``SensorClock`` paces a source to the sensor's rate: sample k is due at
+``start + k / rate_hz``, so time spent elsewhere is absorbed instead of
+accumulating as drift, and samples the source could not deliver on time
+are counted.
+
+``Backpressure`` sits between the ingest worker's queue and the model. Each
+sample is stamped when it arrives; its lag is the time from arrival to
+publication and its deadline is ``max_lag`` seconds after arrival. When
+the worker falls behind, the policy decides what happens:
+
+    batch   score the whole backlog in one predict call (latency grows
+            with the backlog, but nothing is lost)
+    latest  keep only the newest samples that can still be scored within
+            their deadline, given the measured scoring cost per sample, and
+            drop the rest, so lag stays bounded by max_lag under sustained
+            overload
+
+Lag goes to the ``lag`` latency histogram and missed deadlines and dropped
+samples to the ``late`` and ``dropped`` counters (metrics.py).
+
+Usage:
+    python -m benchmarks.scheduler
+"""
+import time
+
+import numpy as np
+
+import metrics
+
+POLICIES = ('batch', 'latest')
+DEFAULT_POLICY = 'batch'
+DEFAULT_MAX_LAG = 1.0
+
+
+class SensorClock:
+    """Deadline-based pacing at a fixed sample rate (no drift)"""
+
+    def __init__(self, rate_hz, clock=time.monotonic, sleep=time.sleep):
+        self.period = 1.0 / rate_hz
+        self.clock = clock
+        self.sleep = sleep
+        self.start = None
+        self.ticks = 0
+        self.late = 0
+
+    def wait(self):
+        """Sleep until the next sample is due; returns its due time"""
+        now = self.clock()
+        if self.start is None:
+            self.start = now
+        due = self.start + self.ticks * self.period
+        self.ticks += 1
+        if due > now:
+            self.sleep(due - now)
+        elif now - due > self.period:
+            # The source itself is more than a sample behind the sensor clock
+            self.late += 1
+        return due
+
+
+class Backpressure:
+    """Admit queued samples under a lag budget and record their lag"""
+
+    def __init__(self, policy=DEFAULT_POLICY, max_lag=DEFAULT_MAX_LAG, clock=time.monotonic):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown policy {policy!r}, expected one of {POLICIES}")
+        self.policy = policy
+        self.max_lag = max_lag
+        self.clock = clock
+        self.samples = 0
+        self.late = 0
+        self.dropped = 0
+        self.max_seen = 0.0
+        self.row_cost = 0.0  # EWMA of scoring seconds per sample
+        self._admitted = None
+
+    def admit(self, arrivals):
+        """Indices of the queued samples (by arrival time) to score now"""
+        now = self._admitted = self.clock()
+        n = len(arrivals)
+        if self.policy != 'latest' or n <= 1:
+            return np.arange(n)
+        # The newest k samples finish after about k * row_cost; keep the largest k
+        # whose oldest member still meets its deadline (and always the newest one)
+        ages = now - np.asarray(arrivals)[::-1]
+        k = np.arange(1, n + 1)
+        fits = np.flatnonzero(ages + k * self.row_cost <= self.max_lag)
+        keep_n = int(fits[-1]) + 1 if len(fits) else 1
+        dropped = n - keep_n
+        if dropped:
+            self.dropped += dropped
+            metrics.count('dropped', dropped)
+        return np.arange(dropped, n)
+
+    def complete(self, arrivals):
+        """Record the lag of samples that have just been published"""
+        now = self.clock()
+        if self._admitted is not None and len(arrivals):
+            cost = (now - self._admitted) / len(arrivals)
+            self.row_cost = cost if not self.row_cost else 0.8 * self.row_cost + 0.2 * cost
+            self._admitted = now
+        for arrived in arrivals:
+            lag = now - arrived
+            metrics.observe('lag', lag)
+            if lag > self.max_seen:
+                self.max_seen = lag
+            if lag > self.max_lag:
+                self.late += 1
+                metrics.count('late')
+        self.samples += len(arrivals)
+
+    def stats(self):
+        return {'policy': self.policy, 'samples': self.samples, 'late': self.late,
+                'dropped': self.dropped, 'max_lag': float(self.max_seen)}
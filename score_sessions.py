@@ -0,0 +1,142 @@
+"""Offline bulk scoring of recorded sessions across a process pool.
+
+Every CSV in a directory (sample_data.csv schema) is scored in one
+vectorized pass; predictions are written per file next to a summary.csv
+holding the Session Report's overview statistics for each session.
+Durations come from the file's time column (seconds, or timestamps as in
+the Session Report export) and assume one sample per second without one. A
+file that cannot be read or scored gets its error in the summary instead
+of stopping the run. The output directory, summary.csv and
+*_predictions.csv files are never taken as input.
+
+Files are spread over worker processes that each load the model once at
+startup. A pickled forest is compiled in each worker, which then hands
+files over SKLEARN_BATCH rows to sklearn (faster on large batches); a
+compiled forest directory is memory-mapped instead, so all workers share
+the same physical pages, but it scores every file with the NumPy
+traversal.
+
+Usage:
+    python score_sessions.py recordings/ -o scored/
+    python score_sessions.py recordings/ -o scored/ --workers 8 --model stress_model_forest
+"""
+import argparse
+import glob
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from aggregates import SessionAggregator
+from forest import DEFAULT_PATH, CompiledForest, load_model
+from inference import FEATURES, feature_frame, proba_columns, score_batch
+
+DEFAULT_MODEL = 'stress_model.pkl' if os.path.exists('stress_model.pkl') else DEFAULT_PATH
+TIME_COLUMNS = ('time', 't', 'Time', 'timestamp')
+SUMMARY_KEYS = ['duration', 'avg_hr', 'max_hr', 'min_hr', 'avg_hrv', 'stress_percentage']
+
+_model = None  # set in each worker by _init_worker
+
+
+def _init_worker(model_path):
+    global _model
+    _model = load_model(model_path, FEATURES)
+    if not isinstance(_model, CompiledForest):
+        _model = CompiledForest.from_sklearn(_model)
+
+
+def sample_times(column):
+    """Seconds since the first sample, from numeric seconds or timestamps"""
+    if pd.api.types.is_numeric_dtype(column):
+        seconds = column.to_numpy(dtype=np.float64)
+    else:
+        stamps = pd.to_datetime(column)
+        seconds = (stamps - stamps.iloc[0]).dt.total_seconds().to_numpy()
+    return seconds - seconds[0] if len(seconds) else seconds
+
+
+def score_file(path, output_dir):
+    """Score one recording with the worker's model; returns its summary row"""
+    start = time.perf_counter()
+    try:
+        raw = pd.read_csv(path, usecols=lambda column: column in FEATURES or column in TIME_COLUMNS)
+        data = feature_frame(raw)
+        labels, proba = score_batch(_model, data)
+
+        name = os.path.splitext(os.path.basename(path))[0]
+        out = pd.DataFrame(proba, columns=proba_columns(_model.classes_))
+        out.insert(0, 'prediction', labels)
+        out.to_csv(os.path.join(output_dir, f"{name}_predictions.csv"), index=False)
+
+        column = next((c for c in TIME_COLUMNS if c in raw.columns), None)
+        times = sample_times(raw[column]) if column is not None else np.arange(len(data))
+        aggregates = SessionAggregator()
+        aggregates.update_batch(times, data['HR'], data['RMSSD'], data['LF_HF'], labels)
+        stats = aggregates.stats() or dict.fromkeys(SUMMARY_KEYS, np.nan)
+    except Exception as e:
+        return {'file': os.path.basename(path), 'rows': 0, **dict.fromkeys(SUMMARY_KEYS, np.nan),
+                'seconds': time.perf_counter() - start, 'error': f"{type(e).__name__}: {e}"}
+    return {'file': os.path.basename(path), 'rows': len(data), **stats,
+            'seconds': time.perf_counter() - start, 'error': ''}
+
+
+def input_paths(input_dir, output_dir, pattern='*.csv'):
+    """Recordings matching pattern, leaving out this tool's own output"""
+    output = os.path.realpath(output_dir)
+    separate = output != os.path.realpath(input_dir)
+    paths = []
+    for path in glob.glob(os.path.join(input_dir, pattern)):
+        name = os.path.basename(path)
+        if name == 'summary.csv' or name.endswith('_predictions.csv'):
+            continue
+        if separate and os.path.realpath(path).startswith(output + os.sep):
+            continue
+        paths.append(path)
+    return sorted(paths)
+
+
+def score_directory(input_dir, output_dir, model_path=DEFAULT_MODEL, workers=None, pattern='*.csv', log=print):
+    """Score every matching CSV in input_dir; returns the summary DataFrame"""
+    paths = input_paths(input_dir, output_dir, pattern)
+    if not paths:
+        raise FileNotFoundError(f"No files matching {pattern} in {input_dir}")
+    # Largest first, so one big file does not start last and hold up the pool
+    paths.sort(key=os.path.getsize, reverse=True)
+    os.makedirs(output_dir, exist_ok=True)
+
+    start = time.perf_counter()
+    if workers == 1:
+        _init_worker(model_path)
+        rows = [score_file(path, output_dir) for path in paths]
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(model_path,)) as pool:
+            rows = list(pool.map(score_file, paths, [output_dir] * len(paths)))
+    elapsed = time.perf_counter() - start
+
+    summary = pd.DataFrame(rows).sort_values('file', ignore_index=True)
+    summary.to_csv(os.path.join(output_dir, 'summary.csv'), index=False)
+    total = int(summary['rows'].sum())
+    failed = int((summary['error'] != '').sum())
+    log(f"Scored {len(paths) - failed} files ({total:,} rows) in {elapsed:.2f}s: "
+        f"{len(paths) / elapsed:.1f} files/s, {total / elapsed:,.0f} rows/s"
+        + (f"; {failed} failed (see the error column)" if failed else ""))
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Score a directory of recorded sessions")
+    parser.add_argument('input_dir', help="Directory of CSVs in the sample_data.csv schema")
+    parser.add_argument('-o', '--output-dir', required=True, help="Where predictions and summary.csv go")
+    parser.add_argument('--model', default=DEFAULT_MODEL, help="Pickled classifier or compiled forest directory")
+    parser.add_argument('--workers', type=int, help="Worker processes (default: one per CPU; 1 scores inline)")
+    parser.add_argument('--pattern', default='*.csv')
+    args = parser.parse_args()
+
+    summary = score_directory(args.input_dir, args.output_dir, args.model, args.workers, args.pattern)
+    print(summary.drop(columns='seconds').round(2).to_string(index=False))
+
+
+if __name__ == '__main__':
+    main()
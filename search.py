@@ -0,0 +1,244 @@
+"""Hyperparameter search for the stress Random Forest.
+
+Cross-validates a grid of forest settings with GroupKFold on ``datasetId``
+(no subject appears in both the training and the validation folds), running
+the fits across a process pool. ``--halving`` runs successive halving
+instead: every config is scored on a fraction of the training rows, the best
+1/eta survive to the next round with eta times more rows.
+
+Each surviving config is then refit on all the data, compiled and timed the
+way the app uses it: single-sample and batch latency, size on disk and load
+time. Configs on the accuracy/latency Pareto front are marked.
+
+Usage:
+    python search.py train_store --trees 25 50 100 --depths 6 8 10 --folds 5
+    python search.py train.csv --halving --sample-rows 100000 -o search.csv
+"""
+import argparse
+import itertools
+import math
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.metrics import accuracy_score
+from sklearn.model_selection import GroupKFold
+
+from dataset_store import load_frame
+from forest import CompiledForest, load_model
+from inference import FEATURES
+
+TARGET = 'condition'
+GROUP = 'datasetId'
+PARAMS = ('n_estimators', 'max_depth', 'min_samples_leaf')
+
+# Filled once per worker by _init_worker, so the data is not re-sent per task
+_X = None
+_y = None
+
+
+def load_data(source, sample_rows=None, random_state=42):
+    """(X, y, groups) from a CSV or dataset store, optionally subsampled"""
+    columns = FEATURES + [TARGET, GROUP]
+    if os.path.isdir(source):
+        frame = load_frame(source, columns)
+    else:
+        frame = pd.read_csv(source, usecols=columns)
+    if sample_rows and sample_rows < len(frame):
+        frame = frame.sample(sample_rows, random_state=random_state)
+    X = frame[FEATURES].to_numpy(dtype=np.float64)
+    y = frame[TARGET].astype(str).to_numpy(dtype=object)
+    groups = frame[GROUP].to_numpy()
+    return X, y, groups
+
+
+def grid(trees, depths, min_leaf):
+    return [
+        {'n_estimators': n, 'max_depth': d, 'min_samples_leaf': m}
+        for n, d, m in itertools.product(trees, depths, min_leaf)
+    ]
+
+
+def config_name(params):
+    return f"n{params['n_estimators']}_d{params['max_depth']}_l{params['min_samples_leaf']}"
+
+
+def _init_worker(X, y):
+    global _X, _y
+    _X, _y = X, y
+
+
+def _fit(params, rows, random_state):
+    model = RandomForestClassifier(random_state=random_state, **params)
+    model.fit(_X[rows], _y[rows])
+    return model
+
+
+def _score_fold(params, train_rows, test_rows, random_state):
+    model = _fit(params, train_rows, random_state)
+    return accuracy_score(_y[test_rows], model.predict(_X[test_rows]))
+
+
+def _fit_and_save(params, path, random_state):
+    model = _fit(params, np.arange(len(_y)), random_state)
+    CompiledForest.from_sklearn(model).save(path)
+    return path
+
+
+def cross_validate(pool, configs, folds, fraction=1.0, random_state=42):
+    """Mean/std accuracy per config over the folds, each fold's training rows subsampled to fraction.
+
+    The subsample is drawn once per fold and shared by every config, so
+    configs are compared on the same rows.
+    """
+    rng = np.random.default_rng(random_state)
+    if fraction < 1.0:
+        folds = [
+            (np.sort(rng.choice(train_rows, max(int(len(train_rows) * fraction), 1), replace=False)), test_rows)
+            for train_rows, test_rows in folds
+        ]
+    futures = {}
+    for i, params in enumerate(configs):
+        for k, (train_rows, test_rows) in enumerate(folds):
+            futures[i, k] = pool.submit(_score_fold, params, train_rows, test_rows, random_state)
+    results = []
+    for i, params in enumerate(configs):
+        scores = [futures[i, k].result() for k in range(len(folds))]
+        results.append({**params, 'cv_accuracy': float(np.mean(scores)), 'cv_std': float(np.std(scores))})
+    return results
+
+
+def successive_halving(pool, configs, folds, eta=3, min_fraction=None, log=print):
+    """Score all configs on few rows, keep the best 1/eta, repeat with eta times more rows.
+
+    Returns the configs of the last round, which were scored on all rows.
+    """
+    rounds = int(math.log(len(configs), eta) + 1e-9)
+    fraction = min_fraction or eta ** -rounds
+    results = []
+    while True:
+        fraction = min(fraction, 1.0)
+        results = cross_validate(pool, configs, folds, fraction)
+        log(f"Halving round: {len(configs)} configs on {fraction:.0%} of the training rows")
+        if len(configs) == 1 or fraction >= 1.0:
+            return results
+        results.sort(key=lambda r: r['cv_accuracy'], reverse=True)
+        keep = math.ceil(len(configs) / eta)
+        configs = [{k: r[k] for k in PARAMS} for r in results[:keep]]
+        fraction *= eta
+
+
+def measure(path, X, repeats=200, batch_size=1000):
+    """Load time, single-sample and batch latency, and size of a compiled model"""
+    start = time.perf_counter()
+    model = load_model(path)
+    load_ms = (time.perf_counter() - start) * 1e3
+
+    single = X[:1]
+    model.predict_proba(single)  # warm-up
+    timings = []
+    for i in range(repeats):
+        row = X[i % len(X):i % len(X) + 1]
+        start = time.perf_counter()
+        model.predict_proba(row)
+        timings.append(time.perf_counter() - start)
+
+    batch = X[:batch_size]
+    start = time.perf_counter()
+    model.predict_proba(batch)
+    batch_s = time.perf_counter() - start
+
+    return {
+        'single_p50_us': float(np.percentile(timings, 50) * 1e6),
+        'single_p99_us': float(np.percentile(timings, 99) * 1e6),
+        'batch_us_per_row': batch_s / len(batch) * 1e6,
+        'size_mb': sum(entry.stat().st_size for entry in os.scandir(path)) / 1e6,
+        'load_ms': load_ms,
+    }
+
+
+def pareto_front(results, accuracy='cv_accuracy', latency='single_p50_us'):
+    """Flags configs not beaten on both accuracy and latency by any other"""
+    front = []
+    for r in results:
+        dominated = any(
+            o[accuracy] >= r[accuracy] and o[latency] <= r[latency]
+            and (o[accuracy] > r[accuracy] or o[latency] < r[latency])
+            for o in results
+        )
+        front.append(not dominated)
+    return front
+
+
+def search(source, configs, n_folds=5, halving=False, eta=3, sample_rows=None, workers=None,
+           model_dir=None, random_state=42, log=print):
+    X, y, groups = load_data(source, sample_rows, random_state)
+    folds = list(GroupKFold(n_splits=n_folds).split(X, y, groups))
+    log(f"{len(y):,} rows, {len(np.unique(groups))} subjects, {n_folds} grouped folds, {len(configs)} configs")
+
+    model_dir = model_dir or tempfile.mkdtemp(prefix='stress_search_')
+    os.makedirs(model_dir, exist_ok=True)
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(X, y)) as pool:
+        if halving:
+            results = successive_halving(pool, configs, folds, eta, log=log)
+        else:
+            results = cross_validate(pool, configs, folds)
+        log(f"Cross-validation took {time.perf_counter() - start:.1f}s")
+
+        paths = [os.path.join(model_dir, config_name(r)) for r in results]
+        futures = [
+            pool.submit(_fit_and_save, {k: r[k] for k in PARAMS}, path, random_state)
+            for r, path in zip(results, paths)
+        ]
+        for future in futures:
+            future.result()
+
+    # Timed serially in this process so the pool does not skew latencies
+    for r, path in zip(results, paths):
+        r.update(measure(path, X))
+        r['model'] = path
+    for r, on_front in zip(results, pareto_front(results)):
+        r['pareto'] = on_front
+
+    return pd.DataFrame(results).sort_values('cv_accuracy', ascending=False, ignore_index=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Grouped-CV hyperparameter search for the stress model")
+    parser.add_argument('source', help="Training CSV or dataset_store directory")
+    parser.add_argument('--trees', type=int, nargs='+', default=[25, 50, 100])
+    parser.add_argument('--depths', type=int, nargs='+', default=[6, 8, 10, 14])
+    parser.add_argument('--min-leaf', type=int, nargs='+', default=[1])
+    parser.add_argument('--folds', type=int, default=5, help="GroupKFold splits over datasetId")
+    parser.add_argument('--halving', action='store_true', help="Successive halving instead of a full grid")
+    parser.add_argument('--eta', type=int, default=3, help="Halving keep ratio / row growth factor")
+    parser.add_argument('--sample-rows', type=int, help="Subsample the dataset to this many rows")
+    parser.add_argument('--workers', type=int, help="Process pool size (default: CPU count)")
+    parser.add_argument('--model-dir', help="Where the refitted compiled models go (default: a temp dir)")
+    parser.add_argument('-o', '--output', help="Write the results table to this CSV")
+    args = parser.parse_args()
+
+    configs = grid(args.trees, args.depths, args.min_leaf)
+    results = search(
+        args.source, configs, args.folds, args.halving, args.eta,
+        args.sample_rows, args.workers, args.model_dir,
+    )
+
+    columns = ['n_estimators', 'max_depth', 'min_samples_leaf', 'cv_accuracy', 'cv_std',
+               'single_p50_us', 'batch_us_per_row', 'size_mb', 'load_ms', 'pareto']
+    with pd.option_context('display.width', 160, 'display.float_format', '{:.4g}'.format):
+        print(results[columns].to_string(index=False))
+    front = results[results['pareto']]
+    print(f"\nPareto front (accuracy vs single-sample latency): {', '.join(front['model'].map(os.path.basename))}")
+    if args.output:
+        results.to_csv(args.output, index=False)
+        print(f"SUCCESS: Results saved as '{args.output}'")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,271 @@
+"""Persistent, append-only store of monitoring sessions.
+
+Sessions outlive the Streamlit ``session_state`` (a browser refresh, a
+server restart) and are shared by every process that opens the same
+database file. Storage is SQLite in WAL mode, so one writer appends while
+other processes read:
+
+    sessions(id, subject, started_at, classes, samples, ended_at)
+    samples(session_id, t, hr, rmssd, lf_hf, condition, proba)
+
+``samples`` is keyed (and physically ordered) by ``(session_id, t)``, so
+reading a session, or a time range of it, is one index range scan; sessions
+are indexed by ``(subject, started_at)``. ``t`` is seconds since the start
+of the session, ``condition`` an index into the session's classes, and
+``proba`` the class probabilities as float32 bytes.
+
+Writes go through ``SessionWriter``, which buffers samples and inserts them
+in one transaction per batch.
+
+Usage:
+    python session_store.py sessions.db                 # list sessions
+    python session_store.py sessions.db --subject p01
+"""
+import argparse
+import json
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from aggregates import SessionAggregator
+from episodes import EpisodeIndex
+from history import SessionHistory
+
+DEFAULT_PATH = 'sessions.db'
+SCHEMA_VERSION = 1
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    id INTEGER PRIMARY KEY,
+    subject TEXT NOT NULL,
+    started_at REAL NOT NULL,
+    classes TEXT NOT NULL,
+    samples INTEGER NOT NULL DEFAULT 0,
+    ended_at REAL
+);
+CREATE INDEX IF NOT EXISTS sessions_by_subject ON sessions (subject, started_at);
+CREATE TABLE IF NOT EXISTS samples (
+    session_id INTEGER NOT NULL REFERENCES sessions (id),
+    t REAL NOT NULL,
+    hr REAL NOT NULL,
+    rmssd REAL NOT NULL,
+    lf_hf REAL NOT NULL,
+    condition INTEGER NOT NULL,
+    proba BLOB,
+    PRIMARY KEY (session_id, t)
+) WITHOUT ROWID;
+"""
+
+SAMPLE_COLUMNS = ['t', 'hr', 'rmssd', 'lf_hf', 'condition']
+
+
+class SessionStore:
+    """Catalog and sample log of monitoring sessions in one SQLite file"""
+
+    def __init__(self, path=DEFAULT_PATH):
+        self.path = path
+        # One connection shared by Streamlit's script threads, serialized by a lock
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute('PRAGMA synchronous=NORMAL')
+            version = self._conn.execute('PRAGMA user_version').fetchone()[0]
+            if version not in (0, SCHEMA_VERSION):
+                raise ValueError(f"Unsupported session store version {version} in {path}")
+            self._conn.executescript(SCHEMA)
+            self._conn.execute(f'PRAGMA user_version={SCHEMA_VERSION}')
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def start_session(self, subject, started_at, classes, batch_size=256, flush_interval=1.0):
+        """Register a new session and return a buffered writer for its samples"""
+        classes = [str(c) for c in classes]
+        with self._lock:
+            cursor = self._conn.execute(
+                'INSERT INTO sessions (subject, started_at, classes) VALUES (?, ?, ?)',
+                (str(subject), started_at.timestamp(), json.dumps(classes)),
+            )
+        return SessionWriter(self, cursor.lastrowid, classes, batch_size, flush_interval)
+
+    def _write(self, session_id, rows, ended_at=None):
+        with self._lock:
+            self._conn.execute('BEGIN')
+            try:
+                self._conn.executemany(
+                    'INSERT INTO samples VALUES (?, ?, ?, ?, ?, ?, ?)',
+                    ((session_id,) + row for row in rows),
+                )
+                self._conn.execute(
+                    'UPDATE sessions SET samples = samples + ?, ended_at = COALESCE(?, ended_at) WHERE id = ?',
+                    (len(rows), ended_at, session_id),
+                )
+                self._conn.execute('COMMIT')
+            except BaseException:
+                self._conn.execute('ROLLBACK')
+                raise
+
+    def sessions(self, subject=None, since=None, until=None):
+        """Catalog of sessions (optionally one subject's, started within [since, until])"""
+        query = 'SELECT id, subject, started_at, samples, ended_at, classes FROM sessions WHERE 1=1'
+        params = []
+        if subject is not None:
+            query += ' AND subject = ?'
+            params.append(str(subject))
+        if since is not None:
+            query += ' AND started_at >= ?'
+            params.append(since.timestamp())
+        if until is not None:
+            query += ' AND started_at <= ?'
+            params.append(until.timestamp())
+        query += ' ORDER BY started_at DESC'
+        with self._lock:
+            frame = pd.read_sql_query(query, self._conn, params=params)
+        # Timestamps are stored as epoch seconds and shown in local time, as recorded
+        for column in ('started_at', 'ended_at'):
+            frame[column] = pd.to_datetime(frame[column].map(_local_time))
+        frame['classes'] = frame['classes'].map(json.loads)
+        return frame
+
+    def session(self, session_id):
+        """Catalog entry of one session as a dict"""
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT id, subject, started_at, samples, ended_at, classes FROM sessions WHERE id = ?',
+                (int(session_id),),
+            ).fetchone()
+        if row is None:
+            raise KeyError(f"No session {session_id} in {self.path}")
+        session_id, subject, started_at, samples, ended_at, classes = row
+        return {
+            'id': session_id, 'subject': subject, 'started_at': _local_time(started_at),
+            'samples': samples, 'ended_at': _local_time(ended_at), 'classes': json.loads(classes),
+        }
+
+    def iter_samples(self, session_id, start=None, end=None, chunk_rows=10000):
+        """Yield dicts of column arrays for t in [start, end], chunk_rows at a time"""
+        n_classes = len(self.session(session_id)['classes'])
+        query = 'SELECT t, hr, rmssd, lf_hf, condition, proba FROM samples WHERE session_id = ?'
+        params = [int(session_id)]
+        if start is not None:
+            query += ' AND t >= ?'
+            params.append(float(start))
+        if end is not None:
+            query += ' AND t <= ?'
+            params.append(float(end))
+        query += ' ORDER BY t'
+        last_t = None
+        while True:
+            # Keyset pagination: every chunk is a fresh range read, so no
+            # cursor (or lock) is held between chunks
+            page, page_params = query, list(params)
+            if last_t is not None:
+                page = page.replace(' ORDER BY t', ' AND t > ? ORDER BY t')
+                page_params.append(last_t)
+            with self._lock:
+                rows = self._conn.execute(page + ' LIMIT ?', page_params + [chunk_rows]).fetchall()
+            if not rows:
+                return
+            t, hr, rmssd, lf_hf, condition, proba = zip(*rows)
+            yield {
+                't': np.array(t, dtype=np.float64),
+                'hr': np.array(hr, dtype=np.float64),
+                'rmssd': np.array(rmssd, dtype=np.float64),
+                'lf_hf': np.array(lf_hf, dtype=np.float64),
+                'condition': np.array(condition, dtype=np.int8),
+                'proba': _decode_proba(proba, n_classes),
+            }
+            last_t = float(t[-1])
+            if len(rows) < chunk_rows:
+                return
+
+    def load(self, session_id, start=None, end=None, capacity=None):
+        """Rebuild (history, aggregates, episodes, started_at) for a stored session"""
+        info = self.session(session_id)
+        classes = info['classes']
+        history = SessionHistory(classes, capacity or max(int(info['samples']), 1))
+        aggregates = SessionAggregator()
+        episodes = EpisodeIndex()
+        names = np.asarray(classes, dtype=object)
+        for chunk in self.iter_samples(session_id, start, end):
+            history.extend(chunk['t'], chunk['hr'], chunk['rmssd'], chunk['lf_hf'], chunk['condition'], chunk['proba'])
+            labels = names[chunk['condition']]
+            aggregates.update_batch(chunk['t'], chunk['hr'], chunk['rmssd'], chunk['lf_hf'], labels)
+            episodes.update_batch(chunk['t'], chunk['hr'], chunk['rmssd'], labels)
+        return history, aggregates, episodes, info['started_at']
+
+
+def _decode_proba(blobs, n_classes):
+    missing = np.full(n_classes, np.nan, np.float32).tobytes()
+    data = b''.join(missing if b is None else b for b in blobs)
+    return np.frombuffer(data, dtype=np.float32).reshape(len(blobs), n_classes)
+
+
+def _local_time(timestamp):
+    return datetime.fromtimestamp(timestamp) if timestamp is not None and timestamp == timestamp else None
+
+
+class SessionWriter:
+    """Buffered appender for one session's samples"""
+
+    def __init__(self, store, session_id, classes, batch_size=256, flush_interval=1.0):
+        self.store = store
+        self.session_id = session_id
+        self._codes = {name: code for code, name in enumerate(classes)}
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.written = 0
+        self._rows = []
+        self._last_flush = time.monotonic()
+
+    def append(self, t, hr, rmssd, lf_hf, condition, proba=None):
+        blob = np.asarray(proba, dtype=np.float32).tobytes() if proba is not None else None
+        self._rows.append((float(t), float(hr), float(rmssd), float(lf_hf), self._codes[str(condition)], blob))
+        if len(self._rows) >= self.batch_size or time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def extend(self, t, hr, rmssd, lf_hf, condition, proba=None):
+        """Append arrays of samples, written in one transaction with anything buffered"""
+        codes = [self._codes[str(c)] for c in condition]
+        proba = np.asarray(proba, dtype=np.float32) if proba is not None else None
+        self._rows.extend(
+            (float(t[k]), float(hr[k]), float(rmssd[k]), float(lf_hf[k]), codes[k],
+             proba[k].tobytes() if proba is not None else None)
+            for k in range(len(codes))
+        )
+        self.flush()
+
+    def flush(self, ended_at=None):
+        if self._rows or ended_at is not None:
+            self.store._write(self.session_id, self._rows, ended_at)
+            self.written += len(self._rows)
+            self._rows = []
+        self._last_flush = time.monotonic()
+
+    def close(self):
+        """Write what is buffered and mark the session as ended"""
+        self.flush(ended_at=time.time())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="List the sessions in a session store")
+    parser.add_argument('path', nargs='?', default=DEFAULT_PATH)
+    parser.add_argument('--subject', help="Only this subject's sessions")
+    args = parser.parse_args()
+
+    store = SessionStore(args.path)
+    sessions = store.sessions(args.subject)
+    if sessions.empty:
+        print(f"No sessions in {args.path}")
+        return
+    print(sessions.drop(columns='classes').to_string(index=False))
+
+
+if __name__ == '__main__':
+    main()
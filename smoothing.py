@@ -0,0 +1,124 @@
+"""Temporal smoothing of classifier probabilities, per subject.
+
+Each subject keeps an exponential moving average of its ``predict_proba``
+rows and a hysteresis state: the displayed label only switches once the
+smoothed argmax has pointed at a different class for ``min_dwell``
+consecutive samples. A single noisy sample therefore no longer flips the
+status. State is a few numbers per subject in preallocated arrays, so an
+update costs O(1) time and memory per sample, and a batch of samples from
+many subjects is one vectorized step.
+
+With ``alpha=1`` and ``min_dwell=1`` the output is the raw argmax.
+
+Usage:
+    python -m benchmarks.smoothing
+"""
+import numpy as np
+
+DEFAULT_ALPHA = 0.3
+DEFAULT_MIN_DWELL = 3
+
+
+class ProbaSmoother:
+    """EMA + minimum-dwell hysteresis over probability rows, for any number of subjects"""
+
+    def __init__(self, classes, alpha=DEFAULT_ALPHA, min_dwell=DEFAULT_MIN_DWELL, capacity=64):
+        if not 0 < alpha <= 1:
+            raise ValueError(f"alpha must be in (0, 1], got {alpha}")
+        if min_dwell < 1:
+            raise ValueError(f"min_dwell must be at least 1, got {min_dwell}")
+        self.classes = np.asarray([str(c) for c in classes], dtype=object)
+        self.alpha = alpha
+        self.min_dwell = min_dwell
+        self._rows = {}  # subject -> row in the state arrays
+        self._ema = np.zeros((capacity, len(self.classes)), dtype=np.float64)
+        self._current = np.zeros(capacity, dtype=np.intp)   # displayed class
+        self._candidate = np.zeros(capacity, dtype=np.intp)  # class trying to take over
+        self._count = np.zeros(capacity, dtype=np.intp)      # consecutive samples for the candidate
+        self._seen = np.zeros(capacity, dtype=bool)
+
+    def _grow(self, needed):
+        capacity = len(self._current)
+        while capacity < needed:
+            capacity *= 2
+        for name in ('_ema', '_current', '_candidate', '_count', '_seen'):
+            old = getattr(self, name)
+            new = np.zeros((capacity,) + old.shape[1:], dtype=old.dtype)
+            new[:len(old)] = old
+            setattr(self, name, new)
+
+    def __len__(self):
+        return len(self._rows)
+
+    def _subject_rows(self, subjects):
+        rows = self._rows
+        out = np.empty(len(subjects), dtype=np.intp)
+        for i, subject in enumerate(subjects):
+            row = rows.get(subject)
+            if row is None:
+                row = rows[subject] = len(rows)
+            out[i] = row
+        if len(rows) > len(self._current):
+            self._grow(len(rows))
+        return out
+
+    def update(self, subjects, proba):
+        """Fold one probability row per entry of subjects in; returns smoothed class codes.
+
+        A subject may appear several times in one call; its rows are
+        applied in order, at one vectorized step per repetition.
+        """
+        proba = np.asarray(proba, dtype=np.float64).reshape(len(subjects), len(self.classes))
+        rows = self._subject_rows(subjects)
+        if len(rows) <= 1 or len(set(subjects)) == len(rows):
+            return self._step(rows, proba)
+        # Group the entries by subject once (stable, so each subject's rows
+        # keep their order), number them within their subject, then step
+        # through those ranks: rank k holds every subject's k-th row, so one
+        # vectorized step per rank applies all rows in order.
+        _, group = np.unique(rows, return_inverse=True)
+        order = np.argsort(group, kind='stable')
+        sizes = np.bincount(group)
+        starts = np.cumsum(sizes) - sizes
+        rank = np.empty(len(rows), dtype=np.intp)
+        rank[order] = np.arange(len(rows)) - np.repeat(starts, sizes)
+        by_rank = np.argsort(rank, kind='stable')
+        bounds = np.searchsorted(rank[by_rank], np.arange(sizes.max() + 1))
+        codes = np.empty(len(rows), dtype=np.intp)
+        for begin, end in zip(bounds[:-1], bounds[1:]):
+            step = by_rank[begin:end]
+            codes[step] = self._step(rows[step], proba[step])
+        return codes
+
+    def _step(self, rows, proba):
+        new = ~self._seen[rows]
+        ema = self._ema[rows]
+        ema += self.alpha * (proba - ema)
+        ema[new] = proba[new]
+        top = ema.argmax(axis=1)
+
+        current = np.where(new, top, self._current[rows])
+        candidate = self._candidate[rows]
+        count = self._count[rows]
+        agree = top == current
+        count = np.where(agree, 0, np.where(top == candidate, count + 1, 1))
+        candidate = np.where(agree, candidate, top)
+        switch = count >= self.min_dwell
+        current = np.where(switch, top, current)
+        count[switch] = 0
+
+        self._ema[rows] = ema
+        self._current[rows] = current
+        self._candidate[rows] = candidate
+        self._count[rows] = count
+        self._seen[rows] = True
+        return current
+
+    def update_labels(self, subjects, proba):
+        """Like update, returning class names"""
+        return self.classes[self.update(subjects, proba)]
+
+    def smoothed_proba(self, subject):
+        """Current EMA probabilities of a subject, or None if unseen"""
+        row = self._rows.get(subject)
+        return None if row is None else self._ema[row].copy()
@@ -0,0 +1,185 @@
+"""Streaming frequency-domain HRV features.
+
+Estimates VLF/LF/HF power over a sliding window of unevenly spaced RR
+intervals with a Lomb-Scargle periodogram, and derives the SWELL spectral
+columns (VLF, LF, HF, TP, *_PCT, LF_NU, HF_NU, LF_HF, HF_LF).
+
+The periodogram is kept as running complex sums per frequency,
+
+    Z1 = sum(exp(iwt)),  Zy = sum(y * exp(iwt)),  Z2 = sum(exp(2iwt)),
+
+which a beat entering or leaving the window updates in O(n_freqs). A 1 Hz
+output then costs O(n_freqs) instead of the O(n_beats * n_freqs) of
+recomputing the periodogram from scratch.
+
+Usage:
+    python -m benchmarks.spectral
+"""
+from collections import deque
+
+import numpy as np
+
+BANDS = {
+    'VLF': (0.003, 0.04),
+    'LF': (0.04, 0.15),
+    'HF': (0.15, 0.4),
+}
+
+SPECTRAL_FEATURES = [
+    'VLF', 'VLF_PCT', 'LF', 'LF_PCT', 'LF_NU', 'HF', 'HF_PCT', 'HF_NU', 'TP', 'LF_HF', 'HF_LF'
+]
+
+
+def frequency_grid(step=0.001):
+    """Frequencies (Hz) covering all bands"""
+    low, high = BANDS['VLF'][0], BANDS['HF'][1]
+    return np.arange(low, high + step / 2, step)
+
+
+def _power_from_sums(n, sum_y, Z1, Zy, Z2):
+    """Classic (mean-subtracted) Lomb-Scargle power from the running sums"""
+    mean_y = sum_y / n
+    C = Zy.real - mean_y * Z1.real
+    S = Zy.imag - mean_y * Z1.imag
+    CC = 0.5 * (n + Z2.real)
+    SS = 0.5 * (n - Z2.real)
+    CS = 0.5 * Z2.imag
+    det = CC * SS - CS * CS
+    with np.errstate(divide='ignore', invalid='ignore'):
+        power = 0.5 * (SS * C * C - 2 * CS * C * S + CC * S * S) / det
+    return np.nan_to_num(power, nan=0.0, posinf=0.0, neginf=0.0)
+
+
+def lomb_scargle_psd(t, y, freqs):
+    """Reference PSD (ms^2/Hz) of samples y at times t (s), computed from scratch"""
+    t = np.asarray(t, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    t = t - t[0]
+    omega_t = np.outer(t, 2 * np.pi * freqs)
+    e1 = np.exp(1j * omega_t)
+    power = _power_from_sums(len(t), y.sum(), e1.sum(axis=0), y @ e1, (e1 * e1).sum(axis=0))
+    return _scale(power, len(t), t[-1] - t[0])
+
+
+def _scale(power, n, duration):
+    # A sinusoid of amplitude A gives a peak of N*A^2/4; spreading its variance
+    # A^2/2 over the ~1/T bandwidth of the window gives PSD units
+    return power * 2.0 * duration / n
+
+
+def band_features(freqs, psd):
+    """SWELL spectral columns from a PSD on the given frequency grid"""
+    df = freqs[1] - freqs[0]
+    powers = {}
+    for name, (low, high) in BANDS.items():
+        mask = (freqs >= low) & (freqs < high)
+        powers[name] = float(psd[mask].sum() * df)
+
+    vlf, lf, hf = powers['VLF'], powers['LF'], powers['HF']
+    tp = vlf + lf + hf
+    lf_hf_total = lf + hf
+    return {
+        'VLF': vlf,
+        'VLF_PCT': 100.0 * vlf / tp if tp else 0.0,
+        'LF': lf,
+        'LF_PCT': 100.0 * lf / tp if tp else 0.0,
+        'LF_NU': 100.0 * lf / lf_hf_total if lf_hf_total else 0.0,
+        'HF': hf,
+        'HF_PCT': 100.0 * hf / tp if tp else 0.0,
+        'HF_NU': 100.0 * hf / lf_hf_total if lf_hf_total else 0.0,
+        'TP': tp,
+        'LF_HF': lf / hf if hf else float('nan'),
+        'HF_LF': hf / lf if lf else float('nan'),
+    }
+
+
+class SlidingLombScargle:
+    """Lomb-Scargle periodogram over a sliding time window, updated per beat.
+
+    Times are kept relative to a moving origin so the phases stay small;
+    when the origin is moved the sums are rotated rather than recomputed.
+    Every ``resync_every`` beats the sums are rebuilt from the window to
+    bound floating-point drift.
+    """
+
+    def __init__(self, window_seconds=300.0, freqs=None, resync_every=5000, rebase_after=600.0):
+        self.window_seconds = window_seconds
+        self.freqs = frequency_grid() if freqs is None else np.asarray(freqs, dtype=np.float64)
+        self.omega = 2 * np.pi * self.freqs
+        self.resync_every = resync_every
+        self.rebase_after = rebase_after
+        self.samples = deque()  # (time_s, rr_ms)
+        self.origin = None
+        self._since_resync = 0
+        self._reset_sums()
+
+    def _reset_sums(self):
+        k = len(self.freqs)
+        self.n = 0
+        self.sum_y = 0.0
+        self.Z1 = np.zeros(k, dtype=np.complex128)
+        self.Zy = np.zeros(k, dtype=np.complex128)
+        self.Z2 = np.zeros(k, dtype=np.complex128)
+
+    def _accumulate(self, t, y, sign):
+        e = np.exp(1j * self.omega * (t - self.origin))
+        self.n += sign
+        self.sum_y += sign * y
+        self.Z1 += sign * e
+        self.Zy += (sign * y) * e
+        self.Z2 += sign * (e * e)
+
+    def add(self, rr, t):
+        """Add one RR interval (ms) observed at beat time t (s)"""
+        if self.origin is None:
+            self.origin = t
+        elif t - self.origin > self.rebase_after:
+            self._rebase(self.samples[0][0] if self.samples else t)
+
+        self.samples.append((t, rr))
+        self._accumulate(t, rr, +1)
+
+        cutoff = t - self.window_seconds
+        while self.samples and self.samples[0][0] <= cutoff:
+            old_t, old_rr = self.samples.popleft()
+            self._accumulate(old_t, old_rr, -1)
+
+        self._since_resync += 1
+        if self._since_resync >= self.resync_every:
+            self.resync()
+
+    def _rebase(self, origin):
+        """Move the time origin, rotating the sums instead of recomputing them"""
+        shift = np.exp(-1j * self.omega * (origin - self.origin))
+        self.Z1 *= shift
+        self.Zy *= shift
+        self.Z2 *= shift * shift
+        self.origin = origin
+
+    def resync(self):
+        """Rebuild the sums exactly from the samples in the window"""
+        self._reset_sums()
+        if self.samples:
+            self.origin = self.samples[0][0]
+            t = np.array([s[0] for s in self.samples]) - self.origin
+            y = np.array([s[1] for s in self.samples])
+            e = np.exp(1j * np.outer(t, self.omega))
+            self.n = len(y)
+            self.sum_y = float(y.sum())
+            self.Z1 = e.sum(axis=0)
+            self.Zy = y @ e
+            self.Z2 = (e * e).sum(axis=0)
+        self._since_resync = 0
+
+    def psd(self):
+        """Current PSD (ms^2/Hz) on self.freqs"""
+        if self.n < 3:
+            return np.zeros(len(self.freqs))
+        duration = self.samples[-1][0] - self.samples[0][0]
+        return _scale(_power_from_sums(self.n, self.sum_y, self.Z1, self.Zy, self.Z2), self.n, duration)
+
+    def features(self):
+        """Current window's spectral features, or None until enough beats are in it"""
+        if self.n < 3:
+            return None
+        return band_features(self.freqs, self.psd())
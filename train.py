@@ -0,0 +1,205 @@
+"""Out-of-core training for the stress Random Forest.
+
+Streams the training data in fixed-size chunks (from a CSV or a
+dataset_store directory), fits a small forest on each chunk and merges all
+trees into one RandomForestClassifier. Peak memory is bounded by the chunk
+size plus the trees themselves, not by the dataset (about two chunks: one
+is held back so that a chunk missing a class can be merged into it). A
+slice of every chunk is held out, up to a fixed cap, to report accuracy at
+the end; once the cap is reached every row is trained on.
+
+Usage:
+    python train.py train.csv --chunk-rows 200000
+    python train.py train_store --trees 100 --max-depth 10
+"""
+import argparse
+import math
+import os
+import pickle
+import resource
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.metrics import accuracy_score, classification_report
+
+from dataset_store import count_csv_rows, load_columns, read_meta
+from forest import DEFAULT_PATH, CompiledForest
+from inference import FEATURES
+
+TARGET = 'condition'
+
+
+def count_rows(source):
+    if os.path.isdir(source):
+        return read_meta(source)['rows']
+    return count_csv_rows(source)
+
+
+def iter_chunks(source, chunk_rows):
+    """Yield (X, y) chunks from a CSV file or a dataset store"""
+    if os.path.isdir(source):
+        meta = read_meta(source)
+        columns = load_columns(source, FEATURES + [TARGET])
+        categories = np.asarray(meta['columns'][TARGET]['categories'], dtype=object)
+        for start in range(0, meta['rows'], chunk_rows):
+            stop = start + chunk_rows
+            # Slicing the memory maps only pages in this chunk
+            X = pd.DataFrame({name: np.asarray(columns[name][start:stop]) for name in FEATURES})
+            y = categories[np.asarray(columns[TARGET][start:stop])]
+            yield X, y
+    else:
+        for chunk in pd.read_csv(source, usecols=FEATURES + [TARGET], chunksize=chunk_rows):
+            yield chunk[FEATURES].reset_index(drop=True), chunk[TARGET].to_numpy(dtype=object)
+
+
+def merge_forests(forests):
+    """Combine the trees of several fitted forests (with identical classes) into one"""
+    merged = forests[0]
+    for other in forests[1:]:
+        merged.estimators_ += other.estimators_
+    merged.n_estimators = len(merged.estimators_)
+    return merged
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes on Linux
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def train(source, chunk_rows=200_000, trees=100, max_depth=10, holdout=0.2, max_holdout_rows=100_000,
+          random_state=42, n_jobs=None, log=print):
+    """Fit one forest per chunk and merge them; returns (model, report dict)
+
+    Chunk k gets ``trees // n_chunks`` trees, plus one for the first
+    ``trees % n_chunks`` chunks. Tree leaf values are indexed by the
+    forest's classes, so a chunk missing a class cannot be fitted alone: it
+    is merged (rows and trees) into the chunk held back before it, or into
+    the next one.
+    """
+    total_rows = count_rows(source)
+    n_chunks = max(math.ceil(total_rows / chunk_rows), 1)
+    if trees < n_chunks:
+        raise ValueError(f"{trees} trees cannot cover {n_chunks} chunks; raise --trees or --chunk-rows")
+    rng = np.random.default_rng(random_state)
+
+    forests = []
+    classes = np.empty(0, dtype=object)
+    held_X, held_y = [], []
+    held_rows = 0
+    rows_seen = 0
+    fitted_rows = 0
+    fit_time = 0.0
+    pending = None  # [X, y, trees, first chunk, last chunk] not fitted yet
+    start = time.perf_counter()
+
+    def fit(X, y, n_trees, first, last):
+        nonlocal fitted_rows, fit_time
+        if forests and not np.array_equal(np.unique(y), forests[0].classes_):
+            raise ValueError(f"Chunks {first + 1}-{last + 1} have classes {list(np.unique(y))}, earlier chunks "
+                             f"{list(forests[0].classes_)}; shuffle the data so every chunk sees every class")
+        fit_start = time.perf_counter()
+        forest = RandomForestClassifier(
+            n_estimators=n_trees, max_depth=max_depth,
+            random_state=random_state + first, n_jobs=n_jobs,
+        )
+        forest.fit(X, y)
+        fit_time += time.perf_counter() - fit_start
+        forests.append(forest)
+        fitted_rows += len(X)
+        chunks = f"{first + 1}" if first == last else f"{first + 1}-{last + 1}"
+        log(f"Chunk {chunks}/{n_chunks}: {len(X):,} rows, {n_trees} trees "
+            f"({rows_seen / (time.perf_counter() - start):,.0f} rows/s so far)")
+
+    for k, (X, y) in enumerate(iter_chunks(source, chunk_rows)):
+        rows_seen += len(X)
+        # Hold out rows only while the cap allows; the rest of the mask trains
+        train_mask = np.ones(len(X), dtype=bool)
+        if held_rows < max_holdout_rows:
+            take = np.flatnonzero(rng.random(len(X)) < holdout)[:max_holdout_rows - held_rows]
+            held_X.append(X.iloc[take])
+            held_y.append(y[take])
+            held_rows += len(take)
+            train_mask[take] = False
+        X_train, y_train = X[train_mask].reset_index(drop=True), y[train_mask]
+        n_trees = trees // n_chunks + (1 if k < trees % n_chunks else 0)
+
+        classes = np.union1d(classes, np.unique(y_train))
+        complete = np.array_equal(np.unique(y_train), classes)
+        if pending is not None and complete and np.array_equal(np.unique(pending[1]), classes):
+            fit(*pending)
+            pending = None
+        if pending is None:
+            pending = [X_train, y_train, n_trees, k, k]
+        else:
+            # One of the two is missing a class: fit them together
+            log(f"Chunk {k + 1}/{n_chunks} merged with chunk {pending[3] + 1} to cover classes {list(classes)}")
+            pending = [pd.concat([pending[0], X_train], ignore_index=True), np.concatenate([pending[1], y_train]),
+                       pending[2] + n_trees, pending[3], k]
+
+    if pending is None:
+        raise ValueError(f"No training rows in {source}")
+    fit(*pending)
+    model = merge_forests(forests)
+    elapsed = time.perf_counter() - start
+
+    report = {
+        'rows': fitted_rows,
+        'rows_read': rows_seen,
+        'held_out_rows': held_rows,
+        'chunks': n_chunks,
+        'trees': model.n_estimators,
+        'seconds': elapsed,
+        'rows_per_sec': rows_seen / elapsed,
+        'fit_rows_per_sec': fitted_rows / fit_time if fit_time else 0.0,
+        'peak_rss_mb': peak_rss_mb(),
+    }
+    if held_rows:
+        X_test = pd.concat(held_X, ignore_index=True)
+        y_test = np.concatenate(held_y)
+        predictions = model.predict(X_test)
+        report['accuracy'] = accuracy_score(y_test, predictions)
+        report['classification_report'] = classification_report(y_test, predictions)
+    return model, report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train the stress model in chunks")
+    parser.add_argument('source', help="Training CSV or dataset_store directory")
+    parser.add_argument('--chunk-rows', type=int, default=200_000, help="Rows held in memory at once")
+    parser.add_argument('--trees', type=int, default=100, help="Total trees across all chunks")
+    parser.add_argument('--max-depth', type=int, default=10)
+    parser.add_argument('--holdout', type=float, default=0.2, help="Fraction of each chunk held out for evaluation")
+    parser.add_argument('--max-holdout-rows', type=int, default=100_000, help="Cap on held-out rows kept in memory")
+    parser.add_argument('--n-jobs', type=int, default=None, help="Parallel tree fitting per chunk")
+    parser.add_argument('--output', default='stress_model.pkl', help="Pickled model path")
+    parser.add_argument('--compiled', default=DEFAULT_PATH, help="Compiled forest directory ('' to skip)")
+    args = parser.parse_args()
+
+    model, report = train(
+        args.source, args.chunk_rows, args.trees, args.max_depth,
+        args.holdout, args.max_holdout_rows, n_jobs=args.n_jobs,
+    )
+
+    print(f"\nTrained {report['trees']} trees on {report['rows']:,} rows in {report['chunks']} chunks "
+          f"in {report['seconds']:.1f}s ({report['held_out_rows']:,} of {report['rows_read']:,} rows held out)")
+    print(f"Throughput: {report['rows_per_sec']:,.0f} rows/s overall, {report['fit_rows_per_sec']:,.0f} rows/s fitting")
+    print(f"Peak RSS: {report['peak_rss_mb']:.0f} MB")
+    if 'accuracy' in report:
+        print("Model Accuracy:", report['accuracy'])
+        print("\nClassification Report:\n", report['classification_report'])
+
+    with open(args.output, 'wb') as f:
+        pickle.dump(model, f)
+    print(f"SUCCESS: Model saved as '{args.output}'")
+    if args.compiled:
+        CompiledForest.from_sklearn(model).save(args.compiled)
+        print(f"SUCCESS: Compiled model saved as '{args.compiled}'")
+
+
+if __name__ == '__main__':
+    main()